@@ -0,0 +1,353 @@
+import argparse
+import gc
+import json
+import logging
+import math
+import os
+import platform
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime, timezone
+from types import SimpleNamespace
+from unittest import mock
+
+import cv2
+import numpy as np
+import yaml
+
+from ui_components.TrackGenerator import cones_from_centerline
+
+SIZES = (1_000, 10_000, 100_000)
+IMAGE_SIZES = (512, 1024, 2048)
+
+
+def synthetic_track(cone_count, track_width=4.0, cone_spacing=3.5):
+    """
+    A closed, self-intersection free track with about the given number of cones.
+    The centerline is a wavy loop whose length is scaled to the cone count.
+
+    Args:
+        cone_count: Total number of blue and yellow cones
+        track_width: Distance between the blue and yellow cones in meters (default: 4.0)
+        cone_spacing: Distance between neighbouring cones in meters (default: 3.5)
+
+    Returns:
+        dict: Track dictionary as stored in the YAML files
+    """
+    segments = max(cone_count // 2, 8)
+    angles = np.linspace(0.0, 2 * math.pi, 8 * segments, endpoint=False)
+    radius = 1.0 + 0.2 * np.sin(3 * angles) + 0.1 * np.cos(7 * angles)
+    unit = np.column_stack([radius * np.cos(angles), radius * np.sin(angles)])
+    closed = np.vstack([unit, unit[:1]])
+    length = np.hypot(*np.diff(closed, axis=0).T).sum()
+    points = unit * (segments * cone_spacing / length)
+
+    blue, yellow, centerline = cones_from_centerline(points, track_width, cone_spacing)
+    heading = centerline[1] - centerline[0]
+    return {
+        "cones_left": np.round(blue, 4).tolist(),
+        "cones_right": np.round(yellow, 4).tolist(),
+        "starting_pose": [round(float(centerline[0, 0]), 4), round(float(centerline[0, 1]), 4),
+                          round(math.degrees(math.atan2(heading[1], heading[0])), 4)]
+    }
+
+
+def synthetic_track_image(path, size):
+    """
+    Write a white track outline on black, as used by the GENERATE panel.
+
+    Args:
+        path: Path of the PNG file
+        size: Edge length of the image in pixels
+    """
+    image = np.zeros((size, size, 3), dtype=np.uint8)
+    angles = np.linspace(0.0, 2 * math.pi, 720, endpoint=False)
+    radius = size * 0.35 * (1.0 + 0.15 * np.sin(3 * angles))
+    outline = np.column_stack([size / 2 + radius * np.cos(angles), size / 2 + radius * np.sin(angles)]).astype(np.int32)
+    cv2.polylines(image, [outline], True, (255, 255, 255), max(size // 100, 2))
+    cv2.imwrite(path, image)
+
+
+def summary(samples):
+    """Minimum, median and maximum of timings in seconds."""
+    samples = np.asarray(samples, dtype=float)
+    return {"min": float(samples.min()), "median": float(np.median(samples)), "max": float(samples.max()), "runs": len(samples)}
+
+
+def latency_summary(samples):
+    """Percentiles of per-event timings in milliseconds."""
+    samples = np.asarray(samples, dtype=float) * 1000.0
+    p50, p95, p99 = np.percentile(samples, (50, 95, 99))
+    return {"p50_ms": float(p50), "p95_ms": float(p95), "p99_ms": float(p99), "max_ms": float(samples.max()), "events": len(samples)}
+
+
+def measure(function, repeat):
+    """Run a function repeat times and return the summary of its durations."""
+    durations = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        function()
+        durations.append(time.perf_counter() - start)
+    return summary(durations)
+
+
+class Benchmark:
+    """
+    Drives a real Window through its public methods and canvas event handlers.
+    Every timed step ends with update_idletasks so that the Tk redraw is included.
+    """
+
+    def __init__(self, window, directory, repeat=3, events=100):
+        """
+        Initialize the benchmark.
+
+        Args:
+            window: TrackBuilder Window, already shown
+            directory: Directory for the generated track and image files
+            repeat: Number of runs of every timed operation (default: 3)
+            events: Number of mouse events of the pan and zoom sequences (default: 100)
+        """
+        self.window = window
+        self.canvas = window.placing_canvas
+        self.directory = directory
+        self.repeat = repeat
+        self.events = events
+
+    def settle(self):
+        self.window.update_idletasks()
+
+    def event(self, x, y, **fields):
+        return SimpleNamespace(x=x, y=y, state=0, delta=0, widget=self.canvas, **fields)
+
+    def run_track(self, cone_count):
+        """Time all operations on a synthetic track of the given size."""
+        window = self.window
+        track_data = synthetic_track(cone_count)
+        path = os.path.join(self.directory, f"track_{cone_count}.yaml")
+        with open(path, "w") as file:
+            yaml.dump(track_data, file, default_flow_style=False, indent=2)
+        result = {"cones": len(track_data["cones_left"]) + len(track_data["cones_right"]), "file_bytes": os.path.getsize(path)}
+
+        def load():
+            with mock.patch("TrackBuilder.filedialog.askopenfilename", return_value=path):
+                window.load_track()
+            self.settle()
+
+        def visualize():
+            window.visualize(track_data)
+            self.settle()
+
+        def fit():
+            self.canvas.fit_to_track()
+            self.settle()
+
+        result["load_s"] = measure(load, self.repeat)
+        result["parse_s"] = measure(lambda: window.open_yaml_file(path), self.repeat)
+        result["visualize_s"] = measure(visualize, self.repeat)
+        result["fit_to_track_s"] = measure(fit, self.repeat)
+
+        window.current_file = os.path.join(self.directory, f"saved_{cone_count}.yaml")
+        result["save_s"] = measure(lambda: window.save_track(order_cones=False, export_centerline=False), self.repeat)
+        result["save_ordered_s"] = measure(lambda: window.save_track(order_cones=True, export_centerline=True), self.repeat)
+
+        result["pan"] = self.run_pan()
+        result["zoom"] = self.run_zoom()
+        result["memory"] = self.run_memory(track_data)
+        window.clear_canvas()
+        self.settle()
+        return result
+
+    def run_pan(self):
+        """Pan with left-button drags on empty canvas, as handle_mouse_press/motion/release see them."""
+        canvas = self.canvas
+        window = self.window
+        window.current_tool = None
+        x, y = canvas.winfo_width() // 2, canvas.winfo_height() // 2
+        canvas.handle_mouse_press(self.event(x, y))
+        durations = []
+        for index in range(self.events):
+            # back and forth so the view stays on the track
+            dx = 5 if (index // 20) % 2 == 0 else -5
+            x += dx
+            start = time.perf_counter()
+            canvas.handle_mouse_motion(self.event(x, y))
+            self.settle()
+            durations.append(time.perf_counter() - start)
+        canvas.handle_mouse_release(self.event(x, y))
+        self.settle()
+        return latency_summary(durations)
+
+    def run_zoom(self):
+        """Zoom in and out with mouse wheel events around the canvas center."""
+        canvas = self.canvas
+        x, y = canvas.winfo_width() // 2, canvas.winfo_height() // 2
+        durations = []
+        for index in range(self.events):
+            delta = 120 if (index // 10) % 2 == 0 else -120
+            start = time.perf_counter()
+            canvas.zoom(self.event(x, y, delta=delta))
+            self.settle()
+            durations.append(time.perf_counter() - start)
+        return latency_summary(durations)
+
+    def run_memory(self, track_data):
+        """Python heap and canvas items added by visualizing the track."""
+        window = self.window
+        window.clear_canvas()
+        self.settle()
+        gc.collect()
+        items_before = len(self.canvas.find_all())
+        tracemalloc.start()
+        before = tracemalloc.take_snapshot()
+        window.visualize(track_data)
+        self.settle()
+        gc.collect()
+        after = tracemalloc.take_snapshot()
+        tracemalloc.stop()
+        allocated = sum(stat.size_diff for stat in after.compare_to(before, "filename"))
+        cones = max(len(window.cones), 1)
+        return {
+            "python_bytes": int(allocated),
+            "python_bytes_per_cone": allocated / cones,
+            "canvas_items_per_cone": (len(self.canvas.find_all()) - items_before) / cones
+        }
+
+    def run_generation(self, image_size):
+        """Time the GENERATE panel on a synthetic track image."""
+        path = os.path.join(self.directory, f"track_{image_size}.png")
+        synthetic_track_image(path, image_size)
+        frame = self.window.generate_tool_frame
+        frame.selected_image_path = path
+
+        def generate():
+            frame.generate_cones()
+            self.settle()
+
+        result = {"generate_s": measure(generate, self.repeat), "cones": len(self.window.cones)}
+        self.window.clear_canvas()
+        self.settle()
+        return result
+
+
+def git_commit():
+    """Commit hash of the working tree, None outside of a git checkout."""
+    try:
+        output = subprocess.run(["git", "rev-parse", "HEAD"], capture_output=True, text=True, check=True,
+                                cwd=os.path.dirname(os.path.abspath(__file__)))
+    except (OSError, subprocess.CalledProcessError):
+        return None
+    return output.stdout.strip()
+
+
+def start_virtual_display():
+    """
+    Start an Xvfb server if no display is available.
+
+    Returns:
+        subprocess.Popen: The server process, None if a display is already set
+    """
+    if os.environ.get("DISPLAY") or sys.platform in ("win32", "darwin"):
+        return None
+    if shutil.which("Xvfb") is None:
+        raise RuntimeError("No display and no Xvfb found, run under xvfb-run or install Xvfb")
+    read_fd, write_fd = os.pipe()
+    # Xvfb picks a free display number and writes it to the given file descriptor
+    server = subprocess.Popen(["Xvfb", "-displayfd", str(write_fd), "-screen", "0", "1920x1080x24", "-nolisten", "tcp"],
+                              pass_fds=(write_fd,), stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    os.close(write_fd)
+    with os.fdopen(read_fd) as display:
+        number = display.readline().strip()
+    if not number:
+        server.terminate()
+        raise RuntimeError("Xvfb did not start")
+    os.environ["DISPLAY"] = f":{number}"
+    return server
+
+
+def compare(results, baseline):
+    """
+    Print the change of the median timings against an earlier result file.
+
+    Args:
+        results: Result dictionary of this run
+        baseline: Result dictionary of an earlier run
+    """
+    def timings(data):
+        values = {}
+        for group in ("tracks", "generation"):
+            for size, entry in data.get(group, {}).items():
+                for name, value in entry.items():
+                    if isinstance(value, dict) and "median" in value:
+                        values[f"{group}/{size}/{name}"] = value["median"]
+                    elif isinstance(value, dict) and "p95_ms" in value:
+                        values[f"{group}/{size}/{name}_p95"] = value["p95_ms"] / 1000.0
+        return values
+
+    current, previous = timings(results), timings(baseline)
+    for name in sorted(current.keys() & previous.keys()):
+        ratio = current[name] / previous[name] if previous[name] > 0 else float("inf")
+        print(f"{name:<40}{previous[name] * 1000:10.1f} ms{current[name] * 1000:10.1f} ms{(ratio - 1) * 100:+8.1f} %", file=sys.stderr)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the track builder on synthetic tracks.")
+    parser.add_argument("--sizes", type=int, nargs="+", default=list(SIZES), help="cone counts of the synthetic tracks")
+    parser.add_argument("--image-sizes", type=int, nargs="*", default=list(IMAGE_SIZES), help="edge lengths of the generation images in pixels")
+    parser.add_argument("--repeat", type=int, default=3, help="runs of every timed operation")
+    parser.add_argument("--events", type=int, default=100, help="mouse events of the pan and zoom sequences")
+    parser.add_argument("--output", default=None, help="JSON result file (default: standard output)")
+    parser.add_argument("--baseline", default=None, help="earlier JSON result file to compare the median timings with")
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.WARNING, format="%(message)s")
+
+    server = start_virtual_display()
+    try:
+        # imported after the display is set up, customtkinter queries it on import
+        from TrackBuilder import Window
+
+        window = Window()
+        window.geometry("1920x1080")
+        # wait until the canvas has its size and the initial view
+        while not hasattr(window.placing_canvas, "offset_x"):
+            window.update()
+
+        results = {
+            "commit": git_commit(),
+            "timestamp": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "repeat": args.repeat,
+            "tracks": {},
+            "generation": {}
+        }
+        with tempfile.TemporaryDirectory() as directory:
+            benchmark = Benchmark(window, directory, args.repeat, args.events)
+            for size in args.sizes:
+                print(f"track with {size} cones", file=sys.stderr)
+                results["tracks"][str(size)] = benchmark.run_track(size)
+            for size in args.image_sizes:
+                print(f"generation from {size}x{size} image", file=sys.stderr)
+                results["generation"][str(size)] = benchmark.run_generation(size)
+        window.destroy()
+    finally:
+        if server is not None:
+            server.terminate()
+
+    text = json.dumps(results, indent=2)
+    if args.output:
+        with open(args.output, "w") as file:
+            file.write(text + "\n")
+    else:
+        print(text)
+
+    if args.baseline:
+        with open(args.baseline) as file:
+            compare(results, json.load(file))
+
+
+if __name__ == "__main__":
+    main()
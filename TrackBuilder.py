@@ -4,17 +4,44 @@ from customtkinter import *
 from svgpathtools import svg2paths2
 import os
 from tkinter import filedialog
-from tkinter import PhotoImage
+from tkinter import PhotoImage, TclError
 from PIL import Image, ImageTk
+import functools
 import math
 import sys
+import argparse
+import logging
+import numpy as np
 from pathlib import Path
 
 from ui_components import TrackCanvas
 from ui_components import CanvasObjects
-from ui_components.ToolFrame import ToolFrame, GenerateFrame, DragAndDropFrame
+from ui_components.TrackValidation import LiveValidation
+from ui_components.TrackMetrics import compute_track_metrics
+from ui_components.RacingLine import racing_line_from_cones
+from ui_components.PerceptionSim import PerceptionSimulator
+from ui_components.TrajectoryLayer import TrajectoryLayer, load_trajectory
+from ui_components.TrackDiff import DiffLayer, diff_tracks, diff_summary
+from ui_components.Georeference import import_survey
+from ui_components.OrthophotoLayer import OrthophotoLayer, TilePyramid, read_world_file
+from ui_components.PointCloudLayer import PointCloudLayer, VoxelPyramid, load_point_cloud
+from ui_components.OccupancyGrid import export_occupancy_grid
+from ui_components.LiveLink import LiveLinkServer
+from ui_components.SharedTrack import SharedTrackWriter
+from ui_components.UndoHistory import CommandHistory
+from ui_components.PerformanceHUD import timed
+from ui_components.Tracing import TRACER, TRACE_ENV, traced
+from ui_components.MemoryReport import MemoryReport
+from ui_components.Selection import SelectionTool
+from ui_components.BrushTool import BrushTool
+from ui_components.BoundaryTools import ConePreviewLayer, boundary_chains, respace_boundaries, simplify_boundaries
+from ui_components.ConeClipboard import cones_to_text, cones_from_text, linear_array, circular_array, parse_array_spec, MAX_ARRAY_CONES
+from ui_components.TrackGeometry import order_track, track_centerline, centerline_to_list, cones_to_arrays, compute_centerline, SpatialHash, find_duplicate_clusters, merge_duplicates, skip_duplicates
+from ui_components.ToolFrame import ToolFrame, GenerateFrame, DragAndDropFrame, MetricsFrame, TrajectoryFrame, SelectionFrame, BoundaryFrame
 
 BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+
+logger = logging.getLogger(__name__)
     
 class Window(CTk):
     """
@@ -48,6 +75,15 @@ class Window(CTk):
         self.drag_drop_tool_visible = False
         self.generate_tool_visible = False
 
+        # track metrics panel
+        self.metrics_frame = MetricsFrame(self)
+        self.trajectory_frame = TrajectoryFrame(self)
+        self.selection_frame = SelectionFrame(self)
+        self.boundary_frame = BoundaryFrame(self)
+        self.trajectory_layer = None
+        # geodetic origin of tracks imported from surveys, stored with the track
+        self.georeference = None
+
         # main tool frame
         self.tool_frame = ToolFrame(self, self.placing_canvas)
         self.tool_frame.place(relx=1.0, rely=0.0, anchor="ne", x=-30, y=30)
@@ -59,6 +95,50 @@ class Window(CTk):
         self.current_tool = None
         self.car = None
 
+        # callbacks notified about every change of the track (see track_changed)
+        self.track_listeners = []
+        self.live_validation = None
+        # results derived from the track, dropped by invalidate_track_caches
+        self.centerline = None
+        self.track_metrics = None
+        self.racing_line = None
+        self.centerline_visible = False
+        self.racing_line_visible = False
+        self.metrics_visible = False
+        self.track_views_update = None
+        self.track_listeners.append(self.invalidate_track_caches)
+
+        # cones within this distance (meters) count as duplicates; placement either refuses or merges them
+        self.duplicate_radius = 0.1
+        self.duplicate_policy = "refuse"
+        self.cone_hash = SpatialHash(self.duplicate_radius * self.scale)
+        self.track_listeners.append(self.update_cone_hash)
+
+        # undo/redo of all track changes (Ctrl+Z / Ctrl+Y on the canvas)
+        self.history = CommandHistory(self)
+        self.track_listeners.append(self.history.on_track_changed)
+
+        # rubber-band selection and bulk transforms of cones
+        self.selection = SelectionTool(self)
+        self.track_listeners.append(self.selection.on_track_changed)
+        # freehand painting of cones along a mouse stroke
+        self.brush = BrushTool(self)
+        # tools that handle the mouse events of the canvas themselves
+        self.interactive_tools = {"select": self.selection, "brush": self.brush}
+
+        # proposed boundary edit shown by preview_boundaries: (mode, cones, result)
+        self.boundary_edit = None
+        self.boundary_tool_visible = False
+        self.track_listeners.append(self.discard_boundary_preview)
+
+        # memory accounting of the window, compared between reports to flag leaks (F5)
+        self.memory = MemoryReport(self)
+
+        # optional socket server publishing track changes to a simulator (see start_live_link)
+        self.live_link = None
+        # optional shared memory block holding the cone arrays (see start_shared_memory)
+        self.shared_track = None
+
         # ensure frames are on top of canvas
         self.drag_drop_tool_frame.lift()
         self.generate_tool_frame.lift()
@@ -73,13 +153,15 @@ class Window(CTk):
         """
 
         self.current_tool = tool
+        if tool != "select" and hasattr(self, 'selection'):
+            self.selection.clear()
         
         '''
         # log the tool change for debugging
         if tool:
-            print(f"Selected tool: {tool}")
+            logger.debug(f"Selected tool: {tool}")
         else:
-            print("Tool selection cleared")
+            logger.debug("Tool selection cleared")
         '''
         
         # if a specific tool is selected, ensure the drag and drop frame is visible
@@ -94,21 +176,689 @@ class Window(CTk):
                 elif tool == "car":
                     self.drag_drop_tool_frame.place_car()
 
-    def save_track(self):
+    def selection_changed(self, count):
         """
-        Saves the track to a YAML file.
-        If no file is selected, a dialog will prompt the user to select a file.
+        Show the transform frame while cones are selected.
+        
+        Args:
+            count: Number of selected cones
+        """
+        if count:
+            self.selection_frame.show_count(count)
+            self.selection_frame.place(relx=0.0, rely=1.0, anchor="sw", x=30, y=-20)
+            self.selection_frame.lift()
+        else:
+            self.selection_frame.place_forget()
 
+    def track_changed(self, change, canvas_object):
         """
-        if not hasattr(self, 'cones'):
+        Notify all registered listeners about a change of the track.
+        
+        Args:
+            change: Kind of change ('add', 'move', 'rotate', 'delete' or 'clear'),
+                    'add_many' and 'delete_many' for a batch of cones (see add_cones)
+            canvas_object: The changed Cone or Car, the list of cones of a batch, None for 'clear'
+        """
+        for listener in list(self.track_listeners):
+            listener(change, canvas_object)
+
+    def toggle_validation(self):
+        """
+        Toggle the live track validation. Offending cones are highlighted on the canvas
+        and re-checked while they are dragged.
+        
+        Returns:
+            bool: Whether the validation is active after toggling
+        """
+        if self.live_validation is None:
+            self.live_validation = LiveValidation(self)
+
+        if self.live_validation.active:
+            self.live_validation.stop()
+        else:
+            self.live_validation.start()
+        return self.live_validation.active
+
+    def update_cone_hash(self, change, canvas_object):
+        """
+        Keep the spatial hash of the cones in sync with the track.
+        
+        Args:
+            change: Kind of change
+            canvas_object: The changed Cone or Car, None for 'clear'
+        """
+        if change == "clear":
+            self.cone_hash.clear()
+        elif change == "add_many":
+            for cone in canvas_object:
+                self.cone_hash.insert(cone, cone.position_x, cone.position_y)
+        elif change == "delete_many":
+            for cone in canvas_object:
+                self.cone_hash.remove(cone)
+        elif isinstance(canvas_object, CanvasObjects.Car):
+            return
+        elif change == "delete":
+            self.cone_hash.remove(canvas_object)
+        elif change in ("add", "move"):
+            self.cone_hash.insert(canvas_object, canvas_object.position_x, canvas_object.position_y)
+
+    def find_duplicate_cone(self, x, y):
+        """
+        Find an existing cone within the duplicate radius of a position.
+        
+        Args:
+            x: X position in logical coordinates
+            y: Y position in logical coordinates
+            
+        Returns:
+            Cone: The closest cone within the radius, None if there is none
+        """
+        found = self.cone_hash.query(x, y, self.duplicate_radius * self.scale)
+        return found[0][1] if found else None
+
+    def set_duplicate_radius(self, radius):
+        """
+        Change the duplicate radius and rebuild the spatial hash for it.
+        
+        Args:
+            radius: New duplicate radius in meters
+        """
+        self.duplicate_radius = radius
+        self.cone_hash = SpatialHash(radius * self.scale)
+        for cone in self.cones:
+            self.cone_hash.insert(cone, cone.position_x, cone.position_y)
+
+    def count_duplicate_cones(self):
+        """
+        Returns the number of cones that would be removed by deduplicate_cones.
+        """
+        positions, types = cones_to_arrays(self.cones, self.scale)
+        labels = find_duplicate_clusters(positions, self.duplicate_radius, types)
+        return len(labels) - len(np.unique(labels))
+
+    def set_georeference(self, georeference):
+        """
+        Changes the geographic origin of the track, as a step of the undo history.
+        
+        Args:
+            georeference: 'georeference' section of the track files, None for local coordinates
+        """
+        if georeference == self.georeference:
+            return
+        if hasattr(self, 'history'):
+            self.history.on_georeference_changed(self.georeference, georeference)
+        self.georeference = georeference
+
+    def add_cones(self, positions, cone_types):
+        """
+        Places many cones in one batch, snapped to the grid. Positions on existing cones
+        or on earlier positions of the batch are skipped. The cones are registered with
+        one 'add_many' notification.
+        
+        Args:
+            positions: (N, 2) array of positions in logical coordinates
+            cone_types: Cone type of every position
+            
+        Returns:
+            list: The placed cones
+        """
+        canvas = self.placing_canvas
+        step = canvas.logic_grid_step
+        radius = self.duplicate_radius * self.scale
+        positions = np.round(np.asarray(positions, dtype=float).reshape(-1, 2) / step) * step
+        if not len(positions):
+            return []
+
+        existing = np.array([(cone.position_x, cone.position_y) for cone in self.cones], dtype=float).reshape(-1, 2)
+        keep = skip_duplicates(positions, radius, existing)
+
+        placed = [CanvasObjects.Cone(canvas, cone_type, x, y, register=False)
+                  for (x, y), cone_type, kept in zip(positions.tolist(), cone_types, keep.tolist()) if kept]
+        self.register_cones(placed)
+        logger.info(f"Placed {len(placed)} cones")
+        return placed
+
+    def register_cones(self, cones):
+        """
+        Adds drawn cones that are not on the track yet, with one 'add_many' notification.
+        
+        Args:
+            cones: Cones created or restored with register=False
+        """
+        if cones:
+            self.cones.extend(cones)
+            self.track_changed("add_many", cones)
+
+    def restore_cones(self, cones):
+        """
+        Puts deleted cones back onto the canvas in one batch (see Cone.restore).
+        
+        Args:
+            cones: Deleted cones
+        """
+        for cone in cones:
+            cone.restore(register=False)
+        self.register_cones(cones)
+
+    def remove_cones(self, cones):
+        """
+        Deletes many cones in one pass with one 'delete_many' notification.
+        The cone list is rebuilt from a keep-mask instead of removing the cones one by one.
+        
+        Args:
+            cones: Cones on the track to delete
+        """
+        removed = set(cones)
+        keep = [cone not in removed for cone in self.cones]
+        cones = [cone for cone, kept in zip(self.cones, keep) if not kept]
+        if not cones:
             return
+        self.placing_canvas.delete(*[cone.id for cone in cones])
+        for cone in cones:
+            # the frames are kept, so that the cones can be restored by undo
+            cone.hide_info_frame()
+        self.cones[:] = [cone for cone, kept in zip(self.cones, keep) if kept]
+        self.track_changed("delete_many", cones)
 
+    def toggle_boundary_tool(self):
+        """
+        Show or hide the frame for re-spacing and simplifying the boundaries.
+        """
+        self.boundary_tool_visible = not self.boundary_tool_visible
+        if self.boundary_tool_visible:
+            self.boundary_frame.place(relx=0.0, rely=1.0, anchor="sw", x=30, y=-90)
+            self.boundary_frame.lift()
+        else:
+            self.cancel_boundaries()
+            self.boundary_frame.place_forget()
+
+    def preview_boundaries(self, mode, value):
+        """
+        Computes a re-spaced or simplified version of the blue and yellow boundaries
+        and shows it on the canvas until it is applied or cancelled.
+        
+        Args:
+            mode: 'resample' to re-space the cones uniformly, 'simplify' to drop redundant cones
+            value: Cone spacing for 'resample', largest lateral error for 'simplify' (meters)
+            
+        Returns:
+            tuple: (current cone count, proposed cone count) of the boundaries
+        """
+        self.cancel_boundaries()
+        cones = [cone for cone in self.cones if cone.cone_type in ("blue", "yellow")]
+        positions, types = cones_to_arrays(cones, self.scale)
+        pose = self.get_car_pose()
+        chains = boundary_chains(positions, types, pose[:2] if pose else None)
+
+        if mode == "resample":
+            result = respace_boundaries(positions, chains, value)
+            proposed, proposed_types = result
+        else:
+            result = simplify_boundaries(positions, chains, value)
+            proposed, proposed_types = positions[result], types[result].tolist()
+        lines = [(positions[order], closed) for order, closed in chains.values()]
+
+        self.placing_canvas.layers["boundary_preview"] = ConePreviewLayer(self.placing_canvas, proposed, proposed_types, lines, self.scale)
+        self.boundary_edit = (mode, cones, result)
+        return len(cones), len(proposed)
+
+    def apply_boundaries(self):
+        """
+        Replaces the boundaries with the previewed version, as one undo step.
+        """
+        if self.boundary_edit is None:
+            return
+        mode, cones, result = self.boundary_edit
+        self.cancel_boundaries()
+        if mode == "resample":
+            self.remove_cones(cones)
+            positions, cone_types = result
+            self.add_cones(positions * self.scale, cone_types)
+        else:
+            keep = np.zeros(len(cones), dtype=bool)
+            keep[result] = True
+            self.remove_cones([cone for cone, kept in zip(cones, keep.tolist()) if not kept])
+            logger.info(f"Removed {len(cones) - int(keep.sum())} cones")
+
+    def cancel_boundaries(self):
+        """
+        Removes the boundary preview without changing the track.
+        """
+        if "boundary_preview" in self.placing_canvas.layers:
+            self.placing_canvas.layers.pop("boundary_preview").remove()
+        self.boundary_edit = None
+
+    def discard_boundary_preview(self, change, canvas_object):
+        """
+        Cancel a shown boundary preview after any change of the track, since it was
+        computed from the cones and car at the time of the preview.
+        
+        Args:
+            change: Kind of change
+            canvas_object: The changed Cone or Car, None for 'clear'
+        """
+        if self.boundary_edit is None:
+            return
+        self.cancel_boundaries()
+        self.boundary_frame.title_var.set("BOUNDARIES")
+
+    def copy_selection(self):
+        """
+        Copies the selected cones to the clipboard as text, which other TrackBuilder windows can paste.
+        """
+        cones = list(self.selection.selected)
+        if not cones:
+            return
+        positions = np.array([(cone.position_x, cone.position_y) for cone in cones], dtype=float) / self.scale
+        self.clipboard_clear()
+        self.clipboard_append(cones_to_text(positions, [cone.cone_type for cone in cones]))
+        logger.info(f"Copied {len(cones)} cones")
+
+    def paste_cones(self):
+        """
+        Pastes cones from the clipboard, centered at the mouse pointer or at the center of the view.
+        """
+        try:
+            positions, cone_types = cones_from_text(self.clipboard_get())
+        except (TclError, ValueError) as e:
+            logger.warning(f"Nothing to paste: {e}")
+            return
+        known = np.array([cone_type in ("blue", "yellow", "red") for cone_type in cone_types], dtype=bool)
+        if not known.all():
+            logger.warning(f"Skipped {int((~known).sum())} pasted cones of unknown type")
+            positions = positions[known]
+            cone_types = [cone_type for cone_type, keep in zip(cone_types, known) if keep]
+        if not len(positions):
+            return
+
+        canvas = self.placing_canvas
+        x = canvas.winfo_pointerx() - canvas.winfo_rootx()
+        y = canvas.winfo_pointery() - canvas.winfo_rooty()
+        if not (0 <= x < canvas.winfo_width() and 0 <= y < canvas.winfo_height()):
+            x, y = canvas.winfo_width() / 2, canvas.winfo_height() / 2
+        target = np.array(canvas.to_logic_coords(x, y))
+
+        positions = positions * self.scale
+        placed = self.add_cones(positions - positions.mean(axis=0) + target, cone_types)
+        if self.current_tool == "select":
+            self.selection.select(placed)
+
+    def array_selection(self, spec=None):
+        """
+        Replicates the selected cones along a vector or around a pivot (see ConeClipboard.parse_array_spec).
+        All copies are placed in one batch.
+        
+        Args:
+            spec: 'count dx dy' or 'count angle pivot_x pivot_y' in meters and degrees, asks if None (default: None)
+        """
+        cones = list(self.selection.selected)
+        if not cones:
+            return
+        if spec is None:
+            spec = CTkInputDialog(text="Copies along a vector: count dx dy\nCopies around a pivot: count angle pivot_x pivot_y", title="Array").get_input()
+        if not spec:
+            return
+        try:
+            array = parse_array_spec(spec)
+        except ValueError as e:
+            logger.error(f"Error in array specification: {e}")
+            return
+        if array[1] * len(cones) > MAX_ARRAY_CONES:
+            logger.error(f"Array of {array[1] * len(cones)} cones exceeds the limit of {MAX_ARRAY_CONES}")
+            return
+
+        positions = np.array([(cone.position_x, cone.position_y) for cone in cones], dtype=float) / self.scale
+        if array[0] == "linear":
+            copies = linear_array(positions, array[1], array[2])
+        else:
+            copies = circular_array(positions, array[1], array[2], array[3])
+        placed = self.add_cones(copies * self.scale, [cone.cone_type for cone in cones] * array[1])
+        self.selection.select(placed, additive=True)
+
+    def deduplicate_cones(self):
+        """
+        Merge clusters of near-duplicate cones of the same type into one cone at their mean position.
+        
+        Returns:
+            int: Number of removed cones
+        """
+        cones = list(self.cones)
+        positions, types = cones_to_arrays(cones, self.scale)
+        keep, merged = merge_duplicates(positions, self.duplicate_radius, types)
+        if len(keep) == len(cones):
+            return 0
+
+        kept = np.zeros(len(cones), dtype=bool)
+        kept[keep] = True
+        self.remove_cones([cone for cone, flag in zip(cones, kept.tolist()) if not flag])
+        for index, (x, y) in zip(keep, merged):
+            cone = cones[index]
+            if (x, y) != (positions[index, 0], positions[index, 1]):
+                cone.move(x * self.scale, y * self.scale)
+
+        removed = len(cones) - len(keep)
+        logger.info(f"Removed {removed} duplicate cones")
+        return removed
+
+    def get_car_pose(self):
+        """
+        Returns the car pose in meters and degrees, None if no car is placed.
+        """
+        if not self.car:
+            return None
+        return self.car.position_x / self.scale, self.car.position_y / self.scale, self.car.yaw_angle
+
+    def show_centerline(self, visible: bool):
+        """
+        Show or hide the centerline overlay. While visible, the overlay is
+        redrawn once per idle cycle after the track changed.
+        
+        Args:
+            visible: Whether the centerline should be displayed
+        """
+        self.centerline_visible = visible
+        if visible:
+            self.refresh_track_views()
+        else:
+            self.placing_canvas.remove_overlay("centerline")
+
+    def show_racing_line(self, visible: bool):
+        """
+        Show or hide the minimum-curvature racing line overlay.
+        
+        Args:
+            visible: Whether the racing line should be displayed
+        """
+        self.racing_line_visible = visible
+        if visible:
+            self.refresh_track_views()
+        else:
+            self.placing_canvas.remove_overlay("racing_line")
+
+    def show_metrics(self, visible: bool):
+        """
+        Show or hide the track metrics panel next to the main toolbar.
+        
+        Args:
+            visible: Whether the metrics panel should be displayed
+        """
+        self.metrics_visible = visible
+        if visible:
+            self.metrics_frame.place(relx=0.0, rely=0.1, anchor="nw", x=30, y=50)
+            self.metrics_frame.lift()
+            self.refresh_track_views()
+        else:
+            self.metrics_frame.place_forget()
+
+    def load_trajectory(self, file_name=None):
+        """
+        Load a recorded trajectory (.npy or .csv) and overlay it on the canvas.
+        
+        Args:
+            file_name: Path of the log, asks for a file if None (default: None)
+        """
+        if file_name is None:
+            file_name = filedialog.askopenfilename(title="Select Trajectory Log",
+                                                   filetypes=(("Trajectory logs", "*.npy *.csv"), ("All files", "*.*")))
+        if not file_name:
+            return
+
+        try:
+            points = load_trajectory(file_name)
+        except (OSError, ValueError) as error:
+            logger.error(f"Could not load trajectory: {error}")
+            return
+
+        self.remove_trajectory()
+        self.trajectory_layer = TrajectoryLayer(self.placing_canvas, points, self.scale)
+        self.placing_canvas.layers["trajectory"] = self.trajectory_layer
+        self.trajectory_layer.redraw()
+        self.trajectory_frame.show_trajectory(os.path.basename(file_name), len(points))
+        self.trajectory_frame.place(relx=0.5, rely=1.0, anchor="s", y=-20)
+        self.trajectory_frame.lift()
+        logger.info(f"Trajectory loaded with {len(points)} samples")
+
+    def scrub_trajectory(self, index):
+        """
+        Move the trajectory marker to a sample of the log.
+        
+        Args:
+            index: Sample index
+        """
+        if self.trajectory_layer is not None:
+            self.trajectory_layer.set_marker(index)
+
+    def remove_trajectory(self):
+        """Remove the trajectory overlay and hide its panel."""
+        if self.trajectory_layer is None:
+            return
+        self.trajectory_layer.remove()
+        self.placing_canvas.layers.pop("trajectory", None)
+        self.trajectory_layer = None
+        self.trajectory_frame.place_forget()
+
+    def toggle_orthophoto(self, file_name=None, meters_per_pixel=None):
+        """
+        Toggle an orthophoto as the canvas background.
+        The image is placed by its world file (.jgw/.pgw/.tfw) if there is one,
+        otherwise its upper left corner is placed at the origin.
+        
+        Args:
+            file_name: Path of the image, asks for a file if None (default: None)
+            meters_per_pixel: Ground resolution without world file, asks if None (default: None)
+            
+        Returns:
+            bool: Whether an orthophoto is shown
+        """
+        if "orthophoto" in self.placing_canvas.layers:
+            self.placing_canvas.layers.pop("orthophoto").remove()
+            return False
+
+        if file_name is None:
+            file_name = filedialog.askopenfilename(title="Select Orthophoto", filetypes=(("Images", "*.jpg *.jpeg *.png *.tif *.tiff"), ("All files", "*.*")))
+        if not file_name:
+            return False
+
+        placement = read_world_file(file_name)
+        if placement is None:
+            if meters_per_pixel is None:
+                value = CTkInputDialog(text="No world file found.\nMeters per pixel:", title="Orthophoto").get_input()
+                try:
+                    meters_per_pixel = float(value)
+                except (TypeError, ValueError):
+                    return False
+            placement = (0.0, 0.0, meters_per_pixel)
+
+        # cutting the tiles of a new image takes seconds, the layer builds the pyramid on a worker thread
+        layer = OrthophotoLayer(self.placing_canvas, functools.partial(TilePyramid, file_name, placement[:2], placement[2]),
+                                self.scale, on_error=self.orthophoto_failed)
+        self.placing_canvas.layers["orthophoto"] = layer
+        return True
+
+    def orthophoto_failed(self, error):
+        """
+        Remove the orthophoto layer after its tile pyramid could not be built.
+        
+        Args:
+            error: The exception raised while building the pyramid
+        """
+        logger.error(f"Error loading orthophoto: {error}")
+        if "orthophoto" in self.placing_canvas.layers:
+            self.placing_canvas.layers.pop("orthophoto").remove()
+        self.tool_frame.orthophoto_button.configure(border_color="#141414")
+
+    def toggle_point_cloud(self, file_name=None):
+        """
+        Toggle a point cloud map (PLY or PCD) under the cones.
+        
+        Args:
+            file_name: Path of the point cloud, asks for a file if None (default: None)
+            
+        Returns:
+            bool: Whether a point cloud is shown
+        """
+        if "pointcloud" in self.placing_canvas.layers:
+            self.placing_canvas.layers.pop("pointcloud").remove()
+            return False
+
+        if file_name is None:
+            file_name = filedialog.askopenfilename(title="Select Point Cloud", filetypes=(("Point clouds", "*.ply *.pcd"), ("All files", "*.*")))
+        if not file_name:
+            return False
+
+        try:
+            pyramid = VoxelPyramid(load_point_cloud(file_name))
+        except (OSError, ValueError, KeyError) as e:
+            logger.error(f"Error loading point cloud: {e}")
+            return False
+        logger.info(f"Point cloud loaded with {pyramid.point_count} points in {len(pyramid.levels[0][1])} voxels")
+
+        layer = PointCloudLayer(self.placing_canvas, pyramid, self.scale)
+        self.placing_canvas.layers["pointcloud"] = layer
+        layer.redraw()
+        return True
+
+    def toggle_diff(self, file_name=None):
+        """
+        Toggle the diff overlay between a track file and the current track.
+        
+        Args:
+            file_name: Path of the track file to compare with, asks for a file if None (default: None)
+            
+        Returns:
+            bool: Whether the diff overlay is shown
+        """
+        if "diff" in self.placing_canvas.layers:
+            self.placing_canvas.layers.pop("diff").remove()
+            return False
+
+        if file_name is None:
+            file_name = filedialog.askopenfilename(title="Select Track File to Compare", filetypes=(("YAML files", "*.yaml"), ("All files", "*.*")))
+        if not file_name:
+            return False
+
+        diff = diff_tracks(self.open_yaml_file(file_name) or {}, self.get_track_data())
+        self.placing_canvas.layers["diff"] = DiffLayer(self.placing_canvas, diff, self.scale)
+        logger.info(f"Changes from {os.path.basename(file_name)}:\n{diff_summary(diff)}")
+        return True
+
+    def invalidate_track_caches(self, change, canvas_object):
+        """
+        Drop cached results derived from the track after a change.
+        The metrics only depend on the cones and survive changes of the car.
+        
+        Args:
+            change: Kind of change
+            canvas_object: The changed Cone or Car, None for 'clear'
+        """
+        self.centerline = None
+        self.racing_line = None
+        if not isinstance(canvas_object, CanvasObjects.Car):
+            self.track_metrics = None
+
+        if (self.centerline_visible or self.racing_line_visible or self.metrics_visible) and self.track_views_update is None:
+            self.track_views_update = self.after_idle(self.refresh_track_views)
+
+    def get_centerline(self):
+        """
+        Returns the centerline of the current cones (see TrackGeometry.compute_centerline),
+        computed once per track state. None if no centerline can be formed.
+        """
+        if self.centerline is None:
+            positions, types = cones_to_arrays(self.cones, self.scale)
+            start = heading = None
+            pose = self.get_car_pose()
+            if pose:
+                start = pose[:2]
+                heading = (math.cos(math.radians(pose[2])), math.sin(math.radians(pose[2])))
+            self.centerline = compute_centerline(positions[types == "blue"], positions[types == "yellow"], start, heading)
+        return self.centerline
+
+    def get_track_metrics(self):
+        """
+        Returns the metrics of the current layout (see TrackMetrics.compute_track_metrics),
+        computed once per cone state. None if no centerline can be formed.
+        """
+        if self.track_metrics is None:
+            centerline = self.get_centerline()
+            if centerline is None:
+                return None
+            positions, types = cones_to_arrays(self.cones, self.scale)
+            self.track_metrics = compute_track_metrics(centerline, positions[types == "blue"], positions[types == "yellow"])
+        return self.track_metrics
+
+    def get_racing_line(self):
+        """
+        Returns the minimum-curvature racing line of the current cones
+        (see RacingLine.racing_line_from_cones), computed once per track state.
+        None if no racing line can be computed.
+        """
+        if self.racing_line is None:
+            centerline = self.get_centerline()
+            if centerline is None:
+                return None
+            positions, types = cones_to_arrays(self.cones, self.scale)
+            self.racing_line = racing_line_from_cones(centerline, positions[types == "blue"], positions[types == "yellow"])
+        return self.racing_line
+
+    def simulate_perception(self, poses=None, sensor=None, seed=None):
+        """
+        Simulate sensor observations of the current cones (see PerceptionSim.PerceptionSimulator).
+        
+        Args:
+            poses: (F, 3) array of (x, y, yaw) poses in meters and degrees (default: current car pose)
+            sensor: PerceptionSim.SensorModel to simulate (default: lidar with default noise)
+            seed: Seed of the random generator (default: None)
+            
+        Returns:
+            dict: Result of PerceptionSimulator.observe_batch, None if there is no pose
+        """
+        if poses is None:
+            pose = self.get_car_pose()
+            if pose is None:
+                return None
+            poses = [pose]
+        positions, types = cones_to_arrays(self.cones, self.scale)
+        return PerceptionSimulator(positions, types, sensor, seed).observe_batch(poses)
+
+    def refresh_track_views(self):
+        """Redraw the centerline and racing line overlays and the metrics panel if they are visible."""
+        self.track_views_update = None
+
+        if self.centerline_visible:
+            centerline = self.get_centerline()
+            if centerline is None:
+                self.placing_canvas.remove_overlay("centerline")
+            else:
+                points = centerline["points"]
+                if centerline["closed"]:
+                    points = np.vstack([points, points[:1]])
+                self.placing_canvas.draw_overlay("centerline", points * self.scale, fill="#7A4315", width=2, dash=(6, 4))
+
+        if self.racing_line_visible:
+            racing_line = self.get_racing_line()
+            if racing_line is None:
+                self.placing_canvas.remove_overlay("racing_line")
+            else:
+                points = racing_line["points"]
+                if racing_line["closed"]:
+                    points = np.vstack([points, points[:1]])
+                self.placing_canvas.draw_overlay("racing_line", points * self.scale, fill="#C61818", width=2)
+
+        if self.metrics_visible:
+            self.metrics_frame.show_metrics(self.get_track_metrics())
+
+    def get_track_data(self):
+        """
+        Collects the current track in the format of the YAML track files.
+
+        Returns:
+            dict: Track dictionary with 'cones_left', 'cones_right' and 'starting_pose' in meters
+        """
         cones_left = []
         cones_right = []
         starting_pose = []
 
-        scale = self.placing_canvas.grid_size / self.placing_canvas.logic_grid_step
-
         for cone in self.cones:
             # convert coordinates to meters and ensure they are simple float values
             x = float(cone.position_x/self.scale)
@@ -136,30 +886,193 @@ class Window(CTk):
             "cones_right": cones_right,
             "starting_pose": starting_pose
         }
+        if self.georeference:
+            track_data["georeference"] = dict(self.georeference)
+        return track_data
+
+    @traced("save_track")
+    def save_track(self, order_cones=None, export_centerline=None):
+        """
+        Saves the track to a YAML file.
+        If no file is selected, a dialog will prompt the user to select a file.
+
+        Args:
+            order_cones: Whether to order the cones of each boundary into a chain
+                         starting at the car, None uses the toolbar option (default: None)
+            export_centerline: Whether to add the 'centerline' section, None uses
+                               the toolbar option (default: None)
+        """
+        if not hasattr(self, 'cones'):
+            return
+
+        track_data = self.get_track_data()
+
+        if order_cones is None:
+            order_cones = self.tool_frame.order_cones_var.get()
+        if order_cones:
+            with TRACER.span("order_track"):
+                track_data = order_track(track_data)
+
+        if export_centerline is None:
+            export_centerline = self.tool_frame.centerline_var.get()
+        if export_centerline:
+            with TRACER.span("track_centerline"):
+                centerline = track_centerline(track_data)
+            if centerline is not None:
+                track_data["centerline"] = centerline_to_list(centerline)
 
         if self.current_file:
-            with open(self.current_file, "w") as file:
+            with TRACER.span("write_yaml", cones=len(self.cones)), open(self.current_file, "w") as file:
                 yaml.dump(track_data, file, default_flow_style=False, indent=2)
-            print("Track saved successfully! with the name: " + self.current_file)
+            logger.info("Track saved successfully! with the name: " + self.current_file)
         else:
             file_name = filedialog.asksaveasfilename(title="Save Track File", defaultextension=".yaml", initialfile="trackdraft",
                                                      filetypes=(("YAML files", "*.yaml"), ("All files", "*.*")))
             if file_name:
                 self.current_file = file_name
-                with open(self.current_file, "w") as file:
+                with TRACER.span("write_yaml", cones=len(self.cones)), open(self.current_file, "w") as file:
                     yaml.dump(track_data, file, default_flow_style=False, indent=2)
-                print("Track saved successfully! with the name: " + self.current_file)
+                logger.info("Track saved successfully! with the name: " + self.current_file)
 
         self.tool_frame.current_file_name.set(os.path.basename(self.current_file))
 
+    def export_occupancy_grid(self, file_name=None, resolution=0.05, boundaries=True):
+        """
+        Exports the occupancy grid of the current track as PGM image with map_server YAML metadata
+        (see OccupancyGrid.export_occupancy_grid).
+
+        Args:
+            file_name: Path of the YAML file, asks for a file if None (default: None)
+            resolution: Edge length of a cell in meters (default: 0.05)
+            boundaries: Whether to draw lines between neighbouring boundary cones (default: True)
+        """
+        if not self.cones:
+            logger.warning("No cones to export")
+            return
+
+        if file_name is None:
+            file_name = filedialog.asksaveasfilename(title="Export Occupancy Grid", defaultextension=".yaml", initialfile="map",
+                                                     filetypes=(("YAML files", "*.yaml"), ("All files", "*.*")))
+        if not file_name:
+            return
+
+        export_occupancy_grid(self.get_track_data(), file_name, resolution, boundaries=boundaries)
+        logger.info("Occupancy grid exported to " + file_name)
+
+    def start_live_link(self, address):
+        """
+        Starts publishing the track to local clients (see LiveLink.LiveLinkServer).
+
+        Args:
+            address: TCP port number or path of a Unix domain socket
+        """
+        self.stop_live_link()
+        if isinstance(address, int) or str(address).isdigit():
+            address = ("127.0.0.1", int(address))
+        self.live_link = LiveLinkServer(self, address)
+        try:
+            self.live_link.start()
+        except OSError as e:
+            logger.error(f"Error starting live link: {e}")
+            self.live_link = None
+
+    def stop_live_link(self):
+        """
+        Stops publishing the track and closes all client connections.
+        """
+        if self.live_link is not None:
+            self.live_link.stop()
+            self.live_link = None
+
+    def start_shared_memory(self, name):
+        """
+        Starts publishing the cone arrays in a shared memory block (see SharedTrack.SharedTrackWriter).
+
+        Args:
+            name: Name of the shared memory block
+        """
+        self.stop_shared_memory()
+        self.shared_track = SharedTrackWriter(self, name)
+        try:
+            self.shared_track.start()
+        except OSError as e:
+            logger.error(f"Error creating shared memory: {e}")
+            self.shared_track = None
+
+    def stop_shared_memory(self):
+        """
+        Stops publishing and removes the shared memory block.
+        """
+        if self.shared_track is not None:
+            self.shared_track.stop()
+            self.shared_track = None
+
+    def toggle_tracing(self):
+        """
+        Starts recording trace spans or stops recording and asks where to save them.
+        """
+        if not TRACER.enabled:
+            TRACER.start()
+            logger.info("Tracing started")
+            return
+        file_name = filedialog.asksaveasfilename(title="Save Trace", defaultextension=".json", initialfile="trackbuilder_trace",
+                                                 filetypes=(("Chrome trace JSON", "*.json"), ("All files", "*.*")))
+        self.save_trace(file_name)
+
+    def save_trace(self, file_name):
+        """
+        Stops tracing and writes the recorded spans as Chrome trace JSON
+        (open with chrome://tracing or ui.perfetto.dev).
+
+        Args:
+            file_name: Path of the trace file, nothing is written if empty
+        """
+        TRACER.stop()
+        if not file_name:
+            return
+        try:
+            count = TRACER.write(file_name)
+        except OSError as e:
+            logger.error(f"Error writing trace: {e}")
+            return
+        logger.info(f"Trace with {count} spans written to {file_name}")
+
+    def report_memory(self):
+        """
+        Logs bytes and objects per cone and car, canvas items per owner, widgets and cached images
+        (see MemoryReport), and warns about growth since the last report that the track does not explain.
+        Every other report starts tracing Python allocations, the next one lists them and stops tracing.
+
+        Returns:
+            dict: The collected numbers
+        """
+        report, found = self.memory.run()
+        logger.info(MemoryReport.format(report))
+        for description in found:
+            logger.warning(f"Possible leak: {description}")
+        return report
+
     #load-functionality
+    @traced("load_track")
     def load_track(self):
         """
-        Loads a track from a YAML file.
+        Loads a track from a YAML file or imports a survey CSV file (see Georeference.import_survey).
         If the file is loaded successfully, the track will be visualized on the canvas.
 
         """
-        file_name = filedialog.askopenfilename(title="Select Track File", filetypes=(("YAML files", "*.yaml"), ("All files", "*.*")))
+        file_name = filedialog.askopenfilename(title="Select Track File", filetypes=(("YAML files", "*.yaml"), ("Survey CSV files", "*.csv"), ("All files", "*.*")))
+
+        if file_name and file_name.lower().endswith(".csv"):
+            try:
+                track_data = import_survey(file_name)
+            except (OSError, ValueError) as e:
+                logger.error(f"Error importing survey: {e}")
+                return
+            self.visualize(track_data)
+            # imported surveys are saved as a new YAML file
+            self.current_file = None
+            self.tool_frame.current_file_name.set(os.path.basename(file_name))
+            return
 
         if file_name:
             self.current_file = file_name
@@ -169,6 +1082,7 @@ class Window(CTk):
         self.tool_frame.current_file_name.set(os.path.basename(self.current_file))
 
 
+    @traced("open_yaml_file")
     def open_yaml_file(self, file_name):
         """
         Opens a YAML file and returns the track data.
@@ -181,6 +1095,7 @@ class Window(CTk):
             track_data = yaml.safe_load(file)
             return track_data
 
+    @traced("visualize")
     def visualize(self, track_data):
         """
         Clears the canvas and visualizes the track data on the canvas.
@@ -195,32 +1110,43 @@ class Window(CTk):
         car_position = []
         
         try:
-            for cone_data in track_data.get("cones_left", []):
-                cone = CanvasObjects.Cone(self.placing_canvas, "blue", cone_data[0] * self.scale, cone_data[1] * self.scale)
-            for cone_data in track_data.get("cones_right", []):
-                cone = CanvasObjects.Cone(self.placing_canvas, "yellow", cone_data[0] * self.scale, cone_data[1] * self.scale)
+            self.set_georeference(track_data.get("georeference"))
+            with TRACER.span("create_cones", count=len(track_data.get("cones_left", [])) + len(track_data.get("cones_right", []))):
+                # registered as one batch, so that undoing the load is a single batch removal
+                cones = [CanvasObjects.Cone(self.placing_canvas, "blue", cone_data[0] * self.scale, cone_data[1] * self.scale, register=False)
+                         for cone_data in track_data.get("cones_left", [])]
+                cones += [CanvasObjects.Cone(self.placing_canvas, "yellow", cone_data[0] * self.scale, cone_data[1] * self.scale, register=False)
+                          for cone_data in track_data.get("cones_right", [])]
+                self.register_cones(cones)
             for cone_data in track_data.get("starting_pose", []):
                 car_position.append(cone_data)
 
             if car_position and len(car_position) >= 3:
-                self.car = CanvasObjects.Car(self.placing_canvas, car_position[0], car_position[1], car_position[2])
+                self.car = CanvasObjects.Car(self.placing_canvas, car_position[0] * self.scale, car_position[1] * self.scale, car_position[2])
                 self.car.update_zoom(self.placing_canvas.zoom_factor)
-                print("car successfully loaded!")
+                logger.debug("car successfully loaded!")
+
+            with TRACER.span("count_duplicate_cones"):
+                duplicates = self.count_duplicate_cones()
+            if duplicates:
+                logger.warning(f"Track contains {duplicates} duplicate cones, use DEDUPLICATE to merge them")
 
             # method handles grid resizing and focusing
             self.placing_canvas.fit_to_track()
 
             if hasattr(self, 'cones'):
-                for cone in self.cones:
-                    cone.update_zoom(self.placing_canvas.zoom_factor)
+                with TRACER.span("update_cones", count=len(self.cones)):
+                    for cone in self.cones:
+                        cone.update_zoom(self.placing_canvas.zoom_factor)
 
-            print("Load successful!")
+            logger.info("Load successful!")
             
         except Exception as e:
-            print(f"Error loading track: {e}")
+            logger.error(f"Error loading track: {e}")
 
 
 
+    @traced("clear_canvas")
     def clear_canvas(self):
         """
         Clears the canvas and removes all objects from the canvas.
@@ -235,8 +1161,13 @@ class Window(CTk):
             self.placing_canvas.delete(self.car.id)
             self.car = None
         self.cones.clear()
-        print("canvas cleared")
+        self.track_changed("clear", None)
+        # the origin belongs to the cleared track, a new track must not be saved with it
+        self.set_georeference(None)
+        logger.debug("canvas cleared")
 
+    @traced("update_zoom")
+    @timed("update_zoom")
     def update_zoom(self, zoom):
         """
         Update zoom level for all objects on the canvas.
@@ -253,6 +1184,8 @@ class Window(CTk):
         if self.car:
             self.car.update_zoom(zoom)
 
+        self.placing_canvas.update_overlays()
+
     def manage_drag_drop_tool_frame(self, is_visible: bool):
         """
         Handle the visibility of the drag and drop tool frame.
@@ -271,7 +1204,7 @@ class Window(CTk):
             
             # show drag and drop frame
             if not self.drag_drop_tool_visible:
-                self.drag_drop_tool_frame.place(relx=1.0, rely=0.1, anchor="ne", x=-30)
+                self.drag_drop_tool_frame.place(relx=1.0, rely=0.1, anchor="ne", x=-30, y=50)
                 self.drag_drop_tool_visible = True
                 
                 # deactivate all tools by default when opening the frame
@@ -301,20 +1234,20 @@ class Window(CTk):
             
             # show generate frame
             if not self.generate_tool_visible:
-                self.generate_tool_frame.place(relx=1.0, rely=0.1, anchor="ne", x=-30)
+                self.generate_tool_frame.place(relx=1.0, rely=0.1, anchor="ne", x=-30, y=50)
                 self.generate_tool_visible = True
                 
                 # show welcome message
                 if hasattr(self.generate_tool_frame, 'status_var'):
                     self.generate_tool_frame.status_var.set("Ready to generate track. Select an image to continue.")
                 
-                print("Generate tool panel opened")
+                logger.debug("Generate tool panel opened")
         else:
             # hide the frame
             if self.generate_tool_visible:
                 self.generate_tool_frame.place_forget()
                 self.generate_tool_visible = False
-                print("Generate tool panel closed")
+                logger.debug("Generate tool panel closed")
 
     def close_all_tool_frames(self):
         """
@@ -335,6 +1268,7 @@ class Window(CTk):
         
         self.current_tool = None
 
+    @traced("generate_cones_from_points")
     def generate_cones_from_points(self, points, track_width=5.0):
         """
         Generate blue and yellow cones from a list of track points.
@@ -354,57 +1288,77 @@ class Window(CTk):
         offset = (track_width * scale) / 2
         
         try:
-            for i in range(len(points) - 1):
-                p1, p2 = points[i], points[i + 1]
+            cones = []
+            with TRACER.span("place_cones", points=len(points)):
+                for i in range(len(points) - 1):
+                    p1, p2 = points[i], points[i + 1]
 
-                # calculate direction vector
-                dx = p2[0] - p1[0]
-                dy = p2[1] - p1[1]
+                    # calculate direction vector
+                    dx = p2[0] - p1[0]
+                    dy = p2[1] - p1[1]
 
-                # skip if points are too close
-                length = math.hypot(dx, dy)
-                if length < 1:
-                    continue
+                    # skip if points are too close
+                    length = math.hypot(dx, dy)
+                    if length < 1:
+                        continue
 
-                # normalize direction vector
-                dx /= length
-                dy /= length
+                    # normalize direction vector
+                    dx /= length
+                    dy /= length
 
-                # calculate normal vector (perpendicular)
-                nx, ny = -dy, dx
+                    # calculate normal vector (perpendicular)
+                    nx, ny = -dy, dx
 
-                # calculate midpoint
-                mx = (p1[0] + p2[0]) / 2
-                my = (p1[1] + p2[1]) / 2
+                    # calculate midpoint
+                    mx = (p1[0] + p2[0]) / 2
+                    my = (p1[1] + p2[1]) / 2
 
-                # place cones using the canvas's scale
-                blue_cone = CanvasObjects.Cone(self.placing_canvas, "blue", mx + nx * offset, my + ny * offset)
-                yellow_cone = CanvasObjects.Cone(self.placing_canvas, "yellow", mx - nx * offset, my - ny * offset)
-
-                # ensure cones are in master's list
-                if blue_cone not in self.cones:
-                    self.cones.append(blue_cone)
-                if yellow_cone not in self.cones:
-                    self.cones.append(yellow_cone)
+                    # place cones using the canvas's scale, registered as one batch below
+                    cones.append(CanvasObjects.Cone(self.placing_canvas, "blue", mx + nx * offset, my + ny * offset, register=False))
+                    cones.append(CanvasObjects.Cone(self.placing_canvas, "yellow", mx - nx * offset, my - ny * offset, register=False))
+                self.register_cones(cones)
 
             # update zoom for all cones
-            for cone in self.cones:
-                cone.update_zoom(self.placing_canvas.zoom_factor)
+            with TRACER.span("update_cones", count=len(self.cones)):
+                for cone in self.cones:
+                    cone.update_zoom(self.placing_canvas.zoom_factor)
             
             # fit view to show all cones with a larger margin for better visibility
             self.placing_canvas.fit_to_track(margin=1000)
             
-            print(f"Generated track with {len(self.cones)} cones")
+            logger.info(f"Generated track with {len(self.cones)} cones")
             
         except Exception as e:
-            print(f"Error generating cones: {e}")
-            import traceback
-            traceback.print_exc()
+            logger.exception(f"Error generating cones: {e}")
 
 
 def main():
+    parser = argparse.ArgumentParser(description="Formula Student track builder.")
+    parser.add_argument("--live-link", metavar="PORT|PATH", default=None,
+                        help="publish track changes on a local TCP port or Unix domain socket")
+    parser.add_argument("--shared-memory", metavar="NAME", default=None,
+                        help="publish the cone arrays in a shared memory block of this name")
+    parser.add_argument("--trace", metavar="FILE", default=os.environ.get(TRACE_ENV),
+                        help=f"record spans from the start and write them as Chrome trace JSON on exit (default: ${TRACE_ENV})")
+    parser.add_argument("--log-level", default=os.environ.get("TRACKBUILDER_LOG_LEVEL", "INFO"),
+                        choices=["DEBUG", "INFO", "WARNING", "ERROR"], type=str.upper,
+                        help="level of the console messages (default: $TRACKBUILDER_LOG_LEVEL or INFO)")
+    args = parser.parse_args()
+    logging.basicConfig(level=args.log_level, format="%(message)s")
+
+    if args.trace:
+        TRACER.start()
     app = Window()
+    if args.live_link:
+        app.start_live_link(args.live_link)
+    if args.shared_memory:
+        app.start_shared_memory(args.shared_memory)
     app.mainloop()
+    app.stop_live_link()
+    app.stop_shared_memory()
+    app.memory.stop()
+    if args.trace and TRACER.enabled:
+        app.save_trace(args.trace)
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
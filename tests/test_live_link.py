@@ -0,0 +1,74 @@
+import itertools
+
+import numpy as np
+
+from ui_components.LiveLink import OP_CONE, LiveLinkClient, LiveLinkServer
+
+
+class FakeCanvas:
+    """Stands in for the TrackCanvas, the tests flush the server themselves."""
+
+    def after_idle(self, callback):
+        return "idle"
+
+
+class FakeCone:
+    """Cone whose canvas item id changes on restore like the real one, the uid does not."""
+
+    item_ids = itertools.count(1)
+    uids = itertools.count(1)
+
+    def __init__(self, window, x, y):
+        self.window = window
+        self.cone_type = "blue"
+        self.position_x = x
+        self.position_y = y
+        self.id = next(FakeCone.item_ids)
+        self.uid = next(FakeCone.uids)
+
+    def delete_cone(self):
+        self.window.cones.remove(self)
+        self.window.server.on_track_changed("delete", self)
+
+    def restore(self):
+        self.id = next(FakeCone.item_ids)
+        self.window.cones.append(self)
+        self.window.server.on_track_changed("add", self)
+
+
+class FakeWindow:
+    def __init__(self):
+        self.placing_canvas = FakeCanvas()
+        self.scale = 20
+        self.cones = []
+        self.car = None
+        self.server = LiveLinkServer(self)
+
+
+def client_copy(records):
+    """Track as a client sees it after applying the records."""
+    client = LiveLinkClient.__new__(LiveLinkClient)
+    client.cones = {}
+    client.car_pose = None
+    client.apply(records)
+    return client.cones
+
+
+def test_restore_in_the_same_flush_keeps_the_cone_id():
+    window = FakeWindow()
+    server = window.server
+    cones = [FakeCone(window, 20.0 * index, 0.0) for index in range(3)]
+    window.cones.extend(cones)
+    server.on_track_changed("add_many", cones)
+    initial = server._records(list(server.changes))
+    server.changes.clear()
+
+    cones[1].delete_cone()
+    cones[1].restore()
+    changed = [cone for cone, change in server.changes.items() if change != "delete"]
+    deleted = [cone for cone, change in server.changes.items() if change == "delete"]
+    update = server._records(changed, deleted)
+
+    assert update["op"].tolist() == [OP_CONE]
+    track = client_copy(np.concatenate([initial, update]))
+    assert sorted(track) == sorted(cone.uid for cone in cones)
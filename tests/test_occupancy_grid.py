@@ -0,0 +1,41 @@
+import numpy as np
+import pytest
+
+from ui_components.OccupancyGrid import GridLayout, OccupancyRasterizer, boundary_segments
+
+
+def oval_track():
+    """Closed track of about 2200 x 2200 cells at the default resolution and margin."""
+    angles = np.linspace(0.0, 2.0 * np.pi, 60, endpoint=False)
+    inner = np.column_stack([45.0 * np.cos(angles), 40.0 * np.sin(angles)])
+    outer = np.column_stack([50.0 * np.cos(angles), 50.0 * np.sin(angles)])
+    return {"cones_left": inner.tolist(), "cones_right": outer.tolist()}
+
+
+@pytest.fixture(scope="module")
+def rasterizer():
+    track_data = oval_track()
+    cones = np.asarray(track_data["cones_left"] + track_data["cones_right"])
+    layout = GridLayout(cones)
+    return OccupancyRasterizer(layout, cones, boundary_segments(track_data))
+
+
+@pytest.fixture(scope="module")
+def untiled(rasterizer):
+    return rasterizer.band(0, rasterizer.layout.height)
+
+
+@pytest.mark.parametrize("band_rows", [1024, 97])
+def test_bands_equal_the_untiled_grid(rasterizer, untiled, band_rows):
+    height = rasterizer.layout.height
+    bands = [rasterizer.band(first_row, min(band_rows, height - first_row)) for first_row in range(0, height, band_rows)]
+    np.testing.assert_array_equal(np.vstack(bands), untiled)
+
+
+@pytest.mark.parametrize("tile_size", [700, 131])
+def test_tiles_equal_the_untiled_grid(rasterizer, untiled, tile_size):
+    layout = rasterizer.layout
+    tiles = [[rasterizer.band(first_row, min(tile_size, layout.height - first_row), first_column, min(tile_size, layout.width - first_column))
+              for first_column in range(0, layout.width, tile_size)]
+             for first_row in range(0, layout.height, tile_size)]
+    np.testing.assert_array_equal(np.block(tiles), untiled)
@@ -0,0 +1,206 @@
+from ui_components.UndoHistory import CommandHistory
+
+
+class FakeCanvas:
+    """Stands in for the TrackCanvas, idle callbacks are committed by the tests."""
+
+    def after_idle(self, callback):
+        return "idle"
+
+
+class FakeCone:
+    def __init__(self, window, x=0.0, y=0.0):
+        self.window = window
+        self.position_x = x
+        self.position_y = y
+        self.released = False
+
+    def move(self, x, y):
+        self.position_x, self.position_y = x, y
+        self.window.track_changed("move", self)
+
+    def delete_cone(self):
+        self.window.cones.remove(self)
+        self.window.track_changed("delete", self)
+
+    def restore(self, register=True):
+        if register:
+            self.window.cones.append(self)
+            self.window.track_changed("add", self)
+
+    def release(self):
+        self.released = True
+
+
+class FakeCar(FakeCone):
+    yaw_angle = 0.0
+
+    def delete_car(self):
+        self.window.car = None
+        self.window.track_changed("delete", self)
+
+    def restore(self):
+        self.window.car = self
+        self.window.track_changed("add", self)
+
+
+class FakeWindow:
+    """The parts of the main window the history uses, without Tk."""
+
+    def __init__(self, max_operations=200_000):
+        self.placing_canvas = FakeCanvas()
+        self.cones = []
+        self.car = None
+        self.georeference = None
+        self.restore_calls = 0
+        self.history = CommandHistory(self, max_operations)
+
+    def track_changed(self, change, canvas_object):
+        self.history.on_track_changed(change, canvas_object)
+
+    def add(self, count):
+        cones = [FakeCone(self, index, 0.0) for index in range(count)]
+        self.cones.extend(cones)
+        self.track_changed("add_many", cones)
+        return cones
+
+    def remove_cones(self, cones):
+        removed = set(cones)
+        self.cones[:] = [cone for cone in self.cones if cone not in removed]
+        self.track_changed("delete_many", list(cones))
+
+    def restore_cones(self, cones):
+        self.restore_calls += 1
+        self.cones.extend(cones)
+        self.track_changed("add_many", list(cones))
+
+    def clear_canvas(self):
+        self.cones.clear()
+        self.car = None
+        self.track_changed("clear", None)
+        self.set_georeference(None)
+
+    def set_georeference(self, georeference):
+        if georeference != self.georeference:
+            self.history.on_georeference_changed(self.georeference, georeference)
+            self.georeference = georeference
+
+
+def test_consecutive_moves_are_summed():
+    window = FakeWindow()
+    cone = window.add(1)[0]
+    window.history.commit()
+    for _ in range(5):
+        cone.move(cone.position_x + 1.0, cone.position_y + 2.0)
+    window.history.commit()
+
+    assert window.history.undo_stack[-1].operations == [("move", cone, 5.0, 10.0)]
+    window.history.undo()
+    assert (cone.position_x, cone.position_y) == (0.0, 0.0)
+
+
+def test_moves_are_not_summed_across_a_delete():
+    window = FakeWindow()
+    cone = window.add(1)[0]
+    window.history.commit()
+    cone.move(1.0, 0.0)
+    cone.delete_cone()
+    cone.restore()
+    cone.move(3.0, 0.0)
+    window.history.commit()
+
+    kinds = [operation[0] for operation in window.history.undo_stack[-1].operations]
+    assert kinds == ["move", "delete", "add", "move"]
+
+
+def test_drag_is_merged_until_release():
+    window = FakeWindow()
+    history = window.history
+    cone = window.add(1)[0]
+    history.commit()
+
+    history.press()
+    for step in range(1, 4):
+        cone.move(float(step), 0.0)
+        history.commit()
+    history.release()
+    history.commit()
+    cone.move(10.0, 0.0)
+    history.commit()
+
+    assert len(history.undo_stack) == 3
+    assert history.undo_stack[1].operations == [("move", cone, 3.0, 0.0)]
+    assert not history.undo_stack[1].open
+    history.undo()
+    history.undo()
+    assert cone.position_x == 0.0
+
+
+def test_batches_and_clears_count_per_object():
+    window = FakeWindow()
+    window.add(5)
+    window.history.commit()
+    assert window.history.operation_count == 5
+
+    window.clear_canvas()
+    window.history.commit()
+    assert window.history.operation_count == 5 + 5
+
+
+def test_eviction_releases_deleted_objects():
+    window = FakeWindow(max_operations=10)
+    history = window.history
+    cones = window.add(6)
+    history.commit()
+    window.clear_canvas()
+    history.commit()
+    assert history.operation_count == 6
+
+    for _ in range(3):
+        window.add(3)
+        history.commit()
+
+    assert len(history.undo_stack) == 3
+    assert history.operation_count == 9
+    assert all(cone.released for cone in cones)
+    assert not any(cone.released for cone in window.cones)
+
+
+def test_undo_of_a_load_is_one_batch():
+    window = FakeWindow()
+    history = window.history
+    window.set_georeference({"latitude": 1.0})
+    old = window.add(3)
+    history.commit()
+
+    # load another track: clear, new origin, new cones in one batch
+    window.clear_canvas()
+    window.set_georeference({"latitude": 2.0})
+    new = window.add(4)
+    history.commit()
+
+    history.undo()
+    assert window.cones == old
+    assert window.georeference == {"latitude": 1.0}
+    assert window.restore_calls == 1
+
+    history.redo()
+    assert window.cones == new
+    assert window.georeference == {"latitude": 2.0}
+
+
+def test_undo_of_a_clear_restores_the_car():
+    window = FakeWindow()
+    history = window.history
+    cones = window.add(2)
+    car = FakeCar(window)
+    window.car = car
+    window.track_changed("add", car)
+    history.commit()
+
+    window.clear_canvas()
+    history.commit()
+    history.undo()
+
+    assert window.car is car
+    assert window.cones == cones
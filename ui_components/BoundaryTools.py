@@ -0,0 +1,134 @@
+import numpy as np
+
+from ui_components.TrackGeometry import order_boundary, resample_polyline, simplify_polyline
+
+# cone types of the two boundaries
+BOUNDARY_TYPES = ("blue", "yellow")
+
+
+def boundary_chains(positions, types, start=None):
+    """
+    Order the blue and yellow cones into boundary chains.
+
+    Args:
+        positions: (N, 2) array of cone positions in meters
+        types: (N,) array of cone types
+        start: Position the chains should start closest to, e.g. the car (default: None)
+
+    Returns:
+        dict: Cone type -> (indices into positions in chain order, whether the chain is closed)
+    """
+    positions = np.asarray(positions, dtype=float).reshape(-1, 2)
+    types = np.asarray(types)
+    chains = {}
+    for cone_type in BOUNDARY_TYPES:
+        members = np.flatnonzero(types == cone_type)
+        if len(members) == 0:
+            continue
+        order, closed = order_boundary(positions[members], start)
+        chains[cone_type] = (members[order], closed)
+    return chains
+
+
+def respace_boundaries(positions, chains, spacing):
+    """
+    Re-space every boundary chain uniformly by arc length.
+
+    Args:
+        positions: (N, 2) array of cone positions in meters
+        chains: Result of boundary_chains
+        spacing: Distance between neighbouring cones in meters
+
+    Returns:
+        tuple: ((M, 2) array of new positions, list of their cone types)
+    """
+    new_positions, new_types = [], []
+    for cone_type, (order, closed) in chains.items():
+        resampled = resample_polyline(positions[order], spacing, closed)
+        new_positions.append(resampled)
+        new_types += [cone_type] * len(resampled)
+    if not new_positions:
+        return np.empty((0, 2)), []
+    return np.vstack(new_positions), new_types
+
+
+def simplify_boundaries(positions, chains, tolerance):
+    """
+    Drop the cones of every boundary chain that lie within a lateral error of the simplified chain.
+
+    Args:
+        positions: (N, 2) array of cone positions in meters
+        chains: Result of boundary_chains
+        tolerance: Largest allowed lateral error in meters
+
+    Returns:
+        ndarray: Sorted indices into positions of the kept cones
+    """
+    kept = [order[simplify_polyline(positions[order], tolerance, closed)] for order, closed in chains.values()]
+    return np.sort(np.concatenate(kept)) if kept else np.empty(0, dtype=int)
+
+
+class ConePreviewLayer:
+    """
+    Draws proposed cone positions and their boundary lines on the TrackCanvas.
+    Like the DiffLayer, pans move the items of the tag while zoom changes redraw them,
+    so the markers keep their size on the screen.
+    """
+
+    def __init__(self, canvas, positions, types, chains, scale, name="boundary_preview"):
+        """
+        Initialize the layer and create its items.
+
+        Args:
+            canvas: TrackCanvas to draw on
+            positions: (N, 2) array of proposed cone positions in meters
+            types: Cone type of every position
+            chains: List of ((K, 2) array of chain positions in meters, closed) to draw as lines
+            scale: Logical units per meter of the canvas
+            name: Name of the layer, also used as its tag (default: 'boundary_preview')
+        """
+        self.canvas = canvas
+        self.positions = np.asarray(positions, dtype=float).reshape(-1, 2)
+        self.types = list(types)
+        self.chains = chains
+        self.scale = scale
+        self.name = name
+        self.view = None
+        self.draw()
+
+    def draw(self):
+        """Create the items of the layer for the current zoom and offset of the canvas."""
+        canvas = self.canvas
+        self.remove()
+        zoom, offset_x, offset_y = canvas.zoom_factor, canvas.offset_x, canvas.offset_y
+        self.view = (zoom, offset_x, offset_y)
+
+        for chain, closed in self.chains:
+            if len(chain) < 2:
+                continue
+            if closed:
+                chain = np.vstack([chain, chain[:1]])
+            canvas.create_line(*canvas.overlay_coords(chain * self.scale), fill="#7A7A7A", dash=(4, 3), tags=("overlay", self.name))
+
+        colors = {"blue": "#3A8CC4", "yellow": "#FFD630"}
+        radius = 4
+        screen = self.positions * self.scale * (zoom, -zoom) + (offset_x, offset_y)
+        for (x, y), cone_type in zip(screen.tolist(), self.types):
+            canvas.create_oval(x - radius, y - radius, x + radius, y + radius, outline=colors.get(cone_type, "#FFFFFF"), width=2, tags=("overlay", self.name))
+
+    def redraw(self):
+        """Follow the current zoom and offset of the canvas."""
+        canvas = self.canvas
+        old_zoom, old_x, old_y = self.view
+        zoom, offset_x, offset_y = canvas.zoom_factor, canvas.offset_x, canvas.offset_y
+        if (zoom, offset_x, offset_y) == self.view:
+            return
+        if zoom != old_zoom:
+            self.draw()
+            return
+        canvas.move(self.name, offset_x - old_x, offset_y - old_y)
+        self.view = (zoom, offset_x, offset_y)
+
+    def remove(self):
+        """Remove all items of the layer."""
+        self.canvas.delete(self.name)
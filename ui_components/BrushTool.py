@@ -0,0 +1,107 @@
+import numpy as np
+
+from ui_components.Selection import SHIFT_MASK
+from ui_components.TrackGenerator import TrackRules
+from ui_components.TrackGeometry import resample_polyline
+
+# the boundary on the other side of a painted stroke
+PAIRED_TYPES = {"blue": "yellow", "yellow": "blue"}
+
+
+def offset_polyline(points, offset):
+    """
+    Shift the vertices of a polyline along its normals.
+
+    Args:
+        points: (N, 2) array of polyline vertices
+        offset: Distance to the left of the drawing direction, negative to the right
+
+    Returns:
+        ndarray: (N, 2) array of shifted vertices
+    """
+    points = np.asarray(points, dtype=float).reshape(-1, 2)
+    if len(points) < 2:
+        return points.copy()
+    tangents = np.gradient(points, axis=0)
+    tangents /= np.maximum(np.hypot(tangents[:, 0], tangents[:, 1]), 1e-12)[:, None]
+    normals = np.column_stack([-tangents[:, 1], tangents[:, 0]])
+    return points + offset * normals
+
+
+def thin_positions(points, min_distance):
+    """Drop positions closer than min_distance to the previously kept one, e.g. on the inside of tight curves."""
+    kept = []
+    for point in np.asarray(points, dtype=float).reshape(-1, 2):
+        if not kept or np.hypot(*(point - kept[-1])) >= min_distance:
+            kept.append(point)
+    return np.array(kept).reshape(-1, 2)
+
+
+class BrushTool:
+    """
+    Paints cones along a freehand mouse stroke. The stroke is previewed as a single polyline
+    and, on release, resampled by arc length into evenly spaced cones which are placed in one batch.
+    The brush paints left (blue) cones, with Shift held right (yellow) cones; with pairing enabled
+    the other boundary is placed at the track width.
+    """
+
+    def __init__(self, window, spacing=None, track_width=None):
+        """
+        Initialize the brush.
+
+        Args:
+            window: Main application window
+            spacing: Distance between painted cones in meters (default: cone spacing of TrackRules)
+            track_width: Distance of the paired boundary in meters (default: track width of TrackRules)
+        """
+        rules = TrackRules()
+        self.window = window
+        self.canvas = window.placing_canvas
+        self.spacing = spacing if spacing is not None else rules.cone_spacing
+        self.track_width = track_width if track_width is not None else rules.track_width
+        self.paired = False
+
+        self.stroke = []
+        self.cone_type = "blue"
+        self.item = None
+
+    def press(self, event):
+        """Start a stroke."""
+        self.cone_type = "yellow" if event.state & SHIFT_MASK else "blue"
+        self.stroke = [self.canvas.to_logic_coords(event.x, event.y)]
+        self.item = self.canvas.create_line(event.x, event.y, event.x, event.y, fill="#FFFFFF", width=2, tags="brush_preview")
+
+    def motion(self, event):
+        """Extend the stroke and its preview polyline."""
+        if self.item is None:
+            return
+        canvas = self.canvas
+        x, y = canvas.to_logic_coords(event.x, event.y)
+        last_x, last_y = self.stroke[-1]
+        # ignore jitter below two screen pixels
+        if abs(x - last_x) * canvas.zoom_factor < 2 and abs(y - last_y) * canvas.zoom_factor < 2:
+            return
+        self.stroke.append((x, y))
+        canvas.coords(self.item, canvas.overlay_coords(np.array(self.stroke)))
+
+    def release(self, event):
+        """Resample the stroke and place its cones."""
+        if self.item is None:
+            return
+        self.canvas.delete("brush_preview")
+        self.item = None
+        stroke, self.stroke = np.array(self.stroke), []
+
+        scale = self.window.scale
+        stroke_meters = stroke / scale
+        positions = [resample_polyline(stroke_meters, self.spacing)]
+        types = [self.cone_type]
+        if self.paired and len(stroke_meters) >= 2:
+            # blue cones are the left boundary, the yellow boundary lies to their right
+            side = -1.0 if self.cone_type == "blue" else 1.0
+            paired = offset_polyline(resample_polyline(stroke_meters, self.spacing / 4), side * self.track_width)
+            positions.append(resample_polyline(thin_positions(paired, self.spacing / 4), self.spacing))
+            types.append(PAIRED_TYPES[self.cone_type])
+
+        cone_types = [cone_type for cone_type, points in zip(types, positions) for _ in range(len(points))]
+        self.window.add_cones(np.vstack(positions) * scale, cone_types)
@@ -1,16 +1,25 @@
 from customtkinter import *
 from PIL import Image, ImageTk
+import itertools
+import logging
 import math
 
+from ui_components.PerformanceHUD import timed
+
 BASE_DIR = os.path.dirname(os.path.abspath(__file__))
 
+logger = logging.getLogger(__name__)
+
 class Cone:
     """
     Represents a cone object on the canvas. Cones are used to mark the track boundaries.
     Supports dragging, info display, and deletion.
     """
 
-    def __init__(self, canvas, cone_type, position_x, position_y):
+    # stable ids of the cones, unlike the canvas item id they survive delete and restore
+    _uids = itertools.count(1)
+
+    def __init__(self, canvas, cone_type, position_x, position_y, register=True):
         """
         Initialize a new cone object.
         
@@ -19,6 +28,8 @@ class Cone:
             cone_type: Type of cone ('blue' or 'yellow')
             position_x: Initial x position in logical coordinates
             position_y: Initial y position in logical coordinates
+            register: Add the cone to the master's list and notify the change, False when
+                      the caller registers a whole batch at once (default: True)
         """
         self.canvas = canvas
         self.cone_type = cone_type
@@ -27,6 +38,7 @@ class Cone:
 
         self.radius = 3
         self.id = None
+        self.uid = next(Cone._uids)
 
         self.color_map = {
             "red" : "#C61818",
@@ -37,25 +49,24 @@ class Cone:
         self.draw_cone()
         
         # ensure the cone is added to master's list
-        if hasattr(self.canvas.master, 'cones'):
+        if register and hasattr(self.canvas.master, 'cones'):
             if self not in self.canvas.master.cones:  # prevent duplicates
                 self.canvas.master.cones.append(self)
+                notify_track_change(self, "add")
 
         self.drag_data = {"x": 0, "y": 0}
-        self.canvas.tag_bind(self.id, "<ButtonPress-1>", self.on_click_cone)
-        self.canvas.tag_bind(self.id, "<B1-Motion>", self.on_drag_cone)
-        self.canvas.tag_bind(self.id, "<ButtonRelease-1>", self.on_release_cone)
+        self.bind_events()
 
-        # info frame that shows coordinates and delete button
+        # info frame that shows coordinates and delete button, created when first shown
+        # so that placing many cones at once stays cheap
         self.info_frame = None
         self.info_frame_visible = False
-        self.coord_x_var = StringVar()
-        self.coord_y_var = StringVar()
-        self._create_info_frame()
 
 
     def _create_info_frame(self):
         """Creates the frame containing cone info and actions."""
+        self.coord_x_var = StringVar()
+        self.coord_y_var = StringVar()
         self.info_frame = CTkFrame(self.canvas.master, fg_color="#1C1C1C", border_width=1, border_color="#4A4A4A", corner_radius=6)
 
         # coordinate display
@@ -81,6 +92,12 @@ class Cone:
         self.delete_button.grid(row=0, column=3, rowspan=2, padx=(0, 8), pady=5)
 
 
+    def bind_events(self):
+        """Bind the mouse handlers to the canvas item of the cone."""
+        self.canvas.tag_bind(self.id, "<ButtonPress-1>", self.on_click_cone)
+        self.canvas.tag_bind(self.id, "<B1-Motion>", self.on_drag_cone)
+        self.canvas.tag_bind(self.id, "<ButtonRelease-1>", self.on_release_cone)
+
     def draw_cone(self):
         """Draw or redraw the cone on the canvas."""
         if self.id:
@@ -179,12 +196,36 @@ class Cone:
         #deletes the cone from the masters list
         if hasattr(self.canvas.master, 'cones') and self in self.canvas.master.cones:
             self.canvas.master.cones.remove(self)
+            notify_track_change(self, "delete")
 
-        if self.info_frame_visible:
+        # the frame is kept, so that the cone can be restored by undo
+        self.hide_info_frame()
+
+    def release(self):
+        """Destroy the info frame of a deleted cone that will not be restored anymore."""
+        if self.info_frame is not None:
             self.info_frame.destroy()
+            self.info_frame = None
+            self.info_frame_visible = False
+
+    def restore(self, register=True):
+        """
+        Put a deleted cone back onto the canvas at its last position.
+        
+        Args:
+            register: Add the cone to the master's list and notify the change (default: True)
+        """
+        self.id = None
+        self.draw_cone()
+        self.bind_events()
+        if register and hasattr(self.canvas.master, 'cones') and self not in self.canvas.master.cones:
+            self.canvas.master.cones.append(self)
+            notify_track_change(self, "add")
 
     def show_info_frame(self):
         """Show the info frame displaying cone coordinates."""
+        if self.info_frame is None:
+            self._create_info_frame()
         if not self.info_frame_visible:
             self.update_info_frame() # update content and position
             self.info_frame.lift()
@@ -219,6 +260,19 @@ class Cone:
         frame_height = self.info_frame.winfo_reqheight()
         self.info_frame.place(x=zx + self.radius * 2.5, y=zy - frame_height / 2)
 
+def notify_track_change(canvas_object, change):
+    """
+    Inform the master window that the track has changed.
+    
+    Args:
+        canvas_object: The changed object (Cone or Car)
+        change: Kind of change ('add', 'move', 'rotate' or 'delete'), batches of cones
+                are notified by the window as 'add_many' and 'delete_many'
+    """
+    master = canvas_object.canvas.master
+    if hasattr(master, 'track_changed'):
+        master.track_changed(change, canvas_object)
+
 # drag and drop methods
 def move_object(canvas_object, new_x, new_y):
     """
@@ -234,6 +288,7 @@ def move_object(canvas_object, new_x, new_y):
     """
     canvas_object.position_x = new_x
     canvas_object.position_y = new_y
+    notify_track_change(canvas_object, "move")
 
     zx, zy = canvas_object.canvas.to_zoom_coords(new_x, new_y)
 
@@ -252,6 +307,7 @@ def on_click_object(canvas_object, event):
         canvas_object.drag_data["x"] = event.x
         canvas_object.drag_data["y"] = event.y
 
+@timed("drag")
 def on_drag_object(canvas_object, event):
     """
     Handle dragging of an object.
@@ -324,11 +380,10 @@ class Car:
         self.id = None
         self.active = False
         self.draw_car()
+        notify_track_change(self, "add")
 
         self.drag_data = {"x": 0, "y": 0}
-        self.canvas.tag_bind(self.id, "<ButtonPress-1>", self.on_click_car)
-        self.canvas.tag_bind(self.id, "<B1-Motion>", self.on_drag_car)
-        self.canvas.tag_bind(self.id, "<ButtonRelease-1>", self.on_release_car)
+        self.bind_events()
 
         # info frame that shows coordinates and yaw angle
         self.info_frame = None
@@ -369,12 +424,18 @@ class Car:
                                      image=self.delete_icon, width=24, height=24, fg_color="transparent", hover_color="#B22222")
         self.delete_button.grid(row=0, column=3, rowspan=3, padx=(0, 8), pady=5)
 
+    def bind_events(self):
+        """Bind the mouse handlers to the canvas item of the car."""
+        self.canvas.tag_bind(self.id, "<ButtonPress-1>", self.on_click_car)
+        self.canvas.tag_bind(self.id, "<B1-Motion>", self.on_drag_car)
+        self.canvas.tag_bind(self.id, "<ButtonRelease-1>", self.on_release_car)
+
     def draw_car(self):
         """Draw or redraw the car on the canvas as a triangle."""
         p1, p2, p3 = self.get_points()
 
         self.id = self.canvas.create_polygon(p1, p2, p3, fill='#FFFFFF', outline='#FFFFFF', width=1, tags="car")
-        print("car successfully drawn")
+        logger.debug("car successfully drawn")
         #self.id = self.canvas.create_polygon(p1_rot, p2_rot, p3_rot, fill='#FFFFFF', outline='black')
 
     def get_points(self):
@@ -510,7 +571,17 @@ class Car:
             return
 
         delta = 5 if event.delta > 0 else -5
-        self.yaw_angle = (self.yaw_angle + delta) % 360  # keep angle between 0 and 360
+        self.set_yaw(self.yaw_angle + delta)
+
+    def set_yaw(self, yaw_angle):
+        """
+        Rotate the car to a new yaw angle.
+        
+        Args:
+            yaw_angle: New yaw angle in degrees
+        """
+        self.yaw_angle = yaw_angle % 360  # keep angle between 0 and 360
+        notify_track_change(self, "rotate")
         self.update_zoom(self.canvas.zoom_factor)
         if self.info_frame_visible:
             self.update_info_frame()
@@ -558,9 +629,26 @@ class Car:
         # remove the car reference from the master
         if hasattr(self.canvas.master, 'car'):
             self.canvas.master.car = None
+        notify_track_change(self, "delete")
 
-        if self.info_frame_visible:
+        # the frame is kept, so that the car can be restored by undo
+        self.hide_info_frame()
+
+    def release(self):
+        """Destroy the info frame of a deleted car that will not be restored anymore."""
+        if self.info_frame is not None:
             self.info_frame.destroy()
+            self.info_frame = None
+            self.info_frame_visible = False
+
+    def restore(self):
+        """Put a deleted car back onto the canvas at its last pose."""
+        self.active = False
+        self.draw_car()
+        self.bind_events()
+        if hasattr(self.canvas.master, 'car'):
+            self.canvas.master.car = self
+        notify_track_change(self, "add")
 
 
 
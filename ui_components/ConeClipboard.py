@@ -0,0 +1,116 @@
+import math
+
+import numpy as np
+
+# first line of copied cones, identifies TrackBuilder clipboard text
+CLIPBOARD_HEADER = "# TrackBuilder cones: x, y [m], type"
+# largest number of copies of an array and of cones it may place, larger arrays would stall the UI
+MAX_ARRAY_COPIES = 1000
+MAX_ARRAY_CONES = 20_000
+
+
+def cones_to_text(positions, cone_types):
+    """
+    Encode cones as clipboard text, one 'x,y,type' line per cone.
+
+    Args:
+        positions: (N, 2) array of positions in meters
+        cone_types: Cone type of every position
+
+    Returns:
+        str: The clipboard text
+    """
+    lines = [CLIPBOARD_HEADER]
+    lines += [f"{x:.4f},{y:.4f},{cone_type}" for (x, y), cone_type in zip(np.asarray(positions, dtype=float).reshape(-1, 2).tolist(), cone_types)]
+    return "\n".join(lines) + "\n"
+
+
+def cones_from_text(text):
+    """
+    Decode clipboard text written by cones_to_text.
+
+    Args:
+        text: The clipboard text
+
+    Returns:
+        tuple: ((N, 2) array of positions in meters, list of cone types)
+
+    Raises:
+        ValueError: If the text does not hold TrackBuilder cones
+    """
+    if not text.startswith(CLIPBOARD_HEADER):
+        raise ValueError("Clipboard does not hold TrackBuilder cones")
+    rows = [line.split(",") for line in text.splitlines() if line.strip() and not line.startswith("#")]
+    if any(len(row) != 3 for row in rows):
+        raise ValueError("Clipboard lines must be 'x,y,type'")
+    positions = np.array([row[:2] for row in rows], dtype=float).reshape(-1, 2)
+    return positions, [row[2].strip() for row in rows]
+
+
+def linear_array(positions, count, offset):
+    """
+    Copies of a group of positions repeated along a vector.
+
+    Args:
+        positions: (N, 2) array of positions
+        count: Number of copies, the original is not included
+        offset: (dx, dy) between neighbouring copies
+
+    Returns:
+        ndarray: (count * N, 2) array of the copied positions, copy by copy
+    """
+    positions = np.asarray(positions, dtype=float).reshape(-1, 2)
+    steps = np.arange(1, count + 1)[:, None, None] * np.asarray(offset, dtype=float)
+    return (positions[None, :, :] + steps).reshape(-1, 2)
+
+
+def circular_array(positions, count, angle, pivot):
+    """
+    Copies of a group of positions repeated around a pivot.
+
+    Args:
+        positions: (N, 2) array of positions
+        count: Number of copies, the original is not included
+        angle: Counter-clockwise rotation between neighbouring copies in degrees
+        pivot: (x, y) of the rotation center
+
+    Returns:
+        ndarray: (count * N, 2) array of the copied positions, copy by copy
+    """
+    positions = np.asarray(positions, dtype=float).reshape(-1, 2)
+    pivot = np.asarray(pivot, dtype=float)
+    angles = np.radians(angle) * np.arange(1, count + 1)
+    cos, sin = np.cos(angles)[:, None], np.sin(angles)[:, None]
+    relative = positions - pivot
+    rotated_x = relative[:, 0] * cos - relative[:, 1] * sin
+    rotated_y = relative[:, 0] * sin + relative[:, 1] * cos
+    return np.stack([rotated_x, rotated_y], axis=-1).reshape(-1, 2) + pivot
+
+
+def parse_array_spec(text, max_copies=MAX_ARRAY_COPIES):
+    """
+    Parse an array specification entered by the user.
+
+    Args:
+        text: 'count dx dy' for a linear array or 'count angle pivot_x pivot_y' for a
+              circular array, distances in meters and angles in degrees
+        max_copies: Largest accepted count (default: MAX_ARRAY_COPIES)
+
+    Returns:
+        tuple: ('linear', count, (dx, dy)) or ('circular', count, angle, (pivot_x, pivot_y))
+
+    Raises:
+        ValueError: If the text matches neither form
+    """
+    values = text.replace(",", " ").split()
+    if len(values) not in (3, 4):
+        raise ValueError("Expected 'count dx dy' or 'count angle pivot_x pivot_y'")
+    count = int(values[0])
+    numbers = [float(value) for value in values[1:]]
+    if count < 1 or not all(math.isfinite(number) for number in numbers):
+        raise ValueError("Invalid array specification")
+    if count > max_copies:
+        raise ValueError(f"At most {max_copies} copies per array")
+    if len(numbers) == 2:
+        return "linear", count, tuple(numbers)
+    return "circular", count, numbers[0], tuple(numbers[1:])
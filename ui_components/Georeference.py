@@ -0,0 +1,251 @@
+import argparse
+import csv
+import logging
+
+import numpy as np
+import yaml
+
+logger = logging.getLogger(__name__)
+
+# WGS84 ellipsoid
+SEMI_MAJOR_AXIS = 6378137.0
+FLATTENING = 1 / 298.257223563
+ECCENTRICITY_SQUARED = FLATTENING * (2 - FLATTENING)
+
+# header names accepted for the columns of survey files
+LATITUDE_COLUMNS = ("lat", "latitude")
+LONGITUDE_COLUMNS = ("lon", "lng", "long", "longitude")
+ALTITUDE_COLUMNS = ("alt", "altitude", "height", "h")
+COLOUR_COLUMNS = ("colour", "color", "type", "cone_type")
+
+# survey colours and the cone types they are imported as
+CONE_COLOURS = {"blue": "blue", "b": "blue", "left": "blue", "yellow": "yellow", "y": "yellow", "right": "yellow"}
+
+
+def geodetic_to_ecef(latitude, longitude, altitude=0.0):
+    """
+    Convert WGS84 geodetic coordinates to earth-centered, earth-fixed coordinates.
+
+    Args:
+        latitude: Latitudes in degrees
+        longitude: Longitudes in degrees
+        altitude: Heights above the ellipsoid in meters (default: 0.0)
+
+    Returns:
+        ndarray: (N, 3) array of ECEF coordinates in meters
+    """
+    latitude = np.radians(np.asarray(latitude, dtype=float))
+    longitude = np.radians(np.asarray(longitude, dtype=float))
+    altitude = np.broadcast_to(np.asarray(altitude, dtype=float), latitude.shape)
+    sin_latitude = np.sin(latitude)
+    normal = SEMI_MAJOR_AXIS / np.sqrt(1 - ECCENTRICITY_SQUARED * sin_latitude ** 2)
+    return np.column_stack([
+        (normal + altitude) * np.cos(latitude) * np.cos(longitude),
+        (normal + altitude) * np.cos(latitude) * np.sin(longitude),
+        (normal * (1 - ECCENTRICITY_SQUARED) + altitude) * sin_latitude
+    ])
+
+
+def ecef_to_geodetic(ecef, iterations=5):
+    """
+    Convert ECEF coordinates to WGS84 geodetic coordinates by fixed-point iteration on the latitude.
+
+    Args:
+        ecef: (N, 3) array of ECEF coordinates in meters
+        iterations: Number of latitude refinements, five reach sub-millimeter accuracy (default: 5)
+
+    Returns:
+        tuple: (latitude, longitude, altitude) arrays in degrees and meters
+    """
+    x, y, z = np.asarray(ecef, dtype=float).reshape(-1, 3).T
+    longitude = np.arctan2(y, x)
+    distance = np.hypot(x, y)
+    latitude = np.arctan2(z, distance * (1 - ECCENTRICITY_SQUARED))
+    for _ in range(iterations):
+        normal = SEMI_MAJOR_AXIS / np.sqrt(1 - ECCENTRICITY_SQUARED * np.sin(latitude) ** 2)
+        altitude = distance / np.cos(latitude) - normal
+        latitude = np.arctan2(z, distance * (1 - ECCENTRICITY_SQUARED * normal / (normal + altitude)))
+    normal = SEMI_MAJOR_AXIS / np.sqrt(1 - ECCENTRICITY_SQUARED * np.sin(latitude) ** 2)
+    altitude = distance / np.cos(latitude) - normal
+    return np.degrees(latitude), np.degrees(longitude), altitude
+
+
+def _enu_rotation(latitude, longitude):
+    """(3, 3) rotation from ECEF into the east, north, up axes at a geodetic position."""
+    latitude, longitude = np.radians(latitude), np.radians(longitude)
+    sin_lat, cos_lat = np.sin(latitude), np.cos(latitude)
+    sin_lon, cos_lon = np.sin(longitude), np.cos(longitude)
+    return np.array([
+        [-sin_lon, cos_lon, 0.0],
+        [-sin_lat * cos_lon, -sin_lat * sin_lon, cos_lat],
+        [cos_lat * cos_lon, cos_lat * sin_lon, sin_lat]
+    ])
+
+
+def geodetic_to_enu(latitude, longitude, altitude, origin):
+    """
+    Project geodetic coordinates into the local east, north, up frame of an origin.
+
+    Args:
+        latitude: Latitudes in degrees
+        longitude: Longitudes in degrees
+        altitude: Heights above the ellipsoid in meters
+        origin: (latitude, longitude, altitude) of the frame origin
+
+    Returns:
+        ndarray: (N, 3) array of east, north and up coordinates in meters
+    """
+    origin_ecef = geodetic_to_ecef(*origin)[0]
+    return (geodetic_to_ecef(latitude, longitude, altitude) - origin_ecef) @ _enu_rotation(origin[0], origin[1]).T
+
+
+def enu_to_geodetic(enu, origin):
+    """
+    Convert local east, north, up coordinates back to geodetic coordinates.
+
+    Args:
+        enu: (N, 2) or (N, 3) array of east, north and optional up coordinates in meters
+        origin: (latitude, longitude, altitude) of the frame origin
+
+    Returns:
+        tuple: (latitude, longitude, altitude) arrays in degrees and meters
+    """
+    enu = np.asarray(enu, dtype=float)
+    if enu.shape[1] == 2:
+        enu = np.column_stack([enu, np.zeros(len(enu))])
+    ecef = enu @ _enu_rotation(origin[0], origin[1]) + geodetic_to_ecef(*origin)[0]
+    return ecef_to_geodetic(ecef)
+
+
+def _find_column(names, candidates, required=True):
+    index = next((index for index, name in enumerate(names) if name in candidates), None)
+    if index is None and required:
+        raise ValueError(f"No column named {' or '.join(candidates)} in header {names}")
+    return index
+
+
+def read_survey(path):
+    """
+    Read a survey CSV file with latitude, longitude, optional altitude and cone colour columns.
+
+    Args:
+        path: Path of the CSV file, the header names the columns
+
+    Returns:
+        tuple: (latitude, longitude, altitude, colours) arrays
+
+    Raises:
+        ValueError: If the file has no header or no data rows, or a column is missing
+    """
+    with open(path, "r", newline="") as file:
+        rows = list(csv.reader(file))
+    if not rows:
+        raise ValueError("Survey has no rows")
+    names = [name.strip().lower() for name in rows[0]]
+    rows = [row for row in rows[1:] if row]
+
+    columns = [_find_column(names, LATITUDE_COLUMNS), _find_column(names, LONGITUDE_COLUMNS)]
+    altitude_column = _find_column(names, ALTITUDE_COLUMNS, required=False)
+    colour_column = _find_column(names, COLOUR_COLUMNS)
+    if not rows:
+        raise ValueError("Survey has no rows")
+    width = max(column for column in columns + [altitude_column, colour_column] if column is not None) + 1
+    if any(len(row) < width for row in rows):
+        raise ValueError(f"Survey rows must have at least {width} columns")
+
+    table = np.array(rows, dtype=object)
+    latitude, longitude = (table[:, column].astype(float) for column in columns)
+    altitude = table[:, altitude_column].astype(float) if altitude_column is not None else np.zeros(len(rows))
+    colours = np.char.lower(np.char.strip(table[:, colour_column].astype(str)))
+    return latitude, longitude, altitude, colours
+
+
+def import_survey(path, origin=None):
+    """
+    Import a survey CSV file as a track dictionary in a local ENU frame.
+    Only blue and yellow cones are imported, other colours are skipped.
+
+    Args:
+        path: Path of the CSV file
+        origin: (latitude, longitude, altitude) of the local frame (default: centroid of the survey)
+
+    Returns:
+        dict: Track dictionary as stored in the YAML files, with the origin stored under 'georeference'
+    """
+    latitude, longitude, altitude, colours = read_survey(path)
+    if origin is None:
+        origin = (float(latitude.mean()), float(longitude.mean()), float(altitude.mean()))
+    enu = geodetic_to_enu(latitude, longitude, altitude, origin)
+
+    types = np.array([CONE_COLOURS.get(colour, "") for colour in colours])
+    skipped = int((types == "").sum())
+    if skipped:
+        logger.warning(f"Skipped {skipped} surveyed cones with colours other than blue and yellow")
+
+    return {
+        "cones_left": np.round(enu[types == "blue", :2], 4).tolist(),
+        "cones_right": np.round(enu[types == "yellow", :2], 4).tolist(),
+        "starting_pose": [],
+        "georeference": {
+            "latitude": float(origin[0]),
+            "longitude": float(origin[1]),
+            "altitude": float(origin[2]),
+            "frame": "ENU"
+        }
+    }
+
+
+def export_survey(track_data, path):
+    """
+    Export the cones of a georeferenced track dictionary as a survey CSV file.
+
+    Args:
+        track_data: Track dictionary with a 'georeference' section
+        path: Path of the CSV file to write
+    """
+    georeference = track_data.get("georeference")
+    if not georeference:
+        raise ValueError("Track has no georeference")
+    origin = (georeference["latitude"], georeference["longitude"], georeference.get("altitude", 0.0))
+
+    blue = np.asarray(track_data.get("cones_left") or [], dtype=float).reshape(-1, 2)
+    yellow = np.asarray(track_data.get("cones_right") or [], dtype=float).reshape(-1, 2)
+    latitude, longitude, altitude = enu_to_geodetic(np.vstack([blue, yellow]), origin)
+    colours = ["blue"] * len(blue) + ["yellow"] * len(yellow)
+
+    with open(path, "w", newline="") as file:
+        writer = csv.writer(file)
+        writer.writerow(["latitude", "longitude", "altitude", "colour"])
+        writer.writerows(zip(np.round(latitude, 9), np.round(longitude, 9), np.round(altitude, 3), colours))
+
+
+def main():
+    """Convert between survey CSV files and georeferenced track files."""
+    parser = argparse.ArgumentParser(description="Import and export surveyed cone positions.")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    import_parser = subparsers.add_parser("import", help="survey CSV to YAML track file")
+    import_parser.add_argument("survey", help="CSV file with latitude, longitude, [altitude,] colour columns")
+    import_parser.add_argument("track", help="YAML track file to write")
+    import_parser.add_argument("--origin", type=float, nargs=3, metavar=("LAT", "LON", "ALT"), default=None,
+                               help="origin of the local frame (default: centroid of the survey)")
+
+    export_parser = subparsers.add_parser("export", help="georeferenced YAML track file to survey CSV")
+    export_parser.add_argument("track", help="YAML track file with a georeference section")
+    export_parser.add_argument("survey", help="CSV file to write")
+    args = parser.parse_args()
+
+    if args.command == "import":
+        track_data = import_survey(args.survey, args.origin)
+        with open(args.track, "w") as file:
+            yaml.dump(track_data, file, default_flow_style=False, indent=2)
+        print(f"Imported {len(track_data['cones_left']) + len(track_data['cones_right'])} cones into {args.track}")
+    else:
+        with open(args.track, "r") as file:
+            track_data = yaml.safe_load(file)
+        export_survey(track_data, args.survey)
+        print(f"Exported {args.survey}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,333 @@
+import logging
+import os
+import selectors
+import socket
+import struct
+from tkinter import TclError
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+# message header: magic, sequence number, number of records
+HEADER = struct.Struct("<4sII")
+MAGIC = b"TBL1"
+
+# one record per changed object, coordinates in meters and degrees, cones are identified by Cone.uid
+RECORD = np.dtype([("op", "u1"), ("id", "<u4"), ("type", "u1"), ("x", "<f4"), ("y", "<f4"), ("yaw", "<f4")])
+
+# record operations
+OP_CLEAR = 0
+OP_CONE = 1
+OP_DELETE = 2
+OP_CAR = 3
+OP_CAR_DELETE = 4
+
+# cone type codes of the records
+CONE_TYPE_CODES = {"blue": 1, "yellow": 2, "red": 3}
+CONE_TYPE_NAMES = {code: name for name, code in CONE_TYPE_CODES.items()}
+
+
+def encode_message(sequence, records):
+    """
+    Encode records into a message.
+
+    Args:
+        sequence: Sequence number of the message
+        records: Structured array with the RECORD dtype
+
+    Returns:
+        bytes: Header followed by the packed records
+    """
+    return HEADER.pack(MAGIC, sequence, len(records)) + records.tobytes()
+
+
+class _Client:
+    """Connection state of one subscriber."""
+
+    def __init__(self, connection):
+        self.connection = connection
+        self.buffer = bytearray()
+        self.needs_snapshot = True
+
+
+class LiveLinkServer:
+    """
+    Publishes the track of the main window to local clients over TCP or a Unix domain socket.
+    A client receives a snapshot of the whole track on connect and afterwards only the changes,
+    coalesced per idle cycle into one message. Sockets are non-blocking and polled from the Tk loop.
+    A client whose send buffer exceeds the limit loses its pending changes and is resynchronised
+    with a fresh snapshot once it has caught up, so a slow client never blocks the editor.
+    """
+
+    def __init__(self, window, address=("127.0.0.1", 5555), max_buffer=4 << 20, poll_interval=20):
+        """
+        Initialize the server.
+
+        Args:
+            window: Main application window holding the cones and the car
+            address: (host, port) for TCP or a path for a Unix domain socket (default: ('127.0.0.1', 5555))
+            max_buffer: Largest number of unsent bytes per client before it is resynchronised (default: 4 MiB)
+            poll_interval: Milliseconds between socket polls (default: 20)
+        """
+        self.window = window
+        self.canvas = window.placing_canvas
+        self.address = address
+        self.max_buffer = max_buffer
+        self.poll_interval = poll_interval
+
+        self.selector = selectors.DefaultSelector()
+        self.server = None
+        self.clients = {}
+        self.sequence = 0
+        # latest change per object since the last flush
+        self.changes = {}
+        self.cleared = False
+        self.scheduled = None
+        self.polling = None
+
+    def start(self):
+        """Open the socket and start listening to track changes."""
+        if self.server is not None:
+            return
+        if isinstance(self.address, str):
+            if os.path.exists(self.address):
+                os.unlink(self.address)
+            self.server = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        else:
+            self.server = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+            self.server.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        self.server.bind(self.address)
+        self.server.listen()
+        self.server.setblocking(False)
+        self.selector.register(self.server, selectors.EVENT_READ)
+
+        self.window.track_listeners.append(self.on_track_changed)
+        self.polling = self.canvas.after(self.poll_interval, self.poll)
+        logger.info(f"Live link listening on {self.address}")
+
+    def stop(self):
+        """Close all connections and stop listening to track changes."""
+        if self.server is None:
+            return
+        self.window.track_listeners.remove(self.on_track_changed)
+        for callback in (self.scheduled, self.polling):
+            if callback is not None:
+                try:
+                    self.canvas.after_cancel(callback)
+                except TclError:
+                    # the window has already been destroyed
+                    pass
+        self.scheduled = self.polling = None
+        for connection in list(self.clients):
+            self._disconnect(connection)
+        self.selector.unregister(self.server)
+        self.server.close()
+        self.server = None
+        if isinstance(self.address, str) and os.path.exists(self.address):
+            os.unlink(self.address)
+
+    def on_track_changed(self, change, canvas_object):
+        """
+        Record a track change for the next flush.
+
+        Args:
+            change: Kind of change ('add', 'move', 'rotate', 'delete', 'clear', 'add_many' or 'delete_many')
+            canvas_object: Changed Cone or Car, the list of cones of a batch, None for 'clear'
+        """
+        if change in ("add_many", "delete_many"):
+            for cone in canvas_object:
+                self._record(change[:-len("_many")], cone)
+        elif change == "clear":
+            self.changes.clear()
+            self.cleared = True
+        else:
+            self._record(change, canvas_object)
+        if self.scheduled is None:
+            self.scheduled = self.canvas.after_idle(self.flush)
+
+    def _record(self, change, canvas_object):
+        """Merge the change of one object with its pending change."""
+        if change == "delete" and self.changes.get(canvas_object) == "add":
+            # added and deleted before the clients heard of it
+            del self.changes[canvas_object]
+        elif change != "delete" and self.changes.get(canvas_object) == "add":
+            pass
+        else:
+            self.changes[canvas_object] = change
+
+    def _records(self, objects, deleted=()):
+        """Records of the current state of the given objects and of deleted objects."""
+        scale = self.window.scale
+        records = np.zeros(len(objects) + len(deleted), dtype=RECORD)
+        for row, canvas_object in enumerate(objects):
+            record = records[row]
+            if hasattr(canvas_object, "yaw_angle"):
+                record["op"] = OP_CAR
+                record["yaw"] = canvas_object.yaw_angle
+            else:
+                record["op"] = OP_CONE
+                record["id"] = canvas_object.uid
+                record["type"] = CONE_TYPE_CODES.get(canvas_object.cone_type, 0)
+            record["x"] = canvas_object.position_x / scale
+            record["y"] = canvas_object.position_y / scale
+        for row, canvas_object in enumerate(deleted, start=len(objects)):
+            if hasattr(canvas_object, "yaw_angle"):
+                records[row]["op"] = OP_CAR_DELETE
+            else:
+                records[row]["op"] = OP_DELETE
+                records[row]["id"] = canvas_object.uid
+        return records
+
+    def snapshot(self):
+        """Message with the whole track, starting with a clear record."""
+        objects = list(self.window.cones) + ([self.window.car] if self.window.car else [])
+        records = np.concatenate([np.zeros(1, dtype=RECORD), self._records(objects)])
+        records[0]["op"] = OP_CLEAR
+        return encode_message(self.sequence, records)
+
+    def flush(self):
+        """Encode the changes since the last flush into one message and queue it for every client."""
+        self.scheduled = None
+        if not self.changes and not self.cleared:
+            return
+
+        changed = [canvas_object for canvas_object, change in self.changes.items() if change != "delete"]
+        deleted = [canvas_object for canvas_object, change in self.changes.items() if change == "delete"]
+        records = self._records(changed, deleted)
+        if self.cleared:
+            clear = np.zeros(1, dtype=RECORD)
+            clear["op"] = OP_CLEAR
+            records = np.concatenate([clear, records])
+        self.changes.clear()
+        self.cleared = False
+
+        self.sequence += 1
+        message = encode_message(self.sequence, records)
+        for client in self.clients.values():
+            if not client.needs_snapshot:
+                client.buffer += message
+        self._send_all()
+
+    def poll(self):
+        """Accept connections, drop closed ones and send pending data."""
+        self.polling = self.canvas.after(self.poll_interval, self.poll)
+        for key, _ in self.selector.select(timeout=0):
+            if key.fileobj is self.server:
+                self._accept()
+            else:
+                self._receive(key.fileobj)
+        self._send_all()
+
+    def _accept(self):
+        try:
+            connection, _ = self.server.accept()
+        except BlockingIOError:
+            return
+        connection.setblocking(False)
+        self.clients[connection] = _Client(connection)
+        self.selector.register(connection, selectors.EVENT_READ)
+
+    def _receive(self, connection):
+        # clients do not send anything, a readable socket without data has been closed
+        try:
+            data = connection.recv(4096)
+        except (BlockingIOError, InterruptedError):
+            return
+        except OSError:
+            data = b""
+        if not data:
+            self._disconnect(connection)
+
+    def _disconnect(self, connection):
+        self.clients.pop(connection, None)
+        try:
+            self.selector.unregister(connection)
+        except (KeyError, ValueError):
+            pass
+        connection.close()
+
+    def _send_all(self):
+        """Send as much of every client buffer as the sockets accept without blocking."""
+        for connection, client in list(self.clients.items()):
+            if len(client.buffer) > self.max_buffer:
+                # too far behind: drop the queued changes and resynchronise once the socket drains
+                client.buffer.clear()
+                client.needs_snapshot = True
+            if client.needs_snapshot and not client.buffer:
+                client.buffer += self.snapshot()
+                client.needs_snapshot = False
+            if not client.buffer:
+                continue
+            try:
+                sent = connection.send(client.buffer)
+            except (BlockingIOError, InterruptedError):
+                continue
+            except OSError:
+                self._disconnect(connection)
+                continue
+            del client.buffer[:sent]
+
+
+class LiveLinkClient:
+    """
+    Minimal blocking client that keeps a copy of the published track, e.g. for a simulator.
+    """
+
+    def __init__(self, address=("127.0.0.1", 5555)):
+        """
+        Connect to a LiveLinkServer.
+
+        Args:
+            address: (host, port) for TCP or a path for a Unix domain socket (default: ('127.0.0.1', 5555))
+        """
+        family = socket.AF_UNIX if isinstance(address, str) else socket.AF_INET
+        self.socket = socket.create_connection(address) if family == socket.AF_INET else socket.socket(family)
+        if family == socket.AF_UNIX:
+            self.socket.connect(address)
+        self.buffer = bytearray()
+        self.cones = {}
+        self.car_pose = None
+        self.sequence = None
+
+    def _read(self, size):
+        while len(self.buffer) < size:
+            data = self.socket.recv(65536)
+            if not data:
+                raise ConnectionError("Live link closed")
+            self.buffer += data
+        data = bytes(self.buffer[:size])
+        del self.buffer[:size]
+        return data
+
+    def receive(self):
+        """
+        Receive one message and apply it to the local copy of the track.
+
+        Returns:
+            ndarray: The received records
+        """
+        magic, self.sequence, count = HEADER.unpack(self._read(HEADER.size))
+        if magic != MAGIC:
+            raise ValueError("Unexpected live link message")
+        records = np.frombuffer(self._read(count * RECORD.itemsize), dtype=RECORD)
+        self.apply(records)
+        return records
+
+    def apply(self, records):
+        """Apply records to the local copy of the track."""
+        for op, cone_id, cone_type, x, y, yaw in records.tolist():
+            if op == OP_CLEAR:
+                self.cones.clear()
+                self.car_pose = None
+            elif op == OP_CONE:
+                self.cones[cone_id] = (CONE_TYPE_NAMES.get(cone_type, "unknown"), x, y)
+            elif op == OP_DELETE:
+                self.cones.pop(cone_id, None)
+            elif op == OP_CAR:
+                self.car_pose = (x, y, yaw)
+            elif op == OP_CAR_DELETE:
+                self.car_pose = None
+
+    def close(self):
+        self.socket.close()
@@ -0,0 +1,248 @@
+import gc
+import sys
+import tracemalloc
+import types
+from collections import Counter
+
+from customtkinter import CTkImage
+
+# canvas tags identifying the owner of an item, checked in this order
+ITEM_CATEGORIES = ("grid_line", "logo", "cone", "car", "overlay", "orthophoto", "pointcloud", "selection_band", "brush_preview", "performance_hud")
+# items whose number depends on the view, shown layers or open tools, not on the track
+VIEW_CATEGORIES = ("grid_line", "overlay", "orthophoto", "pointcloud", "selection_band", "brush_preview", "performance_hud")
+
+
+def deep_sizeof(root, stop=()):
+    """
+    Python memory held by an object and everything only reachable through it.
+    Widgets, the canvas, modules, classes and functions are shared and not counted.
+
+    Args:
+        root: Object to measure
+        stop: Further objects not to descend into
+
+    Returns:
+        int: Size in bytes
+    """
+    seen = {id(item) for item in stop}
+    pending = [root]
+    total = 0
+    while pending:
+        item = pending.pop()
+        if id(item) in seen or isinstance(item, (type, types.ModuleType, types.FunctionType, types.BuiltinFunctionType)):
+            continue
+        if item is not root and hasattr(item, "tk"):
+            continue
+        seen.add(id(item))
+        total += sys.getsizeof(item)
+        if isinstance(item, dict):
+            pending.extend(item.keys())
+            pending.extend(item.values())
+        elif isinstance(item, (list, tuple, set, frozenset)):
+            pending.extend(item)
+        elif isinstance(item, types.MethodType):
+            pending.append(item.__self__)
+        if hasattr(item, "__dict__"):
+            pending.append(item.__dict__)
+    return total
+
+
+def canvas_item_counts(canvas):
+    """
+    Number of canvas items per owner.
+
+    Returns:
+        Counter: Category of ITEM_CATEGORIES (or 'other' / 'untagged') -> item count
+    """
+    counts = Counter()
+    for item in canvas.find_all():
+        tags = canvas.gettags(item)
+        category = next((name for name in ITEM_CATEGORIES if name in tags), "other" if tags else "untagged")
+        counts[category] += 1
+    return counts
+
+
+def widget_counts(root):
+    """
+    Number of Tk widgets below a widget, per widget class.
+
+    Returns:
+        Counter: Widget class name -> count
+    """
+    counts = Counter()
+    pending = list(root.winfo_children())
+    while pending:
+        widget = pending.pop()
+        counts[type(widget).__name__] += 1
+        pending.extend(widget.winfo_children())
+    return counts
+
+
+def tk_image_bytes(widget):
+    """
+    Tk images of the interpreter and the pixel memory they hold.
+
+    Returns:
+        tuple: (number of images, bytes of their pixels at 4 bytes per pixel)
+    """
+    names = widget.tk.splitlist(widget.tk.call("image", "names"))
+    pixels = 0
+    for name in names:
+        pixels += int(widget.tk.call("image", "width", name)) * int(widget.tk.call("image", "height", name))
+    return len(names), pixels * 4
+
+
+class MemoryReport:
+    """
+    Memory accounting of the window: bytes and objects per cone and car, canvas items
+    per owner, widgets, Tcl commands and cached images. Every report is compared with
+    the previous one to flag growth that the track does not explain, e.g. canvas items
+    accumulating across redraws.
+
+    Python allocations are traced with tracemalloc only between two reports: every other
+    report starts tracing, the next one lists the allocations still alive since then and
+    stops it again. While tracing, every allocation records its traceback, which slows
+    the application down noticeably and costs memory per live block, so tracing must not
+    stay on in normal use.
+    """
+
+    def __init__(self, window):
+        """
+        Initialize the report.
+
+        Args:
+            window: Main application window
+        """
+        self.window = window
+        self.previous = None
+        # whether tracemalloc was started by a report and is stopped by the next one
+        self.tracing = False
+
+    def collect(self, samples=100):
+        """
+        Collect the current numbers.
+
+        Args:
+            samples: Number of cones measured for the average cone size (default: 100)
+
+        Returns:
+            dict: Counts and sizes, see the keys of the dictionary
+        """
+        window = self.window
+        canvas = window.placing_canvas
+        cones = window.cones
+        car = window.car
+        shared = (window, canvas)
+
+        gc.collect()
+        step = max(len(cones) // samples, 1)
+        measured = cones[::step][:samples]
+        cone_bytes = sum(deep_sizeof(cone, shared) for cone in measured) / len(measured) if measured else 0.0
+
+        items = canvas_item_counts(canvas)
+        widgets = widget_counts(window)
+        images, image_bytes = tk_image_bytes(window)
+        ctk_images = sum(1 for item in gc.get_objects() if isinstance(item, CTkImage))
+        commands = len(window.tk.splitlist(window.tk.call("info", "commands")))
+
+        report = {
+            "cones": len(cones),
+            "car": car is not None,
+            "cone_bytes": cone_bytes,
+            "cone_info_frames": sum(1 for cone in cones if cone.info_frame is not None),
+            "car_bytes": deep_sizeof(car, shared) if car is not None else 0,
+            "canvas_items": dict(items),
+            "widgets": sum(widgets.values()),
+            "widget_classes": dict(widgets.most_common(8)),
+            "tcl_commands": commands,
+            "tk_images": images,
+            "tk_image_bytes": image_bytes,
+            "ctk_images": ctk_images,
+            "history_operations": window.history.operation_count if hasattr(window, 'history') else 0
+        }
+
+        if self.tracing:
+            # everything traced was allocated since the previous report and is still alive
+            snapshot = tracemalloc.take_snapshot().filter_traces((tracemalloc.Filter(False, tracemalloc.__file__),))
+            current, peak = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+            self.tracing = False
+            report["traced_bytes"] = current
+            report["traced_peak_bytes"] = peak
+            report["top_growth"] = [(str(stat.traceback[0]), stat.size) for stat in snapshot.statistics("lineno")[:5]]
+        elif not tracemalloc.is_tracing():
+            tracemalloc.start()
+            self.tracing = True
+        return report
+
+    def stop(self):
+        """Stop tracing allocations started by a report, e.g. when the window closes."""
+        if self.tracing:
+            tracemalloc.stop()
+            self.tracing = False
+
+    def leaks(self, report):
+        """
+        Flag inconsistencies in a report and growth since the previous one.
+
+        Args:
+            report: Result of collect
+
+        Returns:
+            list: Descriptions of the suspected leaks
+        """
+        found = []
+        items = report["canvas_items"]
+        if items.get("cone", 0) != report["cones"]:
+            found.append(f"{items.get('cone', 0)} cone items for {report['cones']} cones")
+        if items.get("car", 0) != int(report["car"]):
+            found.append(f"{items.get('car', 0)} car items for {int(report['car'])} cars")
+        for category in ("logo", "untagged"):
+            if items.get(category, 0) > 1:
+                found.append(f"{items[category]} {category} items, expected at most one")
+
+        previous = self.previous
+        unchanged = ("cones", "car", "cone_info_frames")
+        if previous is not None and all(previous[key] == report[key] for key in unchanged):
+            # the track did not change, everything else should not grow either
+            for key in ("widgets", "tcl_commands", "tk_images", "ctk_images"):
+                if report[key] > previous[key]:
+                    found.append(f"{key} grew from {previous[key]} to {report[key]} with an unchanged track")
+            for category, count in items.items():
+                if count > previous["canvas_items"].get(category, 0) and category not in ("cone", "car") + VIEW_CATEGORIES:
+                    found.append(f"{category} canvas items grew from {previous['canvas_items'].get(category, 0)} to {count} with an unchanged track")
+        return found
+
+    def run(self):
+        """
+        Collect a report, flag leaks and keep the report for the next comparison.
+
+        Returns:
+            tuple: (report, list of suspected leaks)
+        """
+        report = self.collect()
+        found = self.leaks(report)
+        self.previous = report
+        return report, found
+
+    @staticmethod
+    def format(report):
+        """The report as text lines for the console."""
+        cones = max(report["cones"], 1)
+        lines = [
+            f"cones: {report['cones']}, {report['cone_bytes']:.0f} B Python objects per cone, {report['cone_info_frames']} info frames",
+            f"car: {report['car_bytes']} B" if report["car"] else "car: none",
+            "canvas items: " + ", ".join(f"{name} {count}" for name, count in sorted(report["canvas_items"].items())),
+            f"widgets: {report['widgets']} (" + ", ".join(f"{name} {count}" for name, count in report["widget_classes"].items()) + ")",
+            f"tcl commands: {report['tcl_commands']} ({report['tcl_commands'] / cones:.1f} per cone)",
+            f"images: {report['tk_images']} Tk images with {report['tk_image_bytes'] / 1024:.0f} KiB pixels, {report['ctk_images']} CTkImage",
+            f"history: {report['history_operations']} operations"
+        ]
+        if "traced_bytes" in report:
+            lines.append(f"Python memory allocated since the last report and still alive: {report['traced_bytes'] / 2**20:.1f} MiB "
+                         f"(peak {report['traced_peak_bytes'] / 2**20:.1f} MiB), tracing stopped")
+        else:
+            lines.append("tracing Python allocations until the next report (slows the application down)")
+        for location, size in report.get("top_growth", []):
+            lines.append(f"  +{size / 1024:.0f} KiB at {location}")
+        return "\n".join(lines)
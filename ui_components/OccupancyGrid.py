@@ -0,0 +1,265 @@
+import argparse
+import math
+import os
+import time
+
+import cv2
+import numpy as np
+import yaml
+
+from ui_components.TrackGeometry import order_boundary
+
+# cell values of the map_server trinary PGM format
+OCCUPIED = 0
+FREE = 254
+UNKNOWN = 205
+
+
+class GridLayout:
+    """
+    Extent and resolution of an occupancy grid covering a track.
+    Row 0 is the top (largest y) of the map, as in the PGM image.
+    """
+
+    def __init__(self, points, resolution=0.05, margin=5.0):
+        """
+        Initialize the layout around a set of points.
+
+        Args:
+            points: (N, 2) array of positions the grid has to cover in meters
+            resolution: Edge length of a cell in meters (default: 0.05)
+            margin: Free border around the points in meters (default: 5.0)
+        """
+        points = np.asarray(points, dtype=float).reshape(-1, 2)
+        if len(points) == 0:
+            raise ValueError("Track has no cones")
+        self.resolution = resolution
+        self.min_x, self.min_y = points.min(axis=0) - margin
+        max_x, max_y = points.max(axis=0) + margin
+        self.width = int(math.ceil((max_x - self.min_x) / resolution))
+        self.height = int(math.ceil((max_y - self.min_y) / resolution))
+        self.max_y = self.min_y + self.height * resolution
+
+    def to_cells(self, points):
+        """(N, 2) array of (column, row) cell coordinates as floats."""
+        points = np.asarray(points, dtype=float).reshape(-1, 2)
+        return np.column_stack([(points[:, 0] - self.min_x) / self.resolution,
+                                (self.max_y - points[:, 1]) / self.resolution])
+
+    def metadata(self, image, row=0, column=0, rows=None, columns=None):
+        """
+        map_server YAML metadata of the grid or of a tile of it.
+
+        Args:
+            image: File name of the PGM image, relative to the YAML file
+            row: First row of the tile (default: 0)
+            column: First column of the tile (default: 0)
+            rows: Number of rows of the tile (default: all)
+            columns: Number of columns of the tile (default: all)
+        """
+        rows = self.height - row if rows is None else rows
+        # map_server places the lower left corner of the image at the origin
+        origin_x = self.min_x + column * self.resolution
+        origin_y = self.max_y - (row + rows) * self.resolution
+        return {
+            "image": image,
+            "resolution": float(self.resolution),
+            "origin": [round(float(origin_x), 6), round(float(origin_y), 6), 0.0],
+            "negate": 0,
+            "occupied_thresh": 0.65,
+            "free_thresh": 0.196,
+            "mode": "trinary"
+        }
+
+
+def _disk_offsets(radius):
+    """(K, 2) integer (column, row) offsets of the cells within a radius given in cells."""
+    extent = int(math.ceil(radius))
+    columns, rows = np.meshgrid(np.arange(-extent, extent + 1), np.arange(-extent, extent + 1))
+    inside = columns ** 2 + rows ** 2 <= max(radius, 0.5) ** 2
+    return np.column_stack([columns[inside], rows[inside]])
+
+
+def boundary_segments(track_data):
+    """
+    Segments between neighbouring cones of the ordered boundaries of a track.
+
+    Args:
+        track_data: Track dictionary (coordinates in meters)
+
+    Returns:
+        ndarray: (S, 2, 2) array of segment endpoints
+    """
+    pose = track_data.get("starting_pose") or []
+    start = pose[:2] if len(pose) >= 2 else None
+    segments = []
+    for key in ("cones_left", "cones_right"):
+        cones = np.asarray(track_data.get(key) or [], dtype=float).reshape(-1, 2)
+        if len(cones) < 2:
+            continue
+        order, closed = order_boundary(cones, start)
+        chain = cones[order]
+        if closed:
+            chain = np.vstack([chain, chain[:1]])
+        segments.append(np.stack([chain[:-1], chain[1:]], axis=1))
+    return np.concatenate(segments) if segments else np.empty((0, 2, 2))
+
+
+class OccupancyRasterizer:
+    """
+    Rasterises cones and boundary segments into horizontal bands of an occupancy grid,
+    so that grids of large tracks never have to be allocated as a whole.
+    """
+
+    def __init__(self, layout, cones, segments=None, cone_radius=0.15, line_width=0.2):
+        """
+        Initialize the rasterizer.
+
+        Args:
+            layout: GridLayout of the grid
+            cones: (N, 2) array of cone positions in meters
+            segments: (S, 2, 2) array of boundary segments in meters (default: None)
+            cone_radius: Radius of the occupied disk around each cone in meters (default: 0.15)
+            line_width: Width of the boundary lines in meters (default: 0.2)
+        """
+        self.layout = layout
+        cells = layout.to_cells(cones)
+        # cones sorted by row, so that the cones of a band are a contiguous slice
+        order = np.argsort(cells[:, 1])
+        self.cone_cells = np.floor(cells[order]).astype(np.int64)
+        self.offsets = _disk_offsets(cone_radius / layout.resolution)
+        self.reach = int(np.abs(self.offsets[:, 1]).max()) if len(self.offsets) else 0
+
+        self.thickness = max(int(round(line_width / layout.resolution)), 1)
+        if segments is not None and len(segments):
+            # cv2 fixed-point coordinates with 4 fractional bits
+            self.segment_cells = np.round(layout.to_cells(segments.reshape(-1, 2)).reshape(-1, 2, 2) * 16).astype(np.int32)
+            self.segment_rows = np.sort(self.segment_cells[:, :, 1], axis=1) / 16
+            self.segment_columns = np.sort(self.segment_cells[:, :, 0], axis=1) / 16
+        else:
+            self.segment_cells = np.empty((0, 2, 2), dtype=np.int32)
+            self.segment_rows = np.empty((0, 2))
+            self.segment_columns = np.empty((0, 2))
+
+    def band(self, first_row, rows, first_column=0, columns=None):
+        """
+        Rasterise a band of rows, optionally restricted to a range of columns.
+
+        Args:
+            first_row: First row of the band
+            rows: Number of rows
+            first_column: First column (default: 0)
+            columns: Number of columns (default: up to the right edge)
+
+        Returns:
+            ndarray: (rows, columns) uint8 array of cell values
+        """
+        columns = self.layout.width - first_column if columns is None else columns
+        grid = np.full((rows, columns), FREE, dtype=np.uint8)
+
+        # cones whose disks reach into the band
+        start, end = np.searchsorted(self.cone_cells[:, 1], [first_row - self.reach, first_row + rows + self.reach])
+        if end > start:
+            cells = (self.cone_cells[start:end, None, :] + self.offsets[None, :, :]).reshape(-1, 2)
+            cells -= (first_column, first_row)
+            inside = (cells[:, 0] >= 0) & (cells[:, 0] < columns) & (cells[:, 1] >= 0) & (cells[:, 1] < rows)
+            grid[cells[inside, 1], cells[inside, 0]] = OCCUPIED
+
+        if len(self.segment_cells):
+            margin = self.thickness
+            near = ((self.segment_rows[:, 1] >= first_row - margin) & (self.segment_rows[:, 0] <= first_row + rows + margin)
+                    & (self.segment_columns[:, 1] >= first_column - margin) & (self.segment_columns[:, 0] <= first_column + columns + margin))
+            if near.any():
+                # cv2 rasterises a line differently once an endpoint is clipped, so the band is padded
+                # until it holds the whole segments and their thickness, and cropped afterwards
+                segments = self.segment_cells[near]
+                low = np.floor(segments.reshape(-1, 2).min(axis=0) / 16).astype(int) - margin
+                high = np.ceil(segments.reshape(-1, 2).max(axis=0) / 16).astype(int) + margin + 1
+                left, top = min(low[0], first_column), min(low[1], first_row)
+                right, bottom = max(high[0], first_column + columns), max(high[1], first_row + rows)
+                padded = np.full((bottom - top, right - left), FREE, dtype=np.uint8)
+                cv2.polylines(padded, list(segments - np.array([left, top], dtype=np.int32) * 16), False, OCCUPIED,
+                              thickness=self.thickness, lineType=cv2.LINE_8, shift=4)
+                lines = padded[first_row - top:first_row - top + rows, first_column - left:first_column - left + columns]
+                grid[lines == OCCUPIED] = OCCUPIED
+        return grid
+
+
+def _write_yaml(path, metadata):
+    with open(path, "w") as file:
+        yaml.dump(metadata, file, default_flow_style=False, sort_keys=False)
+
+
+def export_occupancy_grid(track_data, path, resolution=0.05, margin=5.0, cone_radius=0.15,
+                          boundaries=False, line_width=0.2, tile_size=None, band_rows=1024):
+    """
+    Export the occupancy grid of a track as PGM images with map_server YAML metadata.
+    The grid is written in bands of rows, so memory use does not grow with the track area.
+
+    Args:
+        track_data: Track dictionary (coordinates in meters)
+        path: Path of the YAML file, the PGM image is written next to it
+        resolution: Edge length of a cell in meters (default: 0.05)
+        margin: Free border around the cones in meters (default: 5.0)
+        cone_radius: Radius of the occupied disk around each cone in meters (default: 0.15)
+        boundaries: Whether to draw lines between neighbouring boundary cones (default: False)
+        line_width: Width of the boundary lines in meters (default: 0.2)
+        tile_size: Write square tiles of this many cells, each with its own PGM and YAML file
+                   named '<name>_<row>_<column>', instead of a single image (default: None)
+        band_rows: Number of rows rasterised at once (default: 1024)
+
+    Returns:
+        list: Paths of the written YAML files
+    """
+    cones = np.asarray((track_data.get("cones_left") or []) + (track_data.get("cones_right") or []), dtype=float).reshape(-1, 2)
+    layout = GridLayout(cones, resolution, margin)
+    segments = boundary_segments(track_data) if boundaries else None
+    rasterizer = OccupancyRasterizer(layout, cones, segments, cone_radius, line_width)
+
+    directory = os.path.dirname(os.path.abspath(path))
+    name = os.path.splitext(os.path.basename(path))[0]
+
+    if tile_size is None:
+        image = name + ".pgm"
+        with open(os.path.join(directory, image), "wb") as file:
+            file.write(f"P5\n{layout.width} {layout.height}\n255\n".encode("ascii"))
+            for first_row in range(0, layout.height, band_rows):
+                file.write(rasterizer.band(first_row, min(band_rows, layout.height - first_row)).tobytes())
+        _write_yaml(path, layout.metadata(image))
+        return [path]
+
+    written = []
+    for tile_row, first_row in enumerate(range(0, layout.height, tile_size)):
+        rows = min(tile_size, layout.height - first_row)
+        for tile_column, first_column in enumerate(range(0, layout.width, tile_size)):
+            columns = min(tile_size, layout.width - first_column)
+            tile_name = f"{name}_{tile_row}_{tile_column}"
+            cv2.imwrite(os.path.join(directory, tile_name + ".pgm"), rasterizer.band(first_row, rows, first_column, columns))
+            tile_path = os.path.join(directory, tile_name + ".yaml")
+            _write_yaml(tile_path, layout.metadata(tile_name + ".pgm", first_row, first_column, rows, columns))
+            written.append(tile_path)
+    return written
+
+
+def main():
+    """Export the occupancy grid of a track file."""
+    parser = argparse.ArgumentParser(description="Export an occupancy grid (PGM + YAML) of a track file.")
+    parser.add_argument("track", help="YAML track file")
+    parser.add_argument("output", help="YAML metadata file to write, the PGM image is written next to it")
+    parser.add_argument("--resolution", type=float, default=0.05, help="cell size in meters")
+    parser.add_argument("--margin", type=float, default=5.0, help="free border around the cones in meters")
+    parser.add_argument("--cone-radius", type=float, default=0.15, help="occupied radius around each cone in meters")
+    parser.add_argument("--boundaries", action="store_true", help="draw lines between neighbouring boundary cones")
+    parser.add_argument("--tile-size", type=int, default=None, help="write tiles of this many cells instead of one image")
+    args = parser.parse_args()
+
+    with open(args.track, "r") as file:
+        track_data = yaml.safe_load(file)
+    start = time.perf_counter()
+    written = export_occupancy_grid(track_data, args.output, args.resolution, args.margin, args.cone_radius,
+                                    args.boundaries, tile_size=args.tile_size)
+    print(f"Wrote {len(written)} map file(s) in {time.perf_counter() - start:.1f} s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,362 @@
+import logging
+import math
+import os
+import queue
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+import cv2
+import numpy as np
+import yaml
+from PIL import Image, ImageTk
+
+logger = logging.getLogger(__name__)
+
+# extensions of the world files that georeference an image, by image extension
+WORLD_FILE_EXTENSIONS = {".jpg": ".jgw", ".jpeg": ".jgw", ".png": ".pgw", ".tif": ".tfw", ".tiff": ".tfw"}
+
+
+def read_world_file(image_path):
+    """
+    Read the world file next to an image.
+
+    Args:
+        image_path: Path of the image
+
+    Returns:
+        tuple: (origin_x, origin_y, meters_per_pixel) of the upper left pixel corner,
+               None if there is no world file
+    """
+    root, extension = os.path.splitext(image_path)
+    for candidate in (root + WORLD_FILE_EXTENSIONS.get(extension.lower(), ".wld"), root + ".wld"):
+        if os.path.exists(candidate):
+            with open(candidate, "r") as file:
+                values = [float(line) for line in file.read().split()[:6]]
+            pixel_x, _, _, pixel_y, center_x, center_y = values
+            if abs(abs(pixel_x) - abs(pixel_y)) > 1e-9 * abs(pixel_x):
+                logger.warning(f"{candidate}: non-square pixels are not supported, using the x resolution")
+            # world files reference the center of the upper left pixel
+            return center_x - pixel_x / 2, center_y - pixel_y / 2, abs(pixel_x)
+    return None
+
+
+class TilePyramid:
+    """
+    Multi-resolution tile pyramid of a large image, cached on disk.
+    Level 0 holds the full resolution, every further level halves it. Tiles are
+    written once as JPEG files '<cache>/<level>/<row>_<column>.jpg' and reused as
+    long as the source image is unchanged.
+    """
+
+    def __init__(self, image_path, origin=(0.0, 0.0), meters_per_pixel=0.05, cache_dir=None, tile_size=256, workers=4):
+        """
+        Open or build the pyramid of an image.
+
+        Args:
+            image_path: Path of the image
+            origin: (x, y) of the upper left image corner in meters (default: (0.0, 0.0))
+            meters_per_pixel: Ground resolution of the image (default: 0.05)
+            cache_dir: Directory of the tiles (default: '<image_path>.tiles')
+            tile_size: Edge length of the tiles in pixels (default: 256)
+            workers: Number of threads writing tiles (default: 4)
+        """
+        self.image_path = image_path
+        self.origin = origin
+        self.meters_per_pixel = meters_per_pixel
+        self.cache_dir = cache_dir or image_path + ".tiles"
+        self.tile_size = tile_size
+
+        source = os.stat(image_path)
+        self.source_key = {"size": source.st_size, "mtime": source.st_mtime, "tile_size": tile_size}
+        metadata_path = os.path.join(self.cache_dir, "pyramid.yaml")
+        metadata = None
+        if os.path.exists(metadata_path):
+            with open(metadata_path, "r") as file:
+                metadata = yaml.safe_load(file)
+        if not metadata or metadata.get("source") != self.source_key:
+            metadata = self._build(workers)
+            with open(metadata_path, "w") as file:
+                yaml.dump(metadata, file, default_flow_style=False, indent=2)
+
+        self.width = metadata["width"]
+        self.height = metadata["height"]
+        self.levels = metadata["levels"]
+
+    def tile_path(self, level, row, column):
+        return os.path.join(self.cache_dir, str(level), f"{row}_{column}.jpg")
+
+    def level_shape(self, level):
+        """(height, width) of the image at a level in pixels."""
+        factor = 2 ** level
+        return math.ceil(self.height / factor), math.ceil(self.width / factor)
+
+    def tile_grid(self, level):
+        """(rows, columns) of the tiles of a level."""
+        height, width = self.level_shape(level)
+        return math.ceil(height / self.tile_size), math.ceil(width / self.tile_size)
+
+    def _build(self, workers):
+        """Cut the image into tiles and build the reduced levels from the tiles of the level below."""
+        logger.info(f"Building tile pyramid of {self.image_path}")
+        image = cv2.imread(self.image_path, cv2.IMREAD_COLOR)
+        if image is None:
+            raise ValueError(f"Could not read image {self.image_path}")
+        self.height, self.width = image.shape[:2]
+        size = self.tile_size
+        levels = max(math.ceil(math.log2(max(self.width, self.height) / size)), 0) + 1
+
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            os.makedirs(os.path.join(self.cache_dir, "0"), exist_ok=True)
+            rows, columns = self.tile_grid(0)
+            jobs = [executor.submit(cv2.imwrite, self.tile_path(0, row, column),
+                                    image[row * size:(row + 1) * size, column * size:(column + 1) * size])
+                    for row in range(rows) for column in range(columns)]
+            for job in jobs:
+                job.result()
+            del image
+
+            for level in range(1, levels):
+                os.makedirs(os.path.join(self.cache_dir, str(level)), exist_ok=True)
+                rows, columns = self.tile_grid(level)
+                jobs = [executor.submit(self._reduce_tile, level, row, column)
+                        for row in range(rows) for column in range(columns)]
+                for job in jobs:
+                    job.result()
+
+        return {"source": self.source_key, "width": self.width, "height": self.height, "levels": levels}
+
+    def _reduce_tile(self, level, row, column):
+        """Build a tile from the 2x2 tiles below it at half the resolution."""
+        below_rows, below_columns = self.tile_grid(level - 1)
+        parts = []
+        for below_row in (2 * row, 2 * row + 1):
+            if below_row >= below_rows:
+                continue
+            parts.append(np.hstack([cv2.imread(self.tile_path(level - 1, below_row, below_column), cv2.IMREAD_COLOR)
+                                    for below_column in (2 * column, 2 * column + 1) if below_column < below_columns]))
+        block = np.vstack(parts)
+        reduced = cv2.resize(block, (math.ceil(block.shape[1] / 2), math.ceil(block.shape[0] / 2)), interpolation=cv2.INTER_AREA)
+        cv2.imwrite(self.tile_path(level, row, column), reduced)
+
+    def decode(self, level, row, column):
+        """
+        Decode a tile at its resolution in the pyramid, safe to call from worker threads.
+
+        Args:
+            level: Pyramid level
+            row: Tile row
+            column: Tile column
+
+        Returns:
+            ndarray: (height, width, 3) RGB pixels of the tile
+        """
+        tile = cv2.imread(self.tile_path(level, row, column), cv2.IMREAD_COLOR)
+        if tile is None:
+            raise ValueError(f"Could not read tile {self.tile_path(level, row, column)}")
+        return cv2.cvtColor(tile, cv2.COLOR_BGR2RGB)
+
+
+class OrthophotoLayer:
+    """
+    Draws a TilePyramid as the background of the TrackCanvas.
+    Only tiles intersecting the viewport are drawn, from the level closest to the screen
+    resolution. Decoded tiles are kept at their pyramid resolution in an LRU cache keyed by
+    (level, row, column) and scaled to their size on screen on worker threads, so zooming
+    rescales cached tiles instead of reading them again. The previous tiles stay on screen
+    until all replacements have arrived.
+    """
+
+    def __init__(self, canvas, pyramid, scale, name="orthophoto", cache_pixels=16_000_000, workers=4, on_error=None):
+        """
+        Initialize the layer.
+
+        Args:
+            canvas: TrackCanvas to draw on
+            pyramid: TilePyramid of the image, or a function returning it, which then runs on a
+                     worker thread (building the tiles of a new image takes seconds)
+            scale: Logical units per meter of the canvas
+            name: Name of the layer, also used as its tag (default: 'orthophoto')
+            cache_pixels: Total size of the decoded tiles kept in the LRU cache (default: 16 million pixels)
+            workers: Number of decoding threads (default: 4)
+            on_error: Called with the exception if the pyramid cannot be built (default: None)
+        """
+        self.canvas = canvas
+        self.scale = scale
+        self.name = name
+        self.cache_pixels = cache_pixels
+        self.on_error = on_error
+
+        # decoded tiles at pyramid resolution, (level, row, column) -> RGB array
+        self.tiles = OrderedDict()
+        self.cached_pixels = 0
+        # photo images of the tiles on screen, (level, row, column) -> ((width, height), PhotoImage)
+        self.photos = {}
+        self.items = {}
+        # size on screen and position of the tiles of the current view
+        self.wanted = {}
+        # requested screen size of the tiles being rendered
+        self.pending = {}
+        self.decoded = queue.Queue()
+        self.executor = ThreadPoolExecutor(max_workers=workers)
+        self.polling = None
+
+        self.pyramid = None
+        self.loading = None
+        if callable(pyramid):
+            self.loading = self.executor.submit(pyramid)
+            self.loading.add_done_callback(lambda done: self.decoded.put((None, None, done)))
+            self.polling = canvas.after(15, self.poll)
+        else:
+            self.pyramid = pyramid
+
+    def tile_corner(self, level, row, column):
+        """Screen position of the upper left corner of a tile."""
+        pyramid = self.pyramid
+        tile_meters = pyramid.tile_size * pyramid.meters_per_pixel * 2 ** level
+        origin_x, origin_y = pyramid.origin
+        x, y = self.canvas.to_zoom_coords((origin_x + column * tile_meters) * self.scale,
+                                          (origin_y - row * tile_meters) * self.scale)
+        return round(x), round(y)
+
+    def visible_tiles(self):
+        """
+        Tiles intersecting the viewport at the level matching the current zoom.
+
+        Returns:
+            list: (key, (width, height), (x, y)) with key (level, row, column), the size on
+                  screen and the screen position of the upper left tile corner
+        """
+        canvas, pyramid = self.canvas, self.pyramid
+        pixels_per_meter = canvas.zoom_factor * self.scale
+        # finest level with at least one image pixel per screen pixel
+        level = int(math.floor(math.log2(max(1.0 / (pixels_per_meter * pyramid.meters_per_pixel), 1.0))))
+        level = min(level, pyramid.levels - 1)
+
+        tile_meters = pyramid.tile_size * pyramid.meters_per_pixel * 2 ** level
+        origin_x, origin_y = pyramid.origin
+        left, top = canvas.to_logic_coords(0, 0)
+        right, bottom = canvas.to_logic_coords(canvas.winfo_width(), canvas.winfo_height())
+        rows, columns = pyramid.tile_grid(level)
+        first_column = max(int((left / self.scale - origin_x) // tile_meters), 0)
+        last_column = min(int((right / self.scale - origin_x) // tile_meters), columns - 1)
+        first_row = max(int((origin_y - top / self.scale) // tile_meters), 0)
+        last_row = min(int((origin_y - bottom / self.scale) // tile_meters), rows - 1)
+
+        height, width = pyramid.level_shape(level)
+        # screen pixels per image pixel of the level, tile sizes are rounded up so neighbouring tiles overlap instead of leaving gaps
+        factor = pixels_per_meter * pyramid.meters_per_pixel * 2 ** level
+        tiles = []
+        for row in range(first_row, last_row + 1):
+            for column in range(first_column, last_column + 1):
+                tile_width = min(pyramid.tile_size, width - column * pyramid.tile_size)
+                tile_height = min(pyramid.tile_size, height - row * pyramid.tile_size)
+                size = (max(math.ceil(tile_width * factor), 1), max(math.ceil(tile_height * factor), 1))
+                tiles.append(((level, row, column), size, self.tile_corner(level, row, column)))
+        return tiles
+
+    def redraw(self):
+        """Draw the visible tiles and request the missing or differently sized ones from the workers."""
+        if self.pyramid is None:
+            return
+        canvas = self.canvas
+        visible = self.visible_tiles()
+        self.wanted = {key: (size, position) for key, size, position in visible}
+
+        for key, size, (x, y) in visible:
+            photo = self.photos.get(key)
+            if photo is None or photo[0] != size:
+                self.request(key, size)
+            if key in self.items:
+                canvas.coords(self.items[key], x, y)
+                canvas.itemconfig(self.items[key], image=photo[1])
+            elif photo is not None:
+                self.items[key] = canvas.create_image(x, y, anchor="nw", image=photo[1], tags=(self.name,))
+
+        # tiles of the previous view stay until every visible tile has an image
+        complete = all(key in self.items for key in self.wanted)
+        for key in [key for key in self.items if key not in self.wanted]:
+            if complete:
+                canvas.delete(self.items.pop(key))
+                del self.photos[key]
+            else:
+                canvas.coords(self.items[key], *self.tile_corner(*key))
+
+        canvas.tag_lower(self.name)
+        if self.pending and self.polling is None:
+            self.polling = canvas.after(15, self.poll)
+
+    def request(self, key, size):
+        """Render a tile at a size on screen on a worker thread, from the cached pixels if possible."""
+        if self.pending.get(key) == size:
+            return
+        self.pending[key] = size
+        future = self.executor.submit(self._render, key, size, self.tiles.get(key))
+        future.add_done_callback(lambda done, key=key, size=size: self.decoded.put((key, size, done)))
+
+    def _render(self, key, size, tile):
+        """Decode a tile if it is not cached and scale it, runs on a worker thread."""
+        if tile is None:
+            tile = self.pyramid.decode(*key)
+        interpolation = cv2.INTER_AREA if size[0] < tile.shape[1] else cv2.INTER_LINEAR
+        return tile, Image.fromarray(cv2.resize(tile, size, interpolation=interpolation))
+
+    def poll(self):
+        """Turn rendered tiles into photo images on the UI thread and redraw."""
+        self.polling = None
+        received = False
+        while True:
+            try:
+                key, size, future = self.decoded.get_nowait()
+            except queue.Empty:
+                break
+            if key is None:
+                # the pyramid built on a worker thread
+                self.loading = None
+                if future.exception() is not None:
+                    if self.on_error is not None:
+                        self.on_error(future.exception())
+                    else:
+                        logger.error(f"Could not build the tile pyramid: {future.exception()}")
+                    continue
+                self.pyramid = future.result()
+                received = True
+                continue
+            if self.pending.get(key) == size:
+                del self.pending[key]
+            if future.exception() is not None:
+                logger.warning(f"Could not decode tile {key}: {future.exception()}")
+                continue
+
+            tile, image = future.result()
+            if key not in self.tiles:
+                self.cached_pixels += tile.shape[0] * tile.shape[1]
+            self.tiles[key] = tile
+            self.tiles.move_to_end(key)
+            wanted = self.wanted.get(key)
+            # a tile rendered for an outdated size still replaces a blank spot
+            if wanted is not None and (wanted[0] == size or key not in self.photos):
+                self.photos[key] = (size, ImageTk.PhotoImage(image))
+                received = True
+
+        # evict least recently used tiles
+        while self.cached_pixels > self.cache_pixels and len(self.tiles) > 1:
+            _, tile = self.tiles.popitem(last=False)
+            self.cached_pixels -= tile.shape[0] * tile.shape[1]
+
+        if received:
+            self.redraw()
+        elif self.pending or self.loading is not None:
+            self.polling = self.canvas.after(15, self.poll)
+
+    def remove(self):
+        """Remove all tiles and stop the workers."""
+        if self.polling is not None:
+            self.canvas.after_cancel(self.polling)
+            self.polling = None
+        self.canvas.delete(self.name)
+        self.items.clear()
+        self.photos.clear()
+        self.tiles.clear()
+        self.pending.clear()
+        self.cached_pixels = 0
+        self.executor.shutdown(wait=False, cancel_futures=True)
@@ -0,0 +1,331 @@
+import argparse
+import math
+import time
+
+import numpy as np
+import yaml
+from scipy.spatial import cKDTree
+
+from ui_components.TrackGeometry import resample_polyline, track_centerline
+
+# type codes of the observations, false positives are reported as -1
+CONE_TYPES = ("blue", "yellow")
+
+# size of a small FSAE cone in meters
+CONE_RADIUS = 0.114
+CONE_HEIGHT = 0.325
+
+
+class SensorModel:
+    """
+    Field of view and noise model of a simulated cone sensor.
+    A 'lidar' reports range and bearing, a 'camera' additionally projects the
+    cones into a pinhole image. All distances are in meters, angles in degrees.
+    """
+
+    def __init__(self, kind="lidar", max_range=20.0, min_range=0.5, fov=None,
+                 range_noise=0.02, range_noise_factor=0.005, bearing_noise=0.2,
+                 detection_probability=0.98, misclassification=0.0, false_positive_rate=0.0,
+                 occlusion=True, image_width=1280, image_height=720, mount_height=1.0):
+        """
+        Initialize the sensor model.
+
+        Args:
+            kind: 'lidar' or 'camera' (default: 'lidar')
+            max_range: Largest detection distance (default: 20.0)
+            min_range: Smallest detection distance (default: 0.5)
+            fov: Horizontal field of view centered on the car heading, below 180 for a camera
+                 (default: 360.0 for a lidar, 90.0 for a camera)
+            range_noise: Standard deviation of the range noise (default: 0.02)
+            range_noise_factor: Additional range noise per meter of range (default: 0.005)
+            bearing_noise: Standard deviation of the bearing noise in degrees (default: 0.2)
+            detection_probability: Probability that a visible cone is reported at close range,
+                                   falls off quadratically to half of it at max_range (default: 0.98)
+            misclassification: Probability that a cone is reported with the other colour (default: 0.0)
+            false_positive_rate: Mean number of spurious detections per frame (default: 0.0)
+            occlusion: Whether cones hidden behind closer cones are dropped (default: True)
+            image_width: Camera image width in pixels (default: 1280)
+            image_height: Camera image height in pixels (default: 720)
+            mount_height: Camera height above the ground (default: 1.0)
+
+        Raises:
+            ValueError: If the kind is unknown or a camera has a field of view of 180 degrees or more
+        """
+        if kind not in ("lidar", "camera"):
+            raise ValueError(f"Unknown sensor kind: {kind}")
+        if fov is None:
+            fov = 360.0 if kind == "lidar" else 90.0
+        if kind == "camera" and not 0.0 < fov < 180.0:
+            raise ValueError(f"A pinhole camera needs a field of view below 180 degrees, got {fov}")
+        self.kind = kind
+        self.max_range = max_range
+        self.min_range = min_range
+        self.fov = fov
+        self.range_noise = range_noise
+        self.range_noise_factor = range_noise_factor
+        self.bearing_noise = bearing_noise
+        self.detection_probability = detection_probability
+        self.misclassification = misclassification
+        self.false_positive_rate = false_positive_rate
+        self.occlusion = occlusion
+        self.image_width = image_width
+        self.image_height = image_height
+        self.mount_height = mount_height
+
+    @property
+    def focal_length(self):
+        """Focal length of the camera in pixels for the horizontal field of view."""
+        return self.image_width / 2 / math.tan(math.radians(self.fov) / 2)
+
+
+def _occluded(ranges, bearings):
+    """
+    Find cones hidden behind closer cones.
+    A cone counts as hidden if its center bearing lies within the angular extent of a closer cone.
+
+    Args:
+        ranges: (N,) distances of the cones
+        bearings: (N,) bearings of the cones in radians
+
+    Returns:
+        ndarray: (N,) boolean array, True for hidden cones
+    """
+    if len(ranges) < 2:
+        return np.zeros(len(ranges), dtype=bool)
+    half_width = np.arcsin(np.minimum(CONE_RADIUS / ranges, 1.0))
+    difference = np.abs((bearings[None, :] - bearings[:, None] + np.pi) % (2 * np.pi) - np.pi)
+    # row: occluding cone, column: occluded cone
+    blocks = (difference < half_width[:, None]) & (ranges[:, None] < ranges[None, :])
+    return blocks.any(axis=0)
+
+
+class PerceptionSimulator:
+    """
+    Generates cone observations of a track from car poses.
+    A KD-tree over the cones culls everything outside the sensor range, so the cost of
+    a frame depends on the number of nearby cones rather than the size of the track.
+    """
+
+    def __init__(self, positions, types, sensor=None, seed=None):
+        """
+        Initialize the simulator with the cones of a track.
+
+        Args:
+            positions: (N, 2) array of cone positions in meters
+            types: (N,) array of cone types ('blue' or 'yellow')
+            sensor: SensorModel to simulate (default: lidar with default noise)
+            seed: Seed of the random generator for reproducible noise (default: None)
+        """
+        self.positions = np.asarray(positions, dtype=float).reshape(-1, 2)
+        types = np.asarray(types)
+        self.type_codes = np.full(len(types), -1, dtype=np.int8)
+        for code, name in enumerate(CONE_TYPES):
+            self.type_codes[types == name] = code
+        self.sensor = sensor or SensorModel()
+        self.rng = np.random.default_rng(seed)
+        self.tree = cKDTree(self.positions) if len(self.positions) else None
+
+    def observe(self, pose, candidates=None):
+        """
+        Simulate one sensor frame.
+
+        Args:
+            pose: (x, y, yaw) of the sensor in meters and degrees
+            candidates: Indices of the cones within range, queried from the KD-tree if None (default: None)
+
+        Returns:
+            dict: Arrays 'cone_id', 'type', 'range', 'bearing' (radians, left positive), and 'x', 'y'
+                  in the sensor frame (x forward); a camera adds the pixel columns 'u', 'v' of the
+                  cone base and the cone height 'height' in pixels and drops cones whose base lies
+                  outside the image. False positives have cone_id -1.
+        """
+        sensor = self.sensor
+        x, y, yaw = float(pose[0]), float(pose[1]), math.radians(float(pose[2]))
+        if candidates is None:
+            candidates = self.tree.query_ball_point((x, y), sensor.max_range) if self.tree is not None else []
+        candidates = np.asarray(candidates, dtype=int)
+
+        offsets = self.positions[candidates] - (x, y)
+        ranges = np.hypot(offsets[:, 0], offsets[:, 1])
+        bearings = (np.arctan2(offsets[:, 1], offsets[:, 0]) - yaw + np.pi) % (2 * np.pi) - np.pi
+
+        visible = (ranges >= sensor.min_range) & (ranges <= sensor.max_range)
+        if sensor.fov < 360.0:
+            visible &= np.abs(bearings) <= math.radians(sensor.fov) / 2
+        candidates, ranges, bearings = candidates[visible], ranges[visible], bearings[visible]
+
+        if sensor.occlusion:
+            visible = ~_occluded(ranges, bearings)
+            candidates, ranges, bearings = candidates[visible], ranges[visible], bearings[visible]
+
+        # detection dropout, more likely at long range
+        probability = sensor.detection_probability * (1 - 0.5 * (ranges / sensor.max_range) ** 2)
+        detected = self.rng.random(len(ranges)) < probability
+        candidates, ranges, bearings = candidates[detected], ranges[detected], bearings[detected]
+        types = self.type_codes[candidates]
+
+        if sensor.misclassification > 0:
+            flip = (self.rng.random(len(types)) < sensor.misclassification) & (types >= 0)
+            types = np.where(flip, 1 - types, types).astype(np.int8)
+
+        count = len(ranges)
+        ranges = ranges + self.rng.normal(0.0, 1.0, count) * (sensor.range_noise + sensor.range_noise_factor * ranges)
+        bearings = bearings + self.rng.normal(0.0, math.radians(sensor.bearing_noise), count)
+
+        if sensor.false_positive_rate > 0:
+            spurious = self.rng.poisson(sensor.false_positive_rate)
+            half_fov = math.radians(min(sensor.fov, 360.0)) / 2
+            candidates = np.concatenate([candidates, np.full(spurious, -1)])
+            types = np.concatenate([types, np.full(spurious, -1, dtype=np.int8)])
+            ranges = np.concatenate([ranges, self.rng.uniform(sensor.min_range, sensor.max_range, spurious)])
+            bearings = np.concatenate([bearings, self.rng.uniform(-half_fov, half_fov, spurious)])
+
+        observation = {
+            "cone_id": candidates,
+            "type": types,
+            "range": ranges,
+            "bearing": bearings,
+            "x": ranges * np.cos(bearings),
+            "y": ranges * np.sin(bearings)
+        }
+        if sensor.kind == "camera":
+            observation.update(self.project(observation))
+            inside = ((observation["u"] >= 0) & (observation["u"] < sensor.image_width) &
+                      (observation["v"] >= 0) & (observation["v"] < sensor.image_height))
+            observation = {key: values[inside] for key, values in observation.items()}
+        return observation
+
+    def project(self, observation):
+        """
+        Project observations into the camera image of a flat ground plane.
+
+        Args:
+            observation: Result of observe with 'x' and 'y' in the sensor frame
+
+        Returns:
+            dict: Pixel coordinates 'u', 'v' of the cone bases and the cone heights 'height' in pixels
+        """
+        sensor = self.sensor
+        focal = sensor.focal_length
+        depth = np.maximum(observation["x"], 1e-3)
+        return {
+            "u": sensor.image_width / 2 - focal * observation["y"] / depth,
+            "v": sensor.image_height / 2 + focal * sensor.mount_height / depth,
+            "height": focal * CONE_HEIGHT / depth
+        }
+
+    def observe_batch(self, poses):
+        """
+        Simulate a frame for every pose. The range queries of all poses run in one KD-tree call.
+
+        Args:
+            poses: (F, 3) array of (x, y, yaw) poses in meters and degrees
+
+        Returns:
+            dict: Observations of all frames concatenated, with 'frame' holding the frame index
+                  of each observation, 'offsets' (F + 1,) the start of each frame and 'poses'
+        """
+        poses = np.asarray(poses, dtype=float).reshape(-1, 3)
+        if self.tree is not None:
+            neighbourhoods = self.tree.query_ball_point(poses[:, :2], self.sensor.max_range)
+        else:
+            neighbourhoods = [[] for _ in range(len(poses))]
+        frames = [self.observe(pose, candidates) for pose, candidates in zip(poses, neighbourhoods)]
+
+        counts = np.array([len(frame["range"]) for frame in frames], dtype=int)
+        batch = {key: np.concatenate([frame[key] for frame in frames]) if frames else np.empty(0)
+                 for key in (frames[0] if frames else {})}
+        batch["frame"] = np.repeat(np.arange(len(frames)), counts)
+        batch["offsets"] = np.concatenate([[0], np.cumsum(counts)])
+        batch["poses"] = poses
+        return batch
+
+
+def write_observations(path, batch):
+    """
+    Write an observation batch to a NumPy .npz archive.
+
+    Args:
+        path: Output file path
+        batch: Result of PerceptionSimulator.observe_batch
+    """
+    np.savez(path, cone_types=np.array(CONE_TYPES), **batch)
+
+
+def poses_along_track(track_data, spacing=1.0):
+    """
+    Sample car poses along the centerline of a track dictionary.
+
+    Args:
+        track_data: Track dictionary as stored in the YAML files (coordinates in meters)
+        spacing: Distance between the poses in meters (default: 1.0)
+
+    Returns:
+        ndarray: (F, 3) array of (x, y, yaw) poses, the starting pose if there is no centerline
+    """
+    centerline = track_centerline(track_data)
+    if centerline is None:
+        pose = track_data.get("starting_pose") or []
+        return np.asarray([pose[:3]], dtype=float) if len(pose) >= 3 else np.empty((0, 3))
+
+    closed = centerline["closed"]
+    points = resample_polyline(centerline["points"], spacing, closed)
+    following = np.roll(points, -1, axis=0) if closed else np.vstack([points[1:], 2 * points[-1:] - points[-2:-1]])
+    heading = following - points
+    yaw = np.degrees(np.arctan2(heading[:, 1], heading[:, 0]))
+    return np.column_stack([points, yaw])
+
+
+def simulator_from_track(track_data, sensor=None, seed=None):
+    """
+    Create a simulator for a track dictionary as stored in the YAML files.
+
+    Args:
+        track_data: Track dictionary (coordinates in meters)
+        sensor: SensorModel to simulate (default: lidar with default noise)
+        seed: Seed of the random generator (default: None)
+
+    Returns:
+        PerceptionSimulator: Simulator over the blue and yellow cones of the track
+    """
+    blue = track_data.get("cones_left") or []
+    yellow = track_data.get("cones_right") or []
+    positions = np.asarray(blue + yellow, dtype=float).reshape(-1, 2)
+    types = np.array(["blue"] * len(blue) + ["yellow"] * len(yellow))
+    return PerceptionSimulator(positions, types, sensor, seed)
+
+
+def main():
+    """Generate observation batches along the centerline of a track file."""
+    parser = argparse.ArgumentParser(description="Generate synthetic cone observations for a track file.")
+    parser.add_argument("track", help="YAML track file")
+    parser.add_argument("output", help="output .npz file")
+    parser.add_argument("--sensor", choices=("lidar", "camera"), default="lidar", help="sensor kind")
+    parser.add_argument("--spacing", type=float, default=1.0, help="distance between the poses in meters")
+    parser.add_argument("--laps", type=int, default=1, help="number of passes along the centerline")
+    parser.add_argument("--range", type=float, default=20.0, help="maximum detection range in meters")
+    parser.add_argument("--fov", type=float, default=None, help="field of view in degrees (default: 360 for lidar, 90 for camera)")
+    parser.add_argument("--range-noise", type=float, default=0.02, help="range noise in meters")
+    parser.add_argument("--bearing-noise", type=float, default=0.2, help="bearing noise in degrees")
+    parser.add_argument("--false-positives", type=float, default=0.0, help="mean false positives per frame")
+    parser.add_argument("--seed", type=int, default=None, help="random seed")
+    args = parser.parse_args()
+
+    with open(args.track, "r") as file:
+        track_data = yaml.safe_load(file)
+
+    sensor = SensorModel(args.sensor, max_range=args.range, fov=args.fov, range_noise=args.range_noise,
+                         bearing_noise=args.bearing_noise, false_positive_rate=args.false_positives)
+    simulator = simulator_from_track(track_data, sensor, args.seed)
+    poses = np.tile(poses_along_track(track_data, args.spacing), (max(args.laps, 1), 1))
+
+    start = time.perf_counter()
+    batch = simulator.observe_batch(poses)
+    elapsed = time.perf_counter() - start
+    write_observations(args.output, batch)
+    print(f"{args.output}: {len(poses)} frames, {len(batch['frame'])} observations "
+          f"({len(poses) / max(elapsed, 1e-9):.0f} frames/s)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,186 @@
+import functools
+import time
+from collections import deque
+
+import numpy as np
+
+
+class HandlerTimings:
+    """
+    Rolling timings of the canvas event handlers and the frames they cause.
+    A handler called from within another measured handler (e.g. draw_grid during a zoom)
+    is recorded on its own; only the outermost call counts as an event and opens a frame,
+    which ends once Tk is idle again, i.e. after the canvas has been redrawn.
+    """
+
+    def __init__(self, samples=240):
+        """
+        Initialize the timings.
+
+        Args:
+            samples: Number of recent samples kept per handler (default: 240)
+        """
+        self.enabled = False
+        self.samples = samples
+        self.durations = {}
+        self.frame_times = deque(maxlen=samples)
+        self.event_times = deque()
+        self.depth = 0
+        self.frame_start = None
+        self.widget = None
+
+    def enable(self, widget):
+        """
+        Start recording.
+
+        Args:
+            widget: Tk widget used to detect the end of a frame
+        """
+        self.widget = widget
+        self.enabled = True
+
+    def disable(self):
+        """Stop recording and drop all samples."""
+        self.enabled = False
+        self.durations.clear()
+        self.frame_times.clear()
+        self.event_times.clear()
+        self.frame_start = None
+
+    def record(self, name, duration):
+        """Add a duration in seconds to the samples of a handler."""
+        samples = self.durations.get(name)
+        if samples is None:
+            samples = self.durations[name] = deque(maxlen=self.samples)
+        samples.append(duration)
+
+    def call(self, name, func, args, kwargs):
+        """Run a handler and record its duration."""
+        start = time.perf_counter()
+        outermost = self.depth == 0
+        if outermost:
+            self.event_times.append(start)
+            if self.frame_start is None and self.widget is not None:
+                self.frame_start = start
+                self.widget.after_idle(self._end_frame)
+        self.depth += 1
+        try:
+            return func(*args, **kwargs)
+        finally:
+            self.depth -= 1
+            self.record(name, time.perf_counter() - start)
+
+    def _end_frame(self):
+        if self.frame_start is not None:
+            self.frame_times.append(time.perf_counter() - self.frame_start)
+            self.frame_start = None
+
+    def events_per_second(self):
+        """Number of handled events during the last second."""
+        limit = time.perf_counter() - 1.0
+        while self.event_times and self.event_times[0] < limit:
+            self.event_times.popleft()
+        return len(self.event_times)
+
+    @staticmethod
+    def percentiles(samples):
+        """
+        Median, 95th and 99th percentile of samples in milliseconds.
+
+        Returns:
+            ndarray: (p50, p95, p99), empty if there are no samples
+        """
+        if not samples:
+            return np.empty(0)
+        return np.percentile(np.fromiter(samples, dtype=float, count=len(samples)), (50, 95, 99)) * 1000.0
+
+
+# shared by all measured handlers, the HUD turns it on and off
+TIMINGS = HandlerTimings()
+
+
+def timed(name):
+    """
+    Decorator recording the duration of a handler while the HUD is shown.
+    When the HUD is hidden, the only overhead is one attribute lookup per call.
+
+    Args:
+        name: Name of the handler in the HUD
+    """
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if not TIMINGS.enabled:
+                return func(*args, **kwargs)
+            return TIMINGS.call(name, func, args, kwargs)
+        return wrapper
+    return decorator
+
+
+class PerformanceHUD:
+    """
+    Text overlay on the TrackCanvas showing frame time, events per second and
+    rolling percentiles of the handler timings. Refreshed a few times per second
+    while shown; nothing is measured or drawn while it is hidden.
+    """
+
+    def __init__(self, canvas, refresh_interval=250):
+        """
+        Initialize the HUD.
+
+        Args:
+            canvas: TrackCanvas to draw on
+            refresh_interval: Milliseconds between updates of the text (default: 250)
+        """
+        self.canvas = canvas
+        self.refresh_interval = refresh_interval
+        self.visible = False
+        self.scheduled = None
+
+    def toggle(self):
+        """Show or hide the HUD."""
+        if self.visible:
+            self.hide()
+        else:
+            self.show()
+
+    def show(self):
+        self.visible = True
+        TIMINGS.enable(self.canvas)
+        self.refresh()
+
+    def hide(self):
+        self.visible = False
+        TIMINGS.disable()
+        if self.scheduled is not None:
+            self.canvas.after_cancel(self.scheduled)
+            self.scheduled = None
+        self.canvas.delete("performance_hud")
+
+    def text(self):
+        """The lines shown by the HUD."""
+        frame = TIMINGS.percentiles(TIMINGS.frame_times)
+        lines = [f"{'':<20}{'p50':>8}{'p95':>8}{'p99':>8}  ms"]
+        if len(frame):
+            lines.append(f"{'frame':<20}" + "".join(f"{value:8.2f}" for value in frame))
+        for name in sorted(TIMINGS.durations):
+            values = TIMINGS.percentiles(TIMINGS.durations[name])
+            lines.append(f"{name:<20}" + "".join(f"{value:8.2f}" for value in values))
+        lines.append(f"events/s {TIMINGS.events_per_second()}")
+        return "\n".join(lines)
+
+    def refresh(self):
+        """Redraw the text in the top-right corner and schedule the next update."""
+        self.scheduled = None
+        if not self.visible:
+            return
+        canvas = self.canvas
+        x = canvas.winfo_width() - 20
+        items = canvas.find_withtag("performance_hud")
+        if items:
+            canvas.itemconfig(items[0], text=self.text())
+            canvas.coords(items[0], x, 20)
+        else:
+            canvas.create_text(x, 20, text=self.text(), anchor="ne", justify="left", fill="#D3D3D3", font=("Courier", 10), tags="performance_hud")
+        canvas.tag_raise("performance_hud")
+        self.scheduled = canvas.after(self.refresh_interval, self.refresh)
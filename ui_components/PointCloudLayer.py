@@ -0,0 +1,323 @@
+import math
+import queue
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+from PIL import Image, ImageTk
+
+# numpy types of the PLY property types
+PLY_TYPES = {
+    "char": "i1", "int8": "i1", "uchar": "u1", "uint8": "u1",
+    "short": "i2", "int16": "i2", "ushort": "u2", "uint16": "u2",
+    "int": "i4", "int32": "i4", "uint": "u4", "uint32": "u4",
+    "float": "f4", "float32": "f4", "double": "f8", "float64": "f8"
+}
+
+
+def _read_header(path, end_marker, max_lines=200):
+    """Read the text header of a point cloud file up to the end marker, returns (lines, data offset)."""
+    lines = []
+    with open(path, "rb") as file:
+        for _ in range(max_lines):
+            line = file.readline()
+            if not line:
+                break
+            text = line.decode("ascii", errors="replace").strip()
+            lines.append(text)
+            if text.startswith(end_marker):
+                return lines, file.tell()
+    raise ValueError(f"{path}: no '{end_marker}' in header")
+
+
+def read_ply(path):
+    """
+    Read the vertices of a PLY file, memory-mapped for binary files.
+
+    Args:
+        path: Path of the PLY file
+
+    Returns:
+        ndarray: (N, 3) float array or structured view with the x, y, z coordinates
+    """
+    lines, offset = _read_header(path, "end_header")
+    file_format = next(line.split()[1] for line in lines if line.startswith("format"))
+
+    count = None
+    fields = []
+    element = None
+    for line in lines:
+        parts = line.split()
+        if parts[0] == "element":
+            element = parts[1]
+            if element == "vertex":
+                count = int(parts[2])
+            elif count is None:
+                raise ValueError(f"{path}: elements before the vertices are not supported")
+        elif parts[0] == "property" and element == "vertex":
+            if parts[1] == "list":
+                raise ValueError(f"{path}: list properties of vertices are not supported")
+            fields.append((parts[2], PLY_TYPES[parts[1]]))
+
+    if file_format == "ascii":
+        columns = [index for index, (name, _) in enumerate(fields) if name in ("x", "y", "z")]
+        return np.loadtxt(path, skiprows=len(lines), max_rows=count, usecols=columns, ndmin=2)
+
+    byte_order = "<" if file_format == "binary_little_endian" else ">"
+    dtype = np.dtype([(name, byte_order + kind) for name, kind in fields])
+    vertices = np.memmap(path, dtype=dtype, mode="r", offset=offset, shape=(count,))
+    return _xyz(vertices)
+
+
+def read_pcd(path):
+    """
+    Read the points of a PCD file, memory-mapped for binary files.
+
+    Args:
+        path: Path of the PCD file
+
+    Returns:
+        ndarray: (N, 3) float array or structured view with the x, y, z coordinates
+    """
+    lines, offset = _read_header(path, "DATA")
+    header = {line.split()[0]: line.split()[1:] for line in lines if line and not line.startswith("#")}
+    names = header["FIELDS"]
+    sizes = [int(size) for size in header["SIZE"]]
+    kinds = header["TYPE"]
+    counts = [int(count) for count in header.get("COUNT", ["1"] * len(names))]
+    points = int(header["POINTS"][0])
+    data = header["DATA"][0]
+
+    if data == "ascii":
+        columns = []
+        column = 0
+        for name, count in zip(names, counts):
+            if name in ("x", "y", "z"):
+                columns.append(column)
+            column += count
+        return np.loadtxt(path, skiprows=len(lines), max_rows=points, usecols=columns, ndmin=2)
+    if data != "binary":
+        raise ValueError(f"{path}: PCD data '{data}' is not supported, convert it to binary")
+
+    kind_codes = {"F": "f", "I": "i", "U": "u"}
+    dtype = np.dtype([(name if name != "_" else f"_{index}", f"<{kind_codes[kind]}{size}", (count,) if count > 1 else ())
+                      for index, (name, size, kind, count) in enumerate(zip(names, sizes, kinds, counts))])
+    cloud = np.memmap(path, dtype=dtype, mode="r", offset=offset, shape=(points,))
+    return _xyz(cloud)
+
+
+def _xyz(records):
+    """Structured view of the x, y and z fields, without copying the memory-mapped records."""
+    missing = [name for name in ("x", "y", "z") if name not in records.dtype.names]
+    if missing:
+        raise ValueError(f"Point cloud has no {', '.join(missing)} field")
+    return records[["x", "y", "z"]]
+
+
+def load_point_cloud(path):
+    """
+    Load a PLY or PCD point cloud.
+
+    Args:
+        path: Path of the point cloud file
+
+    Returns:
+        ndarray: x, y, z coordinates, memory-mapped where the format allows
+    """
+    if path.lower().endswith(".pcd"):
+        return read_pcd(path)
+    return read_ply(path)
+
+
+def _columns(points, start, end):
+    """(M, 2) float array of the x and y coordinates of a slice of a point cloud."""
+    chunk = points[start:end]
+    if chunk.dtype.names:
+        return np.column_stack([chunk["x"], chunk["y"]]).astype(float)
+    return np.asarray(chunk[:, :2], dtype=float)
+
+
+class VoxelPyramid:
+    """
+    2D voxel grids of a point cloud at doubling voxel sizes.
+    Every level stores the mean position and the number of points per occupied voxel.
+    The finest level is computed chunk-wise from the memory-mapped cloud, coarser levels
+    from the level below, each only when it is first needed.
+    """
+
+    def __init__(self, points, voxel_size=0.05, chunk=1 << 21):
+        """
+        Compute the finest level.
+
+        Args:
+            points: Point cloud from load_point_cloud
+            voxel_size: Edge length of the finest voxels in meters (default: 0.05)
+            chunk: Number of points read at once (default: 2^21)
+        """
+        self.voxel_size = voxel_size
+        self.levels = {}
+
+        centers, counts = [], []
+        for start in range(0, len(points), chunk):
+            xy = _columns(points, start, start + chunk)
+            xy = xy[np.isfinite(xy).all(axis=1)]
+            level_centers, level_counts = self._reduce(xy, np.ones(len(xy)), voxel_size)
+            centers.append(level_centers)
+            counts.append(level_counts)
+        if centers:
+            # voxels split across chunks are merged in a second reduction
+            self.levels[0] = self._reduce(np.vstack(centers), np.concatenate(counts), voxel_size)
+        else:
+            self.levels[0] = (np.empty((0, 2)), np.empty(0))
+        self.point_count = len(points)
+
+    @staticmethod
+    def _reduce(xy, weights, size):
+        """Weighted mean position and total weight of the points per voxel."""
+        if len(xy) == 0:
+            return np.empty((0, 2)), np.empty(0)
+        keys = np.floor(xy / size).astype(np.int64)
+        _, inverse = np.unique(keys[:, 0] * (1 << 32) + keys[:, 1], return_inverse=True)
+        inverse = inverse.ravel()
+        counts = np.bincount(inverse, weights=weights)
+        centers = np.column_stack([np.bincount(inverse, weights=xy[:, 0] * weights),
+                                   np.bincount(inverse, weights=xy[:, 1] * weights)]) / counts[:, None]
+        return centers, counts
+
+    def level(self, index):
+        """(centers, counts) of a level, computed from the level below if needed."""
+        if index not in self.levels:
+            centers, counts = self.level(index - 1)
+            self.levels[index] = self._reduce(centers, counts, self.voxel_size * 2 ** index)
+        return self.levels[index]
+
+    def level_for(self, meters_per_pixel):
+        """Coarsest level whose voxels are not larger than a screen pixel."""
+        return max(int(math.floor(math.log2(max(meters_per_pixel / self.voxel_size, 1.0)))), 0)
+
+    def render(self, bounds, width, height, color=(120, 200, 255)):
+        """
+        Rasterise the cloud into an image, the brightness follows the log point density.
+
+        Args:
+            bounds: (min x, min y, max x, max y) of the image in meters
+            width: Image width in pixels
+            height: Image height in pixels
+            color: RGB colour of the densest pixels (default: light blue)
+
+        Returns:
+            PIL.Image.Image: RGBA image, transparent where there are no points
+        """
+        min_x, min_y, max_x, max_y = bounds
+        meters_per_pixel = (max_x - min_x) / width
+        centers, counts = self.level(self.level_for(meters_per_pixel))
+
+        columns = ((centers[:, 0] - min_x) / meters_per_pixel).astype(np.int64)
+        rows = ((max_y - centers[:, 1]) / meters_per_pixel).astype(np.int64)
+        inside = (columns >= 0) & (columns < width) & (rows >= 0) & (rows < height)
+        density = np.bincount(rows[inside] * width + columns[inside], weights=counts[inside], minlength=width * height)
+
+        image = np.zeros((height * width, 4), dtype=np.uint8)
+        occupied = density > 0
+        if occupied.any():
+            intensity = np.log1p(density[occupied])
+            intensity = 0.35 + 0.65 * intensity / intensity.max()
+            image[occupied, :3] = (intensity[:, None] * np.asarray(color)).astype(np.uint8)
+            image[occupied, 3] = (intensity * 255).astype(np.uint8)
+        return Image.fromarray(image.reshape(height, width, 4), "RGBA")
+
+
+class PointCloudLayer:
+    """
+    Draws a point cloud map under the cones of the TrackCanvas as a single image item.
+    The image is rendered for the current viewport on a worker thread. While a new image
+    is rendered, panning moves the previous one along.
+    """
+
+    def __init__(self, canvas, pyramid, scale, name="pointcloud"):
+        """
+        Initialize the layer.
+
+        Args:
+            canvas: TrackCanvas to draw on
+            pyramid: VoxelPyramid of the point cloud
+            scale: Logical units per meter of the canvas
+            name: Name of the layer, also used as its tag (default: 'pointcloud')
+        """
+        self.canvas = canvas
+        self.pyramid = pyramid
+        self.scale = scale
+        self.name = name
+
+        self.executor = ThreadPoolExecutor(max_workers=1)
+        self.rendered = queue.Queue()
+        self.request = 0
+        self.polling = None
+        self.item = None
+        self.image = None
+        # (zoom, offset x, offset y) the current image was rendered for
+        self.view = None
+
+    def redraw(self):
+        """Follow the current view and request an image for it."""
+        canvas = self.canvas
+        view = (canvas.zoom_factor, canvas.offset_x, canvas.offset_y)
+        if view == self.view:
+            return
+        if self.item is not None and self.view[0] == view[0]:
+            canvas.coords(self.item, view[1] - self.view[1], view[2] - self.view[2])
+
+        width, height = max(canvas.winfo_width(), 1), max(canvas.winfo_height(), 1)
+        left, top = canvas.to_logic_coords(0, 0)
+        right, bottom = canvas.to_logic_coords(width, height)
+        bounds = (left / self.scale, bottom / self.scale, right / self.scale, top / self.scale)
+
+        # only the latest request is rendered, older ones are skipped by the worker
+        self.request += 1
+        self.executor.submit(self._render, self.request, view, bounds, width, height)
+        if self.polling is None:
+            self.polling = canvas.after(15, self.poll)
+
+    def _render(self, request, view, bounds, width, height):
+        if request != self.request:
+            return
+        self.rendered.put((request, view, self.pyramid.render(bounds, width, height)))
+
+    def poll(self):
+        """Show the latest rendered image on the UI thread."""
+        self.polling = None
+        latest = None
+        while True:
+            try:
+                latest = self.rendered.get_nowait()
+            except queue.Empty:
+                break
+
+        if latest is not None and latest[0] == self.request:
+            _, self.view, image = latest
+            self.image = ImageTk.PhotoImage(image)
+            canvas = self.canvas
+            if self.item is None:
+                self.item = canvas.create_image(0, 0, anchor="nw", image=self.image, tags=(self.name,))
+            else:
+                canvas.itemconfigure(self.item, image=self.image)
+            # the current view may have moved on while rendering
+            zoom, offset_x, offset_y = canvas.zoom_factor, canvas.offset_x, canvas.offset_y
+            canvas.coords(self.item, offset_x - self.view[1], offset_y - self.view[2])
+            canvas.tag_lower(self.name)
+            if canvas.find_withtag("orthophoto"):
+                canvas.tag_lower("orthophoto")
+            if zoom != self.view[0]:
+                self.redraw()
+        else:
+            self.polling = self.canvas.after(15, self.poll)
+
+    def remove(self):
+        """Remove the image and stop the worker."""
+        if self.polling is not None:
+            self.canvas.after_cancel(self.polling)
+            self.polling = None
+        self.request += 1
+        self.canvas.delete(self.name)
+        self.item = None
+        self.image = None
+        self.executor.shutdown(wait=False, cancel_futures=True)
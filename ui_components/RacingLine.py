@@ -0,0 +1,283 @@
+import argparse
+import logging
+import math
+
+import numpy as np
+import yaml
+from scipy import sparse
+from scipy.sparse.linalg import spsolve
+from scipy.spatial import cKDTree
+
+from ui_components.TrackGeometry import order_boundary, resample_polyline, track_centerline
+from ui_components.TrackMetrics import curvature, polyline_length
+
+logger = logging.getLogger(__name__)
+
+
+def _normals(points, closed):
+    """Unit left normals of a polyline, from central differences."""
+    if closed:
+        tangents = np.roll(points, -1, axis=0) - np.roll(points, 1, axis=0)
+    else:
+        tangents = np.gradient(points, axis=0)
+    tangents /= np.maximum(np.hypot(*tangents.T), 1e-12)[:, None]
+    return np.column_stack([-tangents[:, 1], tangents[:, 0]])
+
+
+def _second_difference(count, closed):
+    """Sparse second-difference operator p[i-1] - 2 p[i] + p[i+1]."""
+    if closed:
+        operator = sparse.diags([1.0, -2.0, 1.0], [-1, 0, 1], shape=(count, count), format="lil")
+        operator[0, count - 1] = 1.0
+        operator[count - 1, 0] = 1.0
+        return operator.tocsr()
+    return sparse.diags([1.0, -2.0, 1.0], [0, 1, 2], shape=(count - 2, count), format="csr")
+
+
+def _solve_bounded_qp(hessian, gradient, lower, upper, start=None, tolerance=1e-8, max_iterations=200):
+    """
+    Minimise 1/2 x'Hx + g'x subject to lower <= x <= upper with Bertsekas' projected Newton method.
+    Bounds that are (almost) reached and pushed against form the active set; every iteration
+    takes a Newton step on the free variables (one sparse factorisation), a scaled gradient step
+    on the active ones, and a projected Armijo line search, so the objective decreases monotonically.
+    The iteration stops when the projected gradient satisfies the KKT conditions.
+
+    Args:
+        hessian: Sparse symmetric positive definite (N, N) matrix
+        gradient: (N,) linear term
+        lower: (N,) lower bounds
+        upper: (N,) upper bounds
+        start: Previous solution to start from (default: None)
+        tolerance: Largest projected gradient entry of a solution, relative to the linear term (default: 1e-8)
+        max_iterations: Maximum number of Newton steps (default: 200)
+
+    Returns:
+        tuple: (x, converged) with the (N,) solution and whether the KKT conditions are met
+    """
+    hessian = sparse.csr_matrix(hessian)
+    diagonal = np.maximum(hessian.diagonal(), 1e-12)
+    x = np.clip(np.zeros(len(gradient)) if start is None else start, lower, upper)
+    threshold = tolerance * max(np.abs(gradient).max(initial=0.0), 1e-12)
+
+    def objective(values):
+        return 0.5 * values @ (hessian @ values) + gradient @ values
+
+    value = objective(x)
+    for _ in range(max_iterations):
+        slope = hessian @ x + gradient
+        projected = x - np.clip(x - slope, lower, upper)
+        residual = np.abs(projected).max(initial=0.0)
+        if residual <= threshold:
+            return x, True
+
+        # bounds within epsilon that the gradient pushes against are kept fixed for the Newton step
+        epsilon = min(residual, 1e-3)
+        active = ((x <= lower + epsilon) & (slope > 0)) | ((x >= upper - epsilon) & (slope < 0))
+        free = ~active
+        direction = -slope / diagonal
+        if free.any():
+            direction[free] = -spsolve(hessian[free][:, free].tocsc(), slope[free])
+
+        step = 1.0
+        while True:
+            candidate = np.clip(x + step * direction, lower, upper)
+            candidate_value = objective(candidate)
+            if candidate_value <= value + 1e-4 * slope @ (candidate - x) or step < 1e-10:
+                break
+            step *= 0.5
+        x, value = candidate, candidate_value
+
+    slope = hessian @ x + gradient
+    return x, np.abs(x - np.clip(x - slope, lower, upper)).max(initial=0.0) <= threshold
+
+
+def solve_racing_line(reference, left_space, right_space, closed=True, margin=1.0, iterations=3):
+    """
+    Compute a minimum-curvature line within the track.
+    The line is the reference shifted along its normals by alpha. Each iteration minimises the
+    squared second differences of the line, weighted by the current point spacing, as a sparse
+    quadratic problem with the track limits as bounds.
+
+    Args:
+        reference: (N, 2) array of evenly spaced reference points (e.g. the resampled centerline)
+        left_space: (N,) available distance to the left boundary at each point
+        right_space: (N,) available distance to the right boundary at each point
+        closed: Whether the track is a loop (default: True)
+        margin: Distance kept from the boundaries, e.g. half the vehicle width (default: 1.0)
+        iterations: Number of linearisations (default: 3)
+
+    Returns:
+        dict: 'points' (N, 2) racing line, 'alpha' (N,) lateral offsets from the reference,
+              'curvature' (N,) curvature along the line and 'converged' whether the last
+              quadratic problem was solved to the KKT tolerance
+    """
+    reference = np.asarray(reference, dtype=float).reshape(-1, 2)
+    count = len(reference)
+    normals = _normals(reference, closed)
+
+    upper = np.maximum(np.asarray(left_space, dtype=float) - margin, 0.0)
+    lower = -np.maximum(np.asarray(right_space, dtype=float) - margin, 0.0)
+    upper = np.maximum(upper, lower)
+
+    difference = _second_difference(count, closed)
+    offset_x = difference @ sparse.diags(normals[:, 0])
+    offset_y = difference @ sparse.diags(normals[:, 1])
+    base_x = difference @ reference[:, 0]
+    base_y = difference @ reference[:, 1]
+
+    alpha = np.zeros(count)
+    points = reference
+    converged = True
+    for _ in range(iterations):
+        # curvature ~ second difference / spacing^2 with the spacing of the current line
+        segments = np.hypot(*np.diff(np.vstack([points, points[:1]]) if closed else points, axis=0).T)
+        if closed:
+            spacing = (segments + np.roll(segments, 1)) / 2
+        else:
+            spacing = (segments[:-1] + segments[1:]) / 2
+        weights = sparse.diags(1.0 / np.maximum(spacing, 1e-6) ** 2)
+
+        matrix = sparse.vstack([weights @ offset_x, weights @ offset_y]).tocsr()
+        target = np.concatenate([weights @ base_x, weights @ base_y])
+        # || matrix @ alpha + target ||^2 as a quadratic problem, regularised to stay definite on straights
+        hessian = (matrix.T @ matrix + sparse.identity(count) * 1e-9).tocsr()
+        alpha, converged = _solve_bounded_qp(hessian, matrix.T @ target, lower, upper, alpha)
+        if not converged:
+            logger.warning("Racing line: bounded QP did not converge, the line is not optimal")
+        points = reference + normals * alpha[:, None]
+
+    return {
+        "points": points,
+        "alpha": alpha,
+        "curvature": curvature(points, closed),
+        "converged": converged
+    }
+
+
+def boundary_space(reference, blue, yellow, closed=True, candidates=16):
+    """
+    Available distance from each reference point to the track boundaries, measured along
+    the normals of the reference. The cones of each colour are ordered into a chain and the
+    normal is intersected with the chain segments in both directions, so the left and right
+    sides follow the driving direction of the reference rather than the cone colours.
+    Where a normal misses every segment, the distance to the nearest cone is used.
+
+    Args:
+        reference: (N, 2) array of reference points
+        blue: (M, 2) array of blue cone positions
+        yellow: (K, 2) array of yellow cone positions
+        closed: Whether the reference is a loop (default: True)
+        candidates: Number of nearest segments tested per point (default: 16)
+
+    Returns:
+        tuple: (left_space, right_space) arrays of shape (N,)
+    """
+    reference = np.asarray(reference, dtype=float).reshape(-1, 2)
+    normals = _normals(reference, closed)
+    starts, ends = [], []
+    for cones in (blue, yellow):
+        cones = np.asarray(cones, dtype=float).reshape(-1, 2)
+        if len(cones) < 2:
+            continue
+        order, chain_closed = order_boundary(cones)
+        chain = cones[order]
+        starts.append(chain if chain_closed else chain[:-1])
+        ends.append(np.roll(chain, -1, axis=0) if chain_closed else chain[1:])
+    cones = np.vstack([np.asarray(blue, dtype=float).reshape(-1, 2), np.asarray(yellow, dtype=float).reshape(-1, 2)])
+    nearest, _ = cKDTree(cones).query(reference)
+    if not starts:
+        return nearest, nearest.copy()
+
+    starts, ends = np.vstack(starts), np.vstack(ends)
+    k = min(candidates, len(starts))
+    _, index = cKDTree((starts + ends) / 2).query(reference, k=k)
+    index = index.reshape(len(reference), k)
+
+    # reference + t * normal = start + s * direction, a hit for 0 <= s <= 1
+    direction = ends[index] - starts[index]
+    offset = starts[index] - reference[:, None]
+    normal = normals[:, None]
+    denominator = normal[..., 0] * direction[..., 1] - normal[..., 1] * direction[..., 0]
+    parallel = np.abs(denominator) < 1e-12
+    denominator = np.where(parallel, 1.0, denominator)
+    t = (offset[..., 0] * direction[..., 1] - offset[..., 1] * direction[..., 0]) / denominator
+    s = (offset[..., 0] * normal[..., 1] - offset[..., 1] * normal[..., 0]) / denominator
+    hit = ~parallel & (s >= 0.0) & (s <= 1.0)
+
+    left_space = np.where(hit & (t > 0), t, np.inf).min(axis=1)
+    right_space = np.where(hit & (t < 0), -t, np.inf).min(axis=1)
+    left_space = np.where(np.isfinite(left_space), left_space, nearest)
+    right_space = np.where(np.isfinite(right_space), right_space, nearest)
+    return left_space, right_space
+
+
+def racing_line_from_cones(centerline, blue, yellow, spacing=2.0, margin=1.0, iterations=3):
+    """
+    Compute the racing line of a cone layout.
+
+    Args:
+        centerline: Result of TrackGeometry.compute_centerline
+        blue: (M, 2) array of blue cone positions
+        yellow: (K, 2) array of yellow cone positions
+        spacing: Distance between the points of the racing line in meters (default: 2.0)
+        margin: Distance kept from the cones in meters (default: 1.0)
+        iterations: Number of linearisations (default: 3)
+
+    Returns:
+        dict: Result of solve_racing_line with the 'closed' flag and the 'length' in meters,
+              None if the centerline is too short
+    """
+    closed = centerline["closed"]
+    reference = resample_polyline(centerline["points"], spacing, closed)
+    if len(reference) < 5:
+        return None
+
+    left_space, right_space = boundary_space(reference, blue, yellow, closed)
+    racing_line = solve_racing_line(reference, left_space, right_space, closed, margin, iterations)
+    racing_line["closed"] = closed
+    racing_line["length"] = polyline_length(racing_line["points"], closed)
+    return racing_line
+
+
+def racing_line_from_track(track_data, **options):
+    """
+    Compute the racing line of a track dictionary as stored in the YAML files.
+
+    Args:
+        track_data: Track dictionary (coordinates in meters)
+        **options: Passed on to racing_line_from_cones
+
+    Returns:
+        dict: Result of racing_line_from_cones, None if no racing line can be computed
+    """
+    centerline = track_centerline(track_data)
+    if centerline is None:
+        return None
+    blue = np.asarray(track_data.get("cones_left") or [], dtype=float)
+    yellow = np.asarray(track_data.get("cones_right") or [], dtype=float)
+    return racing_line_from_cones(centerline, blue, yellow, **options)
+
+
+def main():
+    """Compute the racing lines of track files and print their length and minimum radius."""
+    parser = argparse.ArgumentParser(description="Evaluate minimum-curvature racing lines of track files.")
+    parser.add_argument("tracks", nargs="+", help="YAML track files")
+    parser.add_argument("--spacing", type=float, default=2.0, help="point spacing in meters")
+    parser.add_argument("--margin", type=float, default=1.0, help="distance kept from the cones in meters")
+    parser.add_argument("--iterations", type=int, default=3, help="number of linearisations")
+    args = parser.parse_args()
+
+    for path in args.tracks:
+        with open(path, "r") as file:
+            track_data = yaml.safe_load(file)
+        racing_line = racing_line_from_track(track_data, spacing=args.spacing, margin=args.margin, iterations=args.iterations)
+        if racing_line is None:
+            print(f"{path}: no racing line")
+            continue
+        max_curvature = float(np.abs(racing_line["curvature"]).max())
+        min_radius = 1.0 / max_curvature if max_curvature > 0 else math.inf
+        print(f"{path}: length {racing_line['length']:.1f} m, min. radius {min_radius:.1f} m")
+
+
+if __name__ == "__main__":
+    main()
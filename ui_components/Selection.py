@@ -0,0 +1,337 @@
+import math
+
+import numpy as np
+
+# modifier bits of Tk key and mouse events
+SHIFT_MASK = 0x1
+CONTROL_MASK = 0x4
+
+
+def points_in_polygon(points, polygon):
+    """
+    Even-odd test of many points against a polygon.
+
+    Args:
+        points: (N, 2) array of positions
+        polygon: (M, 2) array of polygon vertices, implicitly closed
+
+    Returns:
+        ndarray: (N,) boolean mask of the points inside the polygon
+    """
+    points = np.asarray(points, dtype=float).reshape(-1, 2)
+    polygon = np.asarray(polygon, dtype=float).reshape(-1, 2)
+    inside = np.zeros(len(points), dtype=bool)
+    if len(polygon) < 3:
+        return inside
+    x, y = points[:, 0], points[:, 1]
+    for (x1, y1), (x2, y2) in zip(polygon, np.roll(polygon, -1, axis=0)):
+        crosses = (y1 > y) != (y2 > y)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            intersection = x1 + (y - y1) * (x2 - x1) / (y2 - y1)
+        inside ^= crosses & (x < intersection)
+    return inside
+
+
+class ConeIndex:
+    """
+    Cone positions sorted by x for box and lasso queries.
+    The index is rebuilt lazily on the first query after a track change.
+    """
+
+    def __init__(self, window):
+        """
+        Initialize the index.
+
+        Args:
+            window: Main application window holding the cones
+        """
+        self.window = window
+        self.cones = None
+        self.positions = None
+
+    def invalidate(self):
+        self.cones = None
+
+    def _build(self):
+        cones = list(self.window.cones)
+        positions = np.array([(cone.position_x, cone.position_y) for cone in cones], dtype=float).reshape(-1, 2)
+        order = np.argsort(positions[:, 0], kind="stable")
+        self.cones = [cones[index] for index in order]
+        self.positions = positions[order]
+
+    def _candidates(self, min_x, max_x):
+        """Slice of the sorted cones with x between min_x and max_x."""
+        if self.cones is None:
+            self._build()
+        x = self.positions[:, 0]
+        return int(np.searchsorted(x, min_x, side="left")), int(np.searchsorted(x, max_x, side="right"))
+
+    def query_box(self, min_x, min_y, max_x, max_y):
+        """
+        Cones inside an axis-aligned box.
+
+        Args:
+            min_x, min_y, max_x, max_y: Box corners in logical coordinates
+
+        Returns:
+            list: The cones inside the box
+        """
+        start, end = self._candidates(min_x, max_x)
+        y = self.positions[start:end, 1]
+        return [self.cones[start + index] for index in np.flatnonzero((y >= min_y) & (y <= max_y))]
+
+    def query_polygon(self, polygon):
+        """
+        Cones inside a lasso polygon.
+
+        Args:
+            polygon: (M, 2) array of polygon vertices in logical coordinates
+
+        Returns:
+            list: The cones inside the polygon
+        """
+        polygon = np.asarray(polygon, dtype=float).reshape(-1, 2)
+        if len(polygon) < 3:
+            return []
+        start, end = self._candidates(polygon[:, 0].min(), polygon[:, 0].max())
+        inside = points_in_polygon(self.positions[start:end], polygon)
+        return [self.cones[start + index] for index in np.flatnonzero(inside)]
+
+
+def transform_matrix(rotation=0.0, scale=1.0, mirror=None):
+    """
+    2x2 matrix of a rotation, uniform scale and optional mirroring.
+
+    Args:
+        rotation: Counter-clockwise rotation in degrees (default: 0.0)
+        scale: Scale factor (default: 1.0)
+        mirror: 'x' to mirror across the vertical axis, 'y' across the horizontal axis (default: None)
+    """
+    angle = math.radians(rotation)
+    matrix = scale * np.array([[math.cos(angle), -math.sin(angle)], [math.sin(angle), math.cos(angle)]])
+    if mirror == "x":
+        matrix = matrix @ np.diag([-1.0, 1.0])
+    elif mirror == "y":
+        matrix = matrix @ np.diag([1.0, -1.0])
+    return matrix
+
+
+class SelectionTool:
+    """
+    Rubber-band and lasso selection of cones with bulk transforms of the selection.
+    Dragging on empty canvas draws a selection box, Ctrl+drag a lasso and Shift adds
+    to the current selection. Dragging a selected cone moves the selection, Shift+drag
+    rotates and Ctrl+drag scales it around its center. While dragging, the transform is
+    computed on the position array and drawn once per frame; the cones are only moved,
+    snapped to the grid, when the mouse is released.
+    """
+
+    def __init__(self, window):
+        """
+        Initialize the tool.
+
+        Args:
+            window: Main application window holding the cones
+        """
+        self.window = window
+        self.canvas = window.placing_canvas
+        self.index = ConeIndex(window)
+        self.selected = {}
+
+        self.mode = None
+        self.additive = False
+        self.band_points = []
+        self.band_item = None
+
+        # state of a transform drag
+        self.base = None
+        self.items = None
+        self.center = None
+        self.anchor = None
+        self.kind = None
+        self.preview = None
+        self.drawn_offset = (0.0, 0.0)
+        self.frame = None
+
+    def on_track_changed(self, change, canvas_object):
+        """Keep the index and the selection in sync with the track."""
+        if self.mode == "transform" and change in ("move", "delete", "delete_many", "clear"):
+            self.cancel_transform()
+        self.index.invalidate()
+        if change == "clear":
+            self.selected.clear()
+            self._selection_changed()
+        elif change == "delete_many":
+            removed = [cone for cone in canvas_object if cone in self.selected]
+            for cone in removed:
+                del self.selected[cone]
+            if removed:
+                self._selection_changed()
+        elif change == "delete" and canvas_object in self.selected:
+            del self.selected[canvas_object]
+            self._selection_changed()
+
+    def select(self, cones, additive=False):
+        """
+        Replace or extend the selection.
+
+        Args:
+            cones: Cones to select
+            additive: Add to the current selection instead of replacing it (default: False)
+        """
+        canvas = self.canvas
+        if not additive:
+            self.clear()
+        for cone in cones:
+            if cone not in self.selected:
+                self.selected[cone] = None
+                canvas.addtag_withtag("selected", cone.id)
+        canvas.itemconfig("selected", outline="#FFFFFF", width=2)
+        self._selection_changed()
+
+    def clear(self):
+        """Deselect all cones."""
+        if not self.selected:
+            return
+        self.canvas.itemconfig("selected", outline="", width=1)
+        self.canvas.dtag("selected", "selected")
+        self.selected.clear()
+        self._selection_changed()
+
+    def _selection_changed(self):
+        if hasattr(self.window, 'selection_changed'):
+            self.window.selection_changed(len(self.selected))
+
+    def press(self, event):
+        """Start a selection box, a lasso or a transform of the selection."""
+        canvas = self.canvas
+        position = canvas.to_logic_coords(event.x, event.y)
+        items = canvas.find_overlapping(event.x - 3, event.y - 3, event.x + 3, event.y + 3)
+        selected_items = {cone.id for cone in self.selected}
+
+        if any(item in selected_items for item in items):
+            self.mode = "transform"
+            self.kind = "rotate" if event.state & SHIFT_MASK else "scale" if event.state & CONTROL_MASK else "translate"
+            cones = list(self.selected)
+            self.items = [cone.id for cone in cones]
+            self.base = np.array([(cone.position_x, cone.position_y) for cone in cones], dtype=float)
+            self.center = self.base.mean(axis=0)
+            self.anchor = np.array(position)
+            self.preview = self.base
+            self.drawn_offset = (0.0, 0.0)
+            return
+
+        self.mode = "lasso" if event.state & CONTROL_MASK else "box"
+        self.additive = bool(event.state & SHIFT_MASK)
+        self.band_points = [position]
+        if self.mode == "box":
+            self.band_item = canvas.create_rectangle(event.x, event.y, event.x, event.y, outline="#FFFFFF", dash=(4, 2), tags="selection_band")
+        else:
+            self.band_item = canvas.create_line(event.x, event.y, event.x, event.y, fill="#FFFFFF", dash=(4, 2), tags="selection_band")
+
+    def motion(self, event):
+        """Update the selection band or the transform preview."""
+        canvas = self.canvas
+        position = canvas.to_logic_coords(event.x, event.y)
+        if self.mode == "box":
+            start_x, start_y = canvas.to_zoom_coords(*self.band_points[0])
+            canvas.coords(self.band_item, start_x, start_y, event.x, event.y)
+            self.band_points[1:] = [position]
+        elif self.mode == "lasso":
+            self.band_points.append(position)
+            canvas.coords(self.band_item, canvas.overlay_coords(np.array(self.band_points + self.band_points[:1])))
+        elif self.mode == "transform":
+            self.preview = self._drag_transform(np.array(position))
+            if self.frame is None:
+                self.frame = canvas.after(16, self._draw_preview)
+
+    def release(self, event):
+        """Finish the selection or apply the transform to the cones."""
+        canvas = self.canvas
+        mode, self.mode = self.mode, None
+        if mode in ("box", "lasso"):
+            canvas.delete("selection_band")
+            self.band_item = None
+            points = np.array(self.band_points)
+            if mode == "box":
+                if len(points) < 2:
+                    cones = []
+                else:
+                    (min_x, min_y), (max_x, max_y) = points.min(axis=0), points.max(axis=0)
+                    cones = self.index.query_box(min_x, min_y, max_x, max_y)
+            else:
+                cones = self.index.query_polygon(points)
+            self.select(cones, additive=self.additive)
+        elif mode == "transform":
+            if self.frame is not None:
+                canvas.after_cancel(self.frame)
+                self.frame = None
+            self._apply(list(self.selected), self._drag_transform(np.array(canvas.to_logic_coords(event.x, event.y))))
+
+    def cancel_transform(self):
+        """Drop a running transform drag and put the cones back to their positions."""
+        if self.frame is not None:
+            self.canvas.after_cancel(self.frame)
+            self.frame = None
+        self.mode = None
+        for cone in self.selected:
+            cone.update_zoom(self.canvas.zoom_factor)
+
+    def _drag_transform(self, position):
+        """Positions of the selected cones for the current drag position."""
+        if self.kind == "translate":
+            return self.base + (position - self.anchor)
+        start = self.anchor - self.center
+        current = position - self.center
+        if self.kind == "rotate":
+            rotation = math.degrees(math.atan2(current[1], current[0]) - math.atan2(start[1], start[0]))
+            matrix = transform_matrix(rotation=rotation)
+        else:
+            matrix = transform_matrix(scale=max(np.hypot(*current), 1e-6) / max(np.hypot(*start), 1e-6))
+        return (self.base - self.center) @ matrix.T + self.center
+
+    def _draw_preview(self):
+        """Draw the preview positions, one canvas update per frame."""
+        self.frame = None
+        if self.mode != "transform":
+            return
+        canvas = self.canvas
+        zoom = canvas.zoom_factor
+        if self.kind == "translate":
+            # the whole selection moves by the same offset: one call for all items
+            offset_x, offset_y = (self.preview[0] - self.base[0]) * (zoom, -zoom)
+            canvas.move("selected", offset_x - self.drawn_offset[0], offset_y - self.drawn_offset[1])
+            self.drawn_offset = (offset_x, offset_y)
+            return
+        radius = 3
+        screen = self.preview * (zoom, -zoom) + (canvas.offset_x, canvas.offset_y)
+        for item, (x, y) in zip(self.items, screen.tolist()):
+            canvas.coords(item, x - radius, y - radius, x + radius, y + radius)
+
+    def transform(self, rotation=0.0, scale=1.0, mirror=None):
+        """
+        Rotate, scale or mirror the selection around its center.
+
+        Args:
+            rotation: Counter-clockwise rotation in degrees (default: 0.0)
+            scale: Scale factor (default: 1.0)
+            mirror: 'x' or 'y' to mirror across the vertical or horizontal axis (default: None)
+        """
+        cones = list(self.selected)
+        if not cones:
+            return
+        positions = np.array([(cone.position_x, cone.position_y) for cone in cones], dtype=float)
+        center = positions.mean(axis=0)
+        matrix = transform_matrix(rotation, scale, mirror)
+        self._apply(cones, (positions - center) @ matrix.T + center)
+
+    def _apply(self, cones, positions):
+        """Move the cones to the given positions, snapped to the grid."""
+        step = self.canvas.logic_grid_step
+        snapped = np.round(positions / step) * step
+        for cone, (x, y) in zip(cones, snapped.tolist()):
+            cone.move(x, y)
+
+    def delete(self):
+        """Delete the selected cones in one batch."""
+        self.window.remove_cones(list(self.selected))
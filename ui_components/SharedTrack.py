@@ -0,0 +1,219 @@
+import logging
+import time
+from multiprocessing import shared_memory
+from tkinter import TclError
+
+import numpy as np
+
+from ui_components.LiveLink import CONE_TYPE_CODES, CONE_TYPE_NAMES
+
+logger = logging.getLogger(__name__)
+
+MAGIC = b"TBSM"
+VERSION = 1
+
+# fixed-size header at the start of the block, followed by the cone positions and types
+HEADER = np.dtype([
+    ("magic", "S4"), ("version", "<u2"), ("header_size", "<u2"),
+    # seqlock counter: odd while the writer is updating the block
+    ("sequence", "<u8"),
+    ("capacity", "<u4"), ("count", "<u4"),
+    # bit 0: car present, bit 1: more cones than capacity, bit 2: writer closed
+    ("flags", "<u4"),
+    ("car_x", "<f4"), ("car_y", "<f4"), ("car_yaw", "<f4")
+])
+HEADER_SIZE = 64
+
+FLAG_CAR = 1
+FLAG_TRUNCATED = 2
+FLAG_CLOSED = 4
+
+
+def _layout(buffer, capacity):
+    """Header, (capacity, 2) float32 positions in meters and (capacity,) uint8 types viewed on a buffer."""
+    header = np.ndarray((), dtype=HEADER, buffer=buffer)
+    positions = np.ndarray((capacity, 2), dtype="<f4", buffer=buffer, offset=HEADER_SIZE)
+    types = np.ndarray((capacity,), dtype="u1", buffer=buffer, offset=HEADER_SIZE + capacity * 8)
+    return header, positions, types
+
+
+class SharedTrackWriter:
+    """
+    Publishes the cones and the car pose of the main window in a shared memory block,
+    so that simulators on the same machine can read the current track without parsing files.
+    The block is rewritten once per idle cycle after the track changed. Updates are guarded
+    by a seqlock: the sequence counter is odd while writing and even once the block is consistent.
+    """
+
+    def __init__(self, window, name="track_builder", capacity=65536):
+        """
+        Initialize the writer.
+
+        Args:
+            window: Main application window holding the cones and the car
+            name: Name of the shared memory block (default: 'track_builder')
+            capacity: Largest number of cones the block holds (default: 65536)
+        """
+        self.window = window
+        self.canvas = window.placing_canvas
+        self.name = name
+        self.capacity = capacity
+        self.memory = None
+        self.scheduled = None
+
+    def start(self):
+        """Create the block, publish the current track and start listening to track changes."""
+        if self.memory is not None:
+            return
+        size = HEADER_SIZE + self.capacity * 9
+        try:
+            self.memory = shared_memory.SharedMemory(self.name, create=True, size=size)
+        except FileExistsError:
+            # left over by a writer that did not shut down cleanly
+            stale = shared_memory.SharedMemory(self.name)
+            stale.close()
+            stale.unlink()
+            self.memory = shared_memory.SharedMemory(self.name, create=True, size=size)
+        self.header, self.positions, self.types = _layout(self.memory.buf, self.capacity)
+        self.header["magic"] = MAGIC
+        self.header["version"] = VERSION
+        self.header["header_size"] = HEADER_SIZE
+        self.header["capacity"] = self.capacity
+
+        self.publish()
+        self.window.track_listeners.append(self.on_track_changed)
+        logger.info(f"Publishing track in shared memory '{self.name}'")
+
+    def stop(self):
+        """Mark the block as closed and release it."""
+        if self.memory is None:
+            return
+        self.window.track_listeners.remove(self.on_track_changed)
+        if self.scheduled is not None:
+            try:
+                self.canvas.after_cancel(self.scheduled)
+            except TclError:
+                # the window has already been destroyed
+                pass
+            self.scheduled = None
+        self.header["sequence"] += 1
+        self.header["flags"] |= FLAG_CLOSED
+        self.header["sequence"] += 1
+        # the views have to be released before the memory can be closed
+        del self.header, self.positions, self.types
+        self.memory.close()
+        self.memory.unlink()
+        self.memory = None
+
+    def on_track_changed(self, change, canvas_object):
+        """Schedule a publish for the next idle cycle, several changes are written once."""
+        if self.scheduled is None:
+            self.scheduled = self.canvas.after_idle(self.publish)
+
+    def publish(self):
+        """Write the current cones and car pose into the block."""
+        self.scheduled = None
+        window = self.window
+        cones = window.cones[:self.capacity]
+        count = len(cones)
+        positions = np.array([(cone.position_x, cone.position_y) for cone in cones], dtype=float).reshape(-1, 2) / window.scale
+        types = np.array([CONE_TYPE_CODES.get(cone.cone_type, 0) for cone in cones], dtype=np.uint8)
+
+        flags = FLAG_TRUNCATED if len(window.cones) > self.capacity else 0
+        car = window.car
+        if car is not None:
+            flags |= FLAG_CAR
+
+        header = self.header
+        header["sequence"] += 1
+        self.positions[:count] = positions
+        self.types[:count] = types
+        header["count"] = count
+        header["flags"] = flags
+        if car is not None:
+            header["car_x"] = car.position_x / window.scale
+            header["car_y"] = car.position_y / window.scale
+            header["car_yaw"] = car.yaw_angle
+        header["sequence"] += 1
+
+
+class SharedTrackReader:
+    """
+    Reads the track published by a SharedTrackWriter, e.g. from a simulator process.
+    """
+
+    def __init__(self, name="track_builder"):
+        """
+        Attach to a shared memory block.
+
+        Args:
+            name: Name of the shared memory block (default: 'track_builder')
+        """
+        # attaching must not register the block with the resource tracker of the reader,
+        # which would unlink it when the reader exits
+        try:
+            self.memory = shared_memory.SharedMemory(name, track=False)
+        except TypeError:
+            self.memory = shared_memory.SharedMemory(name)
+            from multiprocessing import resource_tracker
+            resource_tracker.unregister(self.memory._name, "shared_memory")
+        header = np.ndarray((), dtype=HEADER, buffer=self.memory.buf)
+        if bytes(header["magic"]) != MAGIC or header["version"] != VERSION:
+            self.memory.close()
+            raise ValueError(f"Shared memory '{name}' does not hold a track of version {VERSION}")
+        self.header, self.positions, self.types = _layout(self.memory.buf, int(header["capacity"]))
+        self.sequence = None
+
+    @property
+    def closed(self):
+        """Whether the writer has shut down."""
+        return bool(self.header["flags"] & FLAG_CLOSED)
+
+    def read(self, timeout=1.0):
+        """
+        Copy a consistent state of the track.
+
+        Args:
+            timeout: Seconds to retry while the writer is updating the block (default: 1.0)
+
+        Returns:
+            dict: 'sequence', 'positions' ((N, 2) meters), 'types' (cone type codes),
+                  'car_pose' ((x, y, yaw) or None) and 'truncated'
+        """
+        deadline = time.monotonic() + timeout
+        while True:
+            before = int(self.header["sequence"])
+            if before % 2 == 0:
+                count = int(self.header["count"])
+                flags = int(self.header["flags"])
+                car_pose = (float(self.header["car_x"]), float(self.header["car_y"]), float(self.header["car_yaw"]))
+                positions = self.positions[:count].copy()
+                types = self.types[:count].copy()
+                if int(self.header["sequence"]) == before:
+                    break
+            if time.monotonic() > deadline:
+                raise TimeoutError("Shared track is not consistent")
+
+        self.sequence = before
+        return {
+            "sequence": before,
+            "positions": positions,
+            "types": types,
+            "car_pose": car_pose if flags & FLAG_CAR else None,
+            "truncated": bool(flags & FLAG_TRUNCATED)
+        }
+
+    def poll(self):
+        """Like read, but returns None if the track has not changed since the last read."""
+        if int(self.header["sequence"]) == self.sequence:
+            return None
+        return self.read()
+
+    @staticmethod
+    def type_names(types):
+        """Cone type names of an array of cone type codes."""
+        return [CONE_TYPE_NAMES.get(int(code), "unknown") for code in types]
+
+    def close(self):
+        del self.header, self.positions, self.types
+        self.memory.close()
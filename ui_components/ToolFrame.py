@@ -4,6 +4,7 @@ import cairosvg
 from customtkinter import *
 from PIL import Image, ImageTk
 import io
+import logging
 import math
 from svgpathtools import svg2paths
 
@@ -11,9 +12,13 @@ import os
 import cv2
 import numpy as np
 from ui_components import CanvasObjects
+from ui_components.TrackMetrics import STRAIGHT_BINS
+from ui_components.Tracing import TRACER, traced
 
 BASE_DIR = os.path.dirname(os.path.abspath(__file__))
 
+logger = logging.getLogger(__name__)
+
 
 def get_asset_path(filename: str) -> str:
     return os.path.join(BASE_DIR, "assets", filename)
@@ -84,6 +89,10 @@ class ToolFrame(CTkFrame):
         self.generate_tool_button = CTkButton(self, command=self.open_generate_tool, text="GENERATE", font=("Roboto", 12), width=100, fg_color="#141414", bg_color="#000000", corner_radius=6, border_width=1, border_color="#141414", hover_color="#7A4315")
         #self.generate_tool_button.grid(row=1, column=5, sticky="nsew", padx=(5, 5), pady=10)
 
+        #live track validation
+        self.validate_button = CTkButton(self, command=self.toggle_validation, text="CHECK", font=("Roboto", 12), width=80, fg_color="#141414", bg_color="#000000", corner_radius=6, border_width=1, border_color="#141414", hover_color="#7A4315")
+        self.validate_button.grid(row=1, column=5, sticky="nsew", padx=(5, 5), pady=10)
+
         # separator
         separator = CTkFrame(self, width=1, height=30, fg_color="#4A4A4A")
         separator.grid(row=1, column=6, sticky="ns", padx=(15, 10), pady=10)
@@ -96,6 +105,50 @@ class ToolFrame(CTkFrame):
         self.load_button = CTkButton(self, command=lambda: self.master.load_track(), text="LOAD", font=("Roboto", 12), width=80, fg_color="#141414", bg_color="#000000", corner_radius=6, border_width=1, border_color="#141414", hover_color="#7A4315")
         self.load_button.grid(row=1, column=8, sticky="nsew", padx=(5, 5), pady=10)
 
+        # order cones into boundary chains when saving
+        self.order_cones_var = BooleanVar(value=False)
+        self.order_cones_checkbox = CTkCheckBox(self, variable=self.order_cones_var, text="ORDER", font=("Roboto", 12), width=20, checkbox_width=18, checkbox_height=18, border_width=1, corner_radius=4, fg_color="#7A4315", hover_color="#7A4315")
+        self.order_cones_checkbox.grid(row=1, column=9, sticky="nsew", padx=(10, 15), pady=10)
+
+        # views, overlays and exports on a second row, the first one has to fit the window width
+        self.view_row = CTkFrame(self, fg_color="#000000", bg_color="#000000")
+        self.view_row.grid(row=2, column=1, columnspan=9, sticky="e", padx=(5, 10))
+
+        # show the centerline and add it to saved tracks
+        self.centerline_var = BooleanVar(value=False)
+        self.centerline_checkbox = CTkCheckBox(self.view_row, variable=self.centerline_var, command=self.toggle_centerline, text="CENTERLINE", font=("Roboto", 12), width=20, checkbox_width=18, checkbox_height=18, border_width=1, corner_radius=4, fg_color="#7A4315", hover_color="#7A4315")
+        self.centerline_checkbox.grid(row=0, column=0, sticky="nsew", padx=(5, 5), pady=(0, 10))
+
+        # show the minimum-curvature racing line
+        self.racing_line_var = BooleanVar(value=False)
+        self.racing_line_checkbox = CTkCheckBox(self.view_row, variable=self.racing_line_var, command=self.toggle_racing_line, text="RACING LINE", font=("Roboto", 12), width=20, checkbox_width=18, checkbox_height=18, border_width=1, corner_radius=4, fg_color="#7A4315", hover_color="#7A4315")
+        self.racing_line_checkbox.grid(row=0, column=1, sticky="nsew", padx=(5, 5), pady=(0, 10))
+
+        # track metrics panel
+        self.metrics_visible = False
+        self.metrics_button = CTkButton(self.view_row, command=self.toggle_metrics, text="METRICS", font=("Roboto", 12), width=80, fg_color="#141414", bg_color="#000000", corner_radius=6, border_width=1, border_color="#141414", hover_color="#7A4315")
+        self.metrics_button.grid(row=0, column=2, sticky="nsew", padx=(5, 5), pady=(0, 10))
+
+        # trajectory log overlay
+        self.trajectory_button = CTkButton(self.view_row, command=lambda: self.master.load_trajectory(), text="TRAJECTORY", font=("Roboto", 12), width=100, fg_color="#141414", bg_color="#000000", corner_radius=6, border_width=1, border_color="#141414", hover_color="#7A4315")
+        self.trajectory_button.grid(row=0, column=3, sticky="nsew", padx=(5, 5), pady=(0, 10))
+
+        # diff overlay against a track file
+        self.diff_button = CTkButton(self.view_row, command=self.toggle_diff, text="DIFF", font=("Roboto", 12), width=60, fg_color="#141414", bg_color="#000000", corner_radius=6, border_width=1, border_color="#141414", hover_color="#7A4315")
+        self.diff_button.grid(row=0, column=4, sticky="nsew", padx=(5, 5), pady=(0, 10))
+
+        # orthophoto background
+        self.orthophoto_button = CTkButton(self.view_row, command=self.toggle_orthophoto, text="ORTHOPHOTO", font=("Roboto", 12), width=100, fg_color="#141414", bg_color="#000000", corner_radius=6, border_width=1, border_color="#141414", hover_color="#7A4315")
+        self.orthophoto_button.grid(row=0, column=5, sticky="nsew", padx=(5, 5), pady=(0, 10))
+
+        # point cloud map underlay
+        self.point_cloud_button = CTkButton(self.view_row, command=self.toggle_point_cloud, text="POINT CLOUD", font=("Roboto", 12), width=100, fg_color="#141414", bg_color="#000000", corner_radius=6, border_width=1, border_color="#141414", hover_color="#7A4315")
+        self.point_cloud_button.grid(row=0, column=6, sticky="nsew", padx=(5, 5), pady=(0, 10))
+
+        # occupancy grid export
+        self.export_map_button = CTkButton(self.view_row, command=lambda: self.master.export_occupancy_grid(), text="EXPORT MAP", font=("Roboto", 12), width=100, fg_color="#141414", bg_color="#000000", corner_radius=6, border_width=1, border_color="#141414", hover_color="#7A4315")
+        self.export_map_button.grid(row=0, column=7, sticky="nsew", padx=(5, 5), pady=(0, 10))
+
     def validate_zoom_input(self, value):
         if value.endswith("%"):
             value = value[:-1]
@@ -152,6 +205,77 @@ class ToolFrame(CTkFrame):
         self.canvas.tag_lower("axis_label")
 
 
+    def toggle_validation(self):
+        """
+        Toggle the live track validation and update the button appearance.
+        """
+        if not hasattr(self.master, 'toggle_validation'):
+            return
+        if self.master.toggle_validation():
+            self.validate_button.configure(border_color="#FFFFFF")
+        else:
+            self.validate_button.configure(border_color="#141414")
+
+    def toggle_diff(self):
+        """
+        Toggle the diff overlay against a track file and update the button appearance.
+        """
+        if not hasattr(self.master, 'toggle_diff'):
+            return
+        if self.master.toggle_diff():
+            self.diff_button.configure(border_color="#FFFFFF")
+        else:
+            self.diff_button.configure(border_color="#141414")
+
+    def toggle_orthophoto(self):
+        """
+        Toggle the orthophoto background and update the button appearance.
+        """
+        if not hasattr(self.master, 'toggle_orthophoto'):
+            return
+        if self.master.toggle_orthophoto():
+            self.orthophoto_button.configure(border_color="#FFFFFF")
+        else:
+            self.orthophoto_button.configure(border_color="#141414")
+
+    def toggle_point_cloud(self):
+        """
+        Toggle the point cloud underlay and update the button appearance.
+        """
+        if not hasattr(self.master, 'toggle_point_cloud'):
+            return
+        if self.master.toggle_point_cloud():
+            self.point_cloud_button.configure(border_color="#FFFFFF")
+        else:
+            self.point_cloud_button.configure(border_color="#141414")
+
+    def toggle_centerline(self):
+        """
+        Show or hide the centerline overlay according to the checkbox.
+        """
+        if hasattr(self.master, 'show_centerline'):
+            self.master.show_centerline(self.centerline_var.get())
+
+    def toggle_racing_line(self):
+        """
+        Show or hide the racing line overlay according to the checkbox.
+        """
+        if hasattr(self.master, 'show_racing_line'):
+            self.master.show_racing_line(self.racing_line_var.get())
+
+    def toggle_metrics(self):
+        """
+        Toggle the visibility of the track metrics panel and update the button appearance.
+        """
+        self.metrics_visible = not self.metrics_visible
+        if self.metrics_visible:
+            self.metrics_button.configure(border_color="#FFFFFF")
+        else:
+            self.metrics_button.configure(border_color="#141414")
+
+        if hasattr(self.master, 'show_metrics'):
+            self.master.show_metrics(self.metrics_visible)
+
     def open_drag_tool(self):
         """
         Toggle the visibility of the drag and drop tool frame.
@@ -208,6 +332,22 @@ class ToolFrame(CTkFrame):
         if not self.generate_tool_visible and hasattr(self.master, 'set_selected_tool'):
             self.master.set_selected_tool(None)
 
+    def select_tool(self):
+        self.deactivate_all_buttons()
+        if hasattr(self.master, 'set_selected_tool'):
+            self.master.set_selected_tool("select")
+        self.select_button.configure(border_color="#FFFFFF")
+
+    def brush_tool(self):
+        self.deactivate_all_buttons()
+        if hasattr(self.master, 'set_selected_tool'):
+            self.master.set_selected_tool("brush")
+        self.brush_button.configure(border_color="#FFFFFF")
+
+    def toggle_paired(self):
+        if hasattr(self.master, 'brush'):
+            self.master.brush.paired = self.paired_var.get()
+
     def deactivate_all_buttons(self):
         """
         Resets the tool selection and removes the active-state border
@@ -220,6 +360,8 @@ class ToolFrame(CTkFrame):
         self.blue_cone_button.configure(border_color="#111111")
         self.yellow_cone_button.configure(border_color="#111111")
         self.car_button.configure(border_color="#111111")
+        self.select_button.configure(border_color="#111111")
+        self.brush_button.configure(border_color="#111111")
 
 class DragAndDropFrame(CTkFrame):
     """
@@ -324,6 +466,84 @@ class DragAndDropFrame(CTkFrame):
         )
         self.car_button.grid(row=4, column=0, sticky="nsew", padx=15, pady=8)
 
+        # rubber-band selection tool
+        self.select_button = CTkButton(
+            self,
+            command=self.select_tool,
+            width=60,
+            height=45,
+            text="SELECT",
+            fg_color="#111111",
+            bg_color="#111111",
+            corner_radius=6,
+            border_width=1,
+            border_color="#AAAAAA",
+            hover_color="#222222"
+        )
+        self.select_button.grid(row=5, column=0, sticky="nsew", padx=15, pady=8)
+
+        # brush painting cones along a stroke, optionally with the paired boundary
+        self.brush_button = CTkButton(
+            self,
+            command=self.brush_tool,
+            width=60,
+            height=45,
+            text="BRUSH",
+            fg_color="#111111",
+            bg_color="#111111",
+            corner_radius=6,
+            border_width=1,
+            border_color="#AAAAAA",
+            hover_color="#222222"
+        )
+        self.brush_button.grid(row=6, column=0, sticky="nsew", padx=15, pady=(8, 2))
+
+        self.paired_var = BooleanVar(value=False)
+        self.paired_checkbox = CTkCheckBox(self, variable=self.paired_var, command=self.toggle_paired, text="PAIRED", font=("Roboto", 9), width=20, checkbox_width=14, checkbox_height=14, border_width=1, corner_radius=4, fg_color="#7A4315", hover_color="#7A4315")
+        self.paired_checkbox.grid(row=7, column=0, sticky="w", padx=15, pady=(2, 8))
+
+        # merge near-duplicate cones of the whole track
+        self.deduplicate_button = CTkButton(
+            self,
+            command=self.deduplicate,
+            width=60,
+            height=30,
+            text="DEDUPLICATE",
+            font=("Roboto", 9),
+            fg_color="#111111",
+            bg_color="#111111",
+            corner_radius=6,
+            border_width=1,
+            border_color="#AAAAAA",
+            hover_color="#222222"
+        )
+        self.deduplicate_button.grid(row=8, column=0, sticky="nsew", padx=15, pady=8)
+
+        # re-space or simplify the boundaries
+        self.boundaries_button = CTkButton(
+            self,
+            command=self.boundaries,
+            width=60,
+            height=30,
+            text="BOUNDARIES",
+            font=("Roboto", 9),
+            fg_color="#111111",
+            bg_color="#111111",
+            corner_radius=6,
+            border_width=1,
+            border_color="#AAAAAA",
+            hover_color="#222222"
+        )
+        self.boundaries_button.grid(row=9, column=0, sticky="nsew", padx=15, pady=(8, 15))
+
+    def boundaries(self):
+        if hasattr(self.master, 'toggle_boundary_tool'):
+            self.master.toggle_boundary_tool()
+
+    def deduplicate(self):
+        if hasattr(self.master, 'deduplicate_cones'):
+            self.master.deduplicate_cones()
+
     def mouse_tool(self):
         self.deactivate_all_buttons()
         if hasattr(self.master, 'set_selected_tool'):
@@ -556,7 +776,7 @@ class GenerateFrame(CTkFrame):
             self.preview_label.place(relx=0.5, rely=0.5, anchor="center")
             
         except Exception as e:
-            print(f"Error displaying image preview: {e}")
+            logger.error(f"Error displaying image preview: {e}")
             error_label = CTkLabel(
                 self.preview_frame,
                 text=f"Error loading image",
@@ -566,6 +786,7 @@ class GenerateFrame(CTkFrame):
             error_label.place(relx=0.5, rely=0.5, anchor="center")
             self.generate_button.configure(state="disabled")
 
+    @traced("generate_cones")
     def generate_cones(self):
         """
         Generate track cones from the selected image.
@@ -582,18 +803,21 @@ class GenerateFrame(CTkFrame):
                 track_width = 5.0
 
             # process image
-            img = cv2.imread(self.selected_image_path)
+            with TRACER.span("read_image"):
+                img = cv2.imread(self.selected_image_path)
             if img is None:
                 return
 
             # convert to grayscale and process
-            gray = cv2.cvtColor(img, cv2.COLOR_BGR2GRAY)
-            blurred = cv2.GaussianBlur(gray, (5, 5), 0)
-            _, threshold = cv2.threshold(blurred, 0, 255, cv2.THRESH_BINARY + cv2.THRESH_OTSU)
-            edges = cv2.Canny(threshold, 50, 150)
+            with TRACER.span("detect_edges", width=img.shape[1], height=img.shape[0]):
+                gray = cv2.cvtColor(img, cv2.COLOR_BGR2GRAY)
+                blurred = cv2.GaussianBlur(gray, (5, 5), 0)
+                _, threshold = cv2.threshold(blurred, 0, 255, cv2.THRESH_BINARY + cv2.THRESH_OTSU)
+                edges = cv2.Canny(threshold, 50, 150)
             
             # find contours
-            contours, _ = cv2.findContours(edges, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
+            with TRACER.span("find_contours"):
+                contours, _ = cv2.findContours(edges, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
             if not contours:
                 return
 
@@ -603,8 +827,9 @@ class GenerateFrame(CTkFrame):
                 return
 
             # simplify the contour
-            epsilon = 0.005 * cv2.arcLength(contour, True)
-            approx = cv2.approxPolyDP(contour, epsilon, True)
+            with TRACER.span("approximate_contour", points=len(contour)):
+                epsilon = 0.005 * cv2.arcLength(contour, True)
+                approx = cv2.approxPolyDP(contour, epsilon, True)
 
             # convert to track points using the canvas's scale
             track_points = []
@@ -626,8 +851,281 @@ class GenerateFrame(CTkFrame):
                 self.master.generate_cones_from_points(track_points, track_width)
 
         except Exception as e:
-            print(f"Error generating track: {e}")
-            import traceback
-            traceback.print_exc()
+            logger.exception(f"Error generating track: {e}")
+
+
+
+
+class MetricsFrame(CTkFrame):
+    """
+    Frame showing the metrics of the current track layout:
+    length, curvature, minimum turning radius, straights and track width.
+    """
+
+    def __init__(self, master):
+        """
+        Initialize the metrics frame.
+        
+        Args:
+            master: Parent widget that contains this frame
+        """
+        super().__init__(
+            master,
+            width=220,
+            height=300,
+            fg_color="#111111",
+            bg_color="#000000",
+            corner_radius=5
+        )
+
+        # title label
+        self.title_label = CTkLabel(self, text="METRICS", font=("Roboto", 8), text_color="#AAAAAA")
+        self.title_label.grid(row=0, column=0, columnspan=2, sticky="nsew", padx=10, pady=(10, 5))
+
+        rows = [
+            ("length", "Length"),
+            ("left_length", "Left boundary"),
+            ("right_length", "Right boundary"),
+            ("min_radius", "Min. radius"),
+            ("max_curvature", "Max. curvature"),
+            ("width", "Width"),
+            ("straights", "Straights"),
+        ]
+
+        self.value_vars = {}
+        for row, (key, text) in enumerate(rows, start=1):
+            label = CTkLabel(self, text=text, font=("Roboto", 11), text_color="#D3D3D3")
+            label.grid(row=row, column=0, sticky="w", padx=(10, 10), pady=2)
+            self.value_vars[key] = StringVar(value="-")
+            value = CTkLabel(self, textvariable=self.value_vars[key], font=("Roboto", 11, "bold"), text_color="#FFFFFF")
+            value.grid(row=row, column=1, sticky="e", padx=(0, 10), pady=2)
+
+        # straight-length histogram, one line per bin
+        self.histogram_var = StringVar(value="")
+        self.histogram_label = CTkLabel(self, textvariable=self.histogram_var, font=("Roboto", 10), text_color="#AAAAAA", justify="left")
+        self.histogram_label.grid(row=len(rows) + 1, column=0, columnspan=2, sticky="w", padx=10, pady=(5, 10))
+
+    def show_metrics(self, metrics):
+        """
+        Display the given metrics.
+        
+        Args:
+            metrics: Result of TrackMetrics.compute_track_metrics, None if unavailable
+        """
+        if metrics is None:
+            for var in self.value_vars.values():
+                var.set("-")
+            self.histogram_var.set("Place blue and yellow cones\nto compute metrics")
+            return
+
+        self.value_vars["length"].set(f"{metrics['length']:.1f} m" + (" (closed)" if metrics["closed"] else ""))
+        self.value_vars["left_length"].set(f"{metrics['left_length']:.1f} m")
+        self.value_vars["right_length"].set(f"{metrics['right_length']:.1f} m")
+        self.value_vars["min_radius"].set(f"{metrics['min_radius']:.1f} m")
+        self.value_vars["max_curvature"].set(f"{metrics['max_curvature']:.3f} 1/m")
+        self.value_vars["width"].set(f"{metrics['min_width']:.2f} - {metrics['max_width']:.2f} m")
+        self.value_vars["straights"].set(str(len(metrics["straights"])))
+
+        lines = []
+        for lower, upper, count in zip(STRAIGHT_BINS[:-1], STRAIGHT_BINS[1:], metrics["straight_histogram"]):
+            label = f"> {lower:.0f} m" if upper == float("inf") else f"{lower:.0f} - {upper:.0f} m"
+            lines.append(f"{label}: {count}")
+        self.histogram_var.set("\n".join(lines))
+
+
+class TrajectoryFrame(CTkFrame):
+    """
+    Frame for scrubbing the car marker along a loaded trajectory log.
+    """
+
+    def __init__(self, master):
+        """
+        Initialize the trajectory frame.
+        
+        Args:
+            master: Parent widget that contains this frame
+        """
+        super().__init__(
+            master,
+            width=500,
+            height=60,
+            fg_color="#111111",
+            bg_color="#000000",
+            corner_radius=5
+        )
+
+        # file name of the log
+        self.title_var = StringVar(value="TRAJECTORY")
+        self.title_label = CTkLabel(self, textvariable=self.title_var, font=("Roboto", 8), text_color="#AAAAAA")
+        self.title_label.grid(row=0, column=0, columnspan=3, sticky="w", padx=10, pady=(5, 0))
 
+        # scrub slider over the sample index
+        self.slider = CTkSlider(self, from_=0, to=1, width=360, command=self.scrub, button_color="#7A4315", button_hover_color="#7A4315", progress_color="#4A4A4A")
+        self.slider.grid(row=1, column=0, sticky="ew", padx=(10, 5), pady=(0, 10))
 
+        self.sample_var = StringVar(value="-")
+        self.sample_label = CTkLabel(self, textvariable=self.sample_var, width=110, font=("Roboto", 11), text_color="#D3D3D3")
+        self.sample_label.grid(row=1, column=1, sticky="e", padx=5, pady=(0, 10))
+
+        # remove the overlay
+        self.remove_button = CTkButton(self, command=self.remove, text="REMOVE", font=("Roboto", 10), width=60, height=24, fg_color="#141414", bg_color="#111111", corner_radius=6, border_width=1, border_color="#141414", hover_color="#7A4315")
+        self.remove_button.grid(row=1, column=2, sticky="e", padx=(5, 10), pady=(0, 10))
+
+        self.sample_count = 0
+
+    def show_trajectory(self, name, sample_count):
+        """
+        Reset the frame for a newly loaded log.
+        
+        Args:
+            name: Name of the log file
+            sample_count: Number of samples in the log
+        """
+        self.sample_count = sample_count
+        self.title_var.set(f"TRAJECTORY - {name}")
+        self.slider.configure(to=max(sample_count - 1, 1), number_of_steps=max(sample_count - 1, 1))
+        self.slider.set(0)
+        self.sample_var.set(f"0 / {sample_count}")
+
+    def scrub(self, value):
+        index = int(round(value))
+        self.sample_var.set(f"{index} / {self.sample_count}")
+        if hasattr(self.master, 'scrub_trajectory'):
+            self.master.scrub_trajectory(index)
+
+    def remove(self):
+        if hasattr(self.master, 'remove_trajectory'):
+            self.master.remove_trajectory()
+
+
+class SelectionFrame(CTkFrame):
+    """
+    Frame with bulk transforms of the selected cones.
+    """
+
+    def __init__(self, master):
+        """
+        Initialize the selection frame.
+        
+        Args:
+            master: Parent widget that contains this frame
+        """
+        super().__init__(
+            master,
+            fg_color="#111111",
+            bg_color="#000000",
+            corner_radius=5
+        )
+
+        self.count_var = StringVar(value="0 SELECTED")
+        self.count_label = CTkLabel(self, textvariable=self.count_var, font=("Roboto", 8), text_color="#AAAAAA")
+        self.count_label.grid(row=0, column=0, columnspan=9, sticky="w", padx=10, pady=(5, 0))
+
+        # (text, transform arguments) of the transform buttons
+        actions = [
+            ("ROTATE -15", {"rotation": -15.0}),
+            ("ROTATE +15", {"rotation": 15.0}),
+            ("SCALE -10%", {"scale": 0.9}),
+            ("SCALE +10%", {"scale": 1.1}),
+            ("MIRROR X", {"mirror": "x"}),
+            ("MIRROR Y", {"mirror": "y"})
+        ]
+        for column, (text, arguments) in enumerate(actions):
+            button = CTkButton(self, command=lambda arguments=arguments: self.transform(**arguments), text=text, font=("Roboto", 10), width=70, height=24, fg_color="#141414", bg_color="#111111", corner_radius=6, border_width=1, border_color="#141414", hover_color="#7A4315")
+            button.grid(row=1, column=column, padx=(10 if column == 0 else 3, 3), pady=(0, 10))
+
+        # copy to the clipboard and replicate the selection
+        self.copy_button = CTkButton(self, command=self.copy, text="COPY", font=("Roboto", 10), width=50, height=24, fg_color="#141414", bg_color="#111111", corner_radius=6, border_width=1, border_color="#141414", hover_color="#7A4315")
+        self.copy_button.grid(row=1, column=len(actions), padx=3, pady=(0, 10))
+        self.array_button = CTkButton(self, command=self.array, text="ARRAY", font=("Roboto", 10), width=50, height=24, fg_color="#141414", bg_color="#111111", corner_radius=6, border_width=1, border_color="#141414", hover_color="#7A4315")
+        self.array_button.grid(row=1, column=len(actions) + 1, padx=3, pady=(0, 10))
+
+        self.delete_button = CTkButton(self, command=self.delete, text="DELETE", font=("Roboto", 10), width=60, height=24, fg_color="#141414", bg_color="#111111", corner_radius=6, border_width=1, border_color="#141414", hover_color="#B22222")
+        self.delete_button.grid(row=1, column=len(actions) + 2, padx=(3, 10), pady=(0, 10))
+
+    def show_count(self, count):
+        self.count_var.set(f"{count} SELECTED")
+
+    def transform(self, **arguments):
+        if hasattr(self.master, 'selection'):
+            self.master.selection.transform(**arguments)
+
+    def copy(self):
+        if hasattr(self.master, 'copy_selection'):
+            self.master.copy_selection()
+
+    def array(self):
+        if hasattr(self.master, 'array_selection'):
+            self.master.array_selection()
+
+    def delete(self):
+        if hasattr(self.master, 'selection'):
+            self.master.selection.delete()
+
+
+class BoundaryFrame(CTkFrame):
+    """
+    Frame for re-spacing the boundary cones uniformly or simplifying the boundaries
+    with a maximal lateral error, with a preview before the track is changed.
+    """
+
+    def __init__(self, master):
+        """
+        Initialize the boundary frame.
+        
+        Args:
+            master: Parent widget that contains this frame
+        """
+        super().__init__(
+            master,
+            fg_color="#111111",
+            bg_color="#000000",
+            corner_radius=5
+        )
+
+        self.title_var = StringVar(value="BOUNDARIES")
+        self.title_label = CTkLabel(self, textvariable=self.title_var, font=("Roboto", 8), text_color="#AAAAAA")
+        self.title_label.grid(row=0, column=0, columnspan=6, sticky="w", padx=10, pady=(5, 0))
+
+        # resample: cone spacing, simplify: lateral error (meters)
+        self.defaults = {"RESAMPLE": "3.5", "SIMPLIFY": "0.1"}
+        self.mode_var = StringVar(value="RESAMPLE")
+        self.mode_button = CTkSegmentedButton(self, values=list(self.defaults), variable=self.mode_var, command=self.change_mode, font=("Roboto", 10), height=24, selected_color="#7A4315", selected_hover_color="#7A4315")
+        self.mode_button.grid(row=1, column=0, padx=(10, 3), pady=(0, 10))
+
+        self.value_var = StringVar(value=self.defaults["RESAMPLE"])
+        self.value_entry = CTkEntry(self, textvariable=self.value_var, width=50, height=24, font=("Roboto", 11))
+        self.value_entry.grid(row=1, column=1, padx=3, pady=(0, 10))
+        self.unit_label = CTkLabel(self, text="m", font=("Roboto", 11), text_color="#D3D3D3")
+        self.unit_label.grid(row=1, column=2, padx=(0, 3), pady=(0, 10))
+
+        self.preview_button = CTkButton(self, command=self.preview, text="PREVIEW", font=("Roboto", 10), width=60, height=24, fg_color="#141414", bg_color="#111111", corner_radius=6, border_width=1, border_color="#141414", hover_color="#7A4315")
+        self.preview_button.grid(row=1, column=3, padx=3, pady=(0, 10))
+        self.apply_button = CTkButton(self, command=self.apply, text="APPLY", font=("Roboto", 10), width=50, height=24, fg_color="#141414", bg_color="#111111", corner_radius=6, border_width=1, border_color="#141414", hover_color="#7A4315")
+        self.apply_button.grid(row=1, column=4, padx=3, pady=(0, 10))
+        self.cancel_button = CTkButton(self, command=self.cancel, text="CANCEL", font=("Roboto", 10), width=50, height=24, fg_color="#141414", bg_color="#111111", corner_radius=6, border_width=1, border_color="#141414", hover_color="#7A4315")
+        self.cancel_button.grid(row=1, column=5, padx=(3, 10), pady=(0, 10))
+
+    def change_mode(self, mode):
+        self.value_var.set(self.defaults[mode])
+        self.cancel()
+
+    def preview(self):
+        try:
+            value = float(self.value_var.get())
+        except ValueError:
+            return
+        if value <= 0 or not hasattr(self.master, 'preview_boundaries'):
+            return
+        current, proposed = self.master.preview_boundaries(self.mode_var.get().lower(), value)
+        self.title_var.set(f"BOUNDARIES - {current} -> {proposed} CONES")
+
+    def apply(self):
+        if hasattr(self.master, 'apply_boundaries'):
+            self.master.apply_boundaries()
+        self.title_var.set("BOUNDARIES")
+
+    def cancel(self):
+        if hasattr(self.master, 'cancel_boundaries'):
+            self.master.cancel_boundaries()
+        self.title_var.set("BOUNDARIES")
@@ -0,0 +1,117 @@
+import functools
+import json
+import os
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+
+# path of a trace file written when the application exits, tracing starts right away if set
+TRACE_ENV = "TRACKBUILDER_TRACE"
+
+
+class Tracer:
+    """
+    Records named spans as Chrome trace events ('X' complete events), viewable in
+    chrome://tracing or ui.perfetto.dev. While not recording, spans cost one flag check.
+    """
+
+    def __init__(self, max_events=500_000):
+        """
+        Initialize the tracer.
+
+        Args:
+            max_events: Largest number of kept events, the oldest are dropped beyond it (default: 500000)
+        """
+        self.enabled = False
+        self.events = deque(maxlen=max_events)
+        self.origin = time.perf_counter()
+        self.pid = os.getpid()
+        self.threads = {}
+
+    def start(self):
+        """Drop the recorded events and start recording."""
+        self.events.clear()
+        self.threads.clear()
+        self.enabled = True
+
+    def stop(self):
+        """Stop recording, the events are kept until the next start."""
+        self.enabled = False
+
+    def add(self, name, start, end, args=None):
+        """
+        Record a span.
+
+        Args:
+            name: Name of the span
+            start: perf_counter() at the start of the span
+            end: perf_counter() at the end of the span
+            args: Dictionary of values shown with the span (default: None)
+        """
+        thread = threading.current_thread()
+        self.threads.setdefault(thread.ident, thread.name)
+        event = {"name": name, "ph": "X", "ts": (start - self.origin) * 1e6, "dur": (end - start) * 1e6, "pid": self.pid, "tid": thread.ident}
+        if args:
+            event["args"] = args
+        self.events.append(event)
+
+    @contextmanager
+    def span(self, name, **args):
+        """
+        Context manager recording the enclosed code as a span.
+
+        Args:
+            name: Name of the span
+            **args: Values shown with the span, e.g. object counts
+        """
+        if not self.enabled:
+            yield
+            return
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add(name, start, time.perf_counter(), args)
+
+    def write(self, file_name):
+        """
+        Write the recorded events as Chrome trace JSON.
+
+        Args:
+            file_name: Path of the trace file
+
+        Returns:
+            int: Number of written spans
+        """
+        metadata = [{"name": "process_name", "ph": "M", "pid": self.pid, "args": {"name": "TrackBuilder"}}]
+        metadata += [{"name": "thread_name", "ph": "M", "pid": self.pid, "tid": ident, "args": {"name": name}} for ident, name in self.threads.items()]
+        events = list(self.events)
+        with open(file_name, "w") as file:
+            json.dump({"traceEvents": metadata + events, "displayTimeUnit": "ms"}, file)
+        return len(events)
+
+
+# shared by all traced functions of the application
+TRACER = Tracer()
+
+
+def traced(name):
+    """
+    Decorator recording every call of a function as a span while tracing.
+
+    Args:
+        name: Name of the span
+    """
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if not TRACER.enabled:
+                return func(*args, **kwargs)
+            start = time.perf_counter()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                TRACER.add(name, start, time.perf_counter())
+        return wrapper
+    return decorator
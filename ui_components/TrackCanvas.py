@@ -4,6 +4,8 @@ from PIL import Image, ImageTk
 import math
 import numpy as np
 from ui_components import CanvasObjects
+from ui_components.PerformanceHUD import PerformanceHUD, timed
+from ui_components.Tracing import traced
 
 BASE_DIR = os.path.dirname(os.path.abspath(__file__))
 
@@ -39,6 +41,14 @@ class TrackCanvas(CTkCanvas):
         self.last_y = 0
         self.panning = False
 
+        # polylines drawn on top of the grid, stored in logical coordinates
+        self.overlays = {}
+        # layers that redraw themselves for the current view (e.g. trajectory logs)
+        self.layers = {}
+
+        # frame time and handler timings overlay, toggled with F3
+        self.hud = PerformanceHUD(self)
+
         self.max_zoom_factor = 7.5 #750%
         self.min_zoom_factor = 0.25 #25%
 
@@ -50,6 +60,15 @@ class TrackCanvas(CTkCanvas):
         self.bind("<MouseWheel>", self.zoom)
         self.bind("<B2-Motion>", self.scroll)
         self.bind_all("<KeyPress-r>", self.reset_view)
+        self.bind_all("<Control-z>", self.undo)
+        self.bind_all("<Control-y>", self.redo)
+        self.bind_all("<Control-Z>", self.redo)
+        self.bind_all("<Delete>", self.delete_selection)
+        self.bind_all("<Control-c>", self.copy_selection)
+        self.bind_all("<Control-v>", self.paste_cones)
+        self.bind_all("<F3>", self.toggle_hud)
+        self.bind_all("<F4>", self.toggle_tracing)
+        self.bind_all("<F5>", self.report_memory)
         self.bind("<Configure>", self.grid_to_window_size)
 
     def initialize_view(self):
@@ -115,6 +134,8 @@ class TrackCanvas(CTkCanvas):
         return round(value / self.logic_grid_step) * self.logic_grid_step
 
     #draws the grid -> changing of grid size with variable grid_size
+    @traced("draw_grid")
+    @timed("draw_grid")
     def draw_grid(self):
         """
         Draw the grid on the canvas. The grid adapts to the current zoom level
@@ -175,12 +196,17 @@ class TrackCanvas(CTkCanvas):
             self.create_line(x0, 0, x0, self.winfo_height(), fill="#D9D9D9", tags="grid_line", width=1)
 
     #draws the tu-fast logo
+    @traced("draw_logo")
+    @timed("draw_logo")
     def draw_logo(self):
         """Draw the TU Fast logo in the top-left corner of the canvas."""
-        ASSET_LOGO_PATH = os.path.join(BASE_DIR, "assets", "tufastlogo.png")
-        logo = Image.open(ASSET_LOGO_PATH).resize((87, 41), Image.LANCZOS)
-        self.background_logo = ImageTk.PhotoImage(logo)
-        self.create_image(30, 30, anchor=NW, image=self.background_logo)
+        # the logo is redrawn on every pan and zoom: replace the previous item and reuse the image
+        self.delete("logo")
+        if not hasattr(self, 'background_logo'):
+            ASSET_LOGO_PATH = os.path.join(BASE_DIR, "assets", "tufastlogo.png")
+            logo = Image.open(ASSET_LOGO_PATH).resize((87, 41), Image.LANCZOS)
+            self.background_logo = ImageTk.PhotoImage(logo)
+        self.create_image(30, 30, anchor=NW, image=self.background_logo, tags="logo")
 
     def handle_mouse_press(self, event):
         """
@@ -220,6 +246,16 @@ class TrackCanvas(CTkCanvas):
         self.last_x = event.x
         self.last_y = event.y
 
+        # moves until the release are recorded as one undo step
+        if hasattr(self.master, 'history'):
+            self.master.history.press()
+
+        # tools with their own mouse handling (selection, brush)
+        tool = self.interactive_tool()
+        if tool is not None:
+            tool.press(event)
+            return
+
         # check for items under cursor, ignore grid lines
         item_ids = self.find_overlapping(event.x - 2, event.y - 2, event.x + 2, event.y + 2)
         items = [item for item in item_ids if "grid_line" not in self.gettags(item)]
@@ -237,6 +273,15 @@ class TrackCanvas(CTkCanvas):
         self.config(cursor="fleur")
         self.panning = True
     
+    def interactive_tool(self):
+        """
+        Returns the tool object handling press, motion and release events itself,
+        None for the placement, drag and pan handling of the canvas.
+        """
+        if not hasattr(self.master, 'interactive_tools'):
+            return None
+        return self.master.interactive_tools.get(self.master.current_tool)
+
     def handle_mouse_release(self, event):
         """
         Handle mouse release events. Ends panning and processes clicks on objects.
@@ -244,6 +289,14 @@ class TrackCanvas(CTkCanvas):
         Args:
             event: Mouse event containing coordinates and state
         """
+        if hasattr(self.master, 'history'):
+            self.master.history.release()
+
+        tool = self.interactive_tool()
+        if tool is not None:
+            tool.release(event)
+            return
+
         if self.panning:
             self.config(cursor="")
             self.panning = False
@@ -258,6 +311,7 @@ class TrackCanvas(CTkCanvas):
                         # simulate a click on this object
                         self.event_generate("<Button-1>", x=event.x, y=event.y)
     
+    @timed("handle_mouse_motion")
     def handle_mouse_motion(self, event):
         """
         Handle mouse motion events for panning the canvas.
@@ -265,6 +319,11 @@ class TrackCanvas(CTkCanvas):
         Args:
             event: Mouse event containing coordinates and state
         """
+        tool = self.interactive_tool()
+        if tool is not None:
+            tool.motion(event)
+            return
+
         # if in panning mode -> move canvas
         if self.panning:
             delta_x = event.x - self.last_x
@@ -304,6 +363,15 @@ class TrackCanvas(CTkCanvas):
         y = self.snap_to_grid(ly)       #(ly // self.grid_size) * self.grid_size
 
         if self.master.current_tool == "blue" or self.master.current_tool == "yellow":
+            # refuse or merge cones placed onto an existing cone
+            if hasattr(self.master, 'find_duplicate_cone'):
+                existing = self.master.find_duplicate_cone(x, y)
+                if existing is not None:
+                    if self.master.duplicate_policy == "merge":
+                        existing.move(self.snap_to_grid((existing.position_x + x) / 2),
+                                      self.snap_to_grid((existing.position_y + y) / 2))
+                    return
+
             new_cone = CanvasObjects.Cone(self, self.master.current_tool, x, y)
             new_cone.update_zoom(self.zoom_factor)
 
@@ -312,6 +380,82 @@ class TrackCanvas(CTkCanvas):
             self.master.car = new_car
             new_car.update_zoom(self.zoom_factor)
 
+    def overlay_coords(self, points):
+        """
+        Convert an array of logical coordinates into a flat list of screen coordinates.
+        
+        Args:
+            points: (N, 2) array of logical coordinates
+            
+        Returns:
+            list: Screen coordinates as [x1, y1, x2, y2, ...]
+        """
+        screen = np.empty((len(points), 2))
+        screen[:, 0] = points[:, 0] * self.zoom_factor + self.offset_x
+        screen[:, 1] = -points[:, 1] * self.zoom_factor + self.offset_y
+        return screen.ravel().tolist()
+
+    def draw_overlay(self, name, points, **options):
+        """
+        Draw or replace a polyline overlay (e.g. the centerline) as a single canvas item.
+        
+        Args:
+            name: Name of the overlay, also used as its tag
+            points: (N, 2) array of logical coordinates
+            **options: Line options passed to create_line
+        """
+        self.remove_overlay(name)
+        points = np.asarray(points, dtype=float).reshape(-1, 2)
+        if len(points) < 2:
+            return
+
+        item = self.create_line(*self.overlay_coords(points), tags=("overlay", name), **options)
+        if self.find_withtag("cone"):
+            self.tag_lower(item, "cone")
+        self.overlays[name] = (item, points)
+
+    def remove_overlay(self, name):
+        """
+        Remove an overlay from the canvas.
+        
+        Args:
+            name: Name of the overlay
+        """
+        if name in self.overlays:
+            item, _ = self.overlays.pop(name)
+            self.delete(item)
+
+    @traced("update_overlays")
+    def update_overlays(self):
+        """Reposition all overlays and redraw all layers for the current zoom and offset."""
+        for item, points in self.overlays.values():
+            self.coords(item, self.overlay_coords(points))
+        for layer in self.layers.values():
+            layer.redraw()
+
+    def highlight_invalid_cones(self, item_ids):
+        """
+        Highlight the given cone items as rule violations.
+        Only items whose state changed are retagged, the outline is then
+        applied with a single call per tag.
+        
+        Args:
+            item_ids: Canvas item ids of all cones that should be highlighted
+        """
+        previous = set(self.find_withtag("invalid_cone"))
+        current = set(item_ids)
+
+        for item in previous - current:
+            self.dtag(item, "invalid_cone")
+            self.addtag_withtag("valid_cone", item)
+        for item in current - previous:
+            self.addtag_withtag("invalid_cone", item)
+
+        self.itemconfig("valid_cone", outline="", width=1)
+        self.dtag("valid_cone", "valid_cone")
+        self.itemconfig("invalid_cone", outline="#C61818", width=2)
+
+    @timed("scroll")
     def scroll(self, event):
         """
         Handle middle-mouse scrolling for canvas panning.
@@ -340,6 +484,7 @@ class TrackCanvas(CTkCanvas):
         if hasattr(self.master, 'update_zoom'):
             self.master.update_zoom(self.zoom_factor)
         
+    @timed("zoom")
     def zoom(self, event):
         """
         Handle mouse wheel events for zooming. If a car is selected and active,
@@ -390,6 +535,93 @@ class TrackCanvas(CTkCanvas):
             zoom_percent = int(self.zoom_factor * 100)
             self.tool_frame.zoom_var.set(f"{zoom_percent}%")
 
+    def undo(self, event):
+        """
+        Undo the last change of the track (Ctrl+Z).
+        
+        Args:
+            event: Key event (unused)
+        """
+        if hasattr(self.master, 'history'):
+            self.master.history.undo()
+
+    def redo(self, event):
+        """
+        Redo the last undone change of the track (Ctrl+Y or Ctrl+Shift+Z).
+        
+        Args:
+            event: Key event (unused)
+        """
+        if hasattr(self.master, 'history'):
+            self.master.history.redo()
+
+    def delete_selection(self, event):
+        """
+        Delete the selected cones (Delete key).
+        
+        Args:
+            event: Key event
+        """
+        # keep the Delete key working in text fields
+        if event.widget.winfo_class() == "Entry":
+            return
+        if self.master.current_tool == "select":
+            self.master.selection.delete()
+
+    def copy_selection(self, event):
+        """
+        Copy the selected cones to the clipboard (Ctrl+C).
+        
+        Args:
+            event: Key event
+        """
+        # keep copy and paste working in text fields
+        if event.widget.winfo_class() == "Entry":
+            return
+        if hasattr(self.master, 'copy_selection'):
+            self.master.copy_selection()
+
+    def paste_cones(self, event):
+        """
+        Paste cones from the clipboard at the mouse pointer (Ctrl+V).
+        
+        Args:
+            event: Key event
+        """
+        if event.widget.winfo_class() == "Entry":
+            return
+        if hasattr(self.master, 'paste_cones'):
+            self.master.paste_cones()
+
+    def toggle_hud(self, event):
+        """
+        Show or hide the frame time and handler timings overlay (F3).
+        
+        Args:
+            event: Key event (unused)
+        """
+        self.hud.toggle()
+
+    def toggle_tracing(self, event):
+        """
+        Start recording trace spans, or stop and save them (F4).
+        
+        Args:
+            event: Key event (unused)
+        """
+        if hasattr(self.master, 'toggle_tracing'):
+            self.master.toggle_tracing()
+
+    def report_memory(self, event):
+        """
+        Print the memory accounting of the window (F5).
+        
+        Args:
+            event: Key event (unused)
+        """
+        if hasattr(self.master, 'report_memory'):
+            self.master.report_memory()
+
     def reset_view(self, event):
         """
         Reset the view to its default state (centered, zoom level 1.0).
@@ -408,6 +640,7 @@ class TrackCanvas(CTkCanvas):
         if hasattr(self.master, 'update_zoom'):
             self.master.update_zoom(self.zoom_factor)
 
+    @traced("fit_to_track")
     def fit_to_track(self, margin=500):
         """
         Centers and zooms the view to fit all cones with a margin.
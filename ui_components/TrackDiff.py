@@ -0,0 +1,308 @@
+import argparse
+import time
+
+import numpy as np
+import yaml
+from scipy.spatial import cKDTree
+
+# keys of the cone lists in the track files and the cone type they hold
+CONE_KEYS = (("cones_left", "blue"), ("cones_right", "yellow"))
+
+
+def _cone_array(track_data, key):
+    """(N, 2) array of the cones stored under a key of a track dictionary."""
+    return np.asarray(track_data.get(key) or [], dtype=float).reshape(-1, 2)
+
+
+def match_cones(old, new, tolerance=1.0):
+    """
+    Match two sets of cone positions with mutual nearest neighbours.
+    A pair is matched if each cone is the nearest of the other within the tolerance,
+    so a cone is never matched twice.
+
+    Args:
+        old: (N, 2) array of cone positions
+        new: (M, 2) array of cone positions
+        tolerance: Largest distance of a matched pair (default: 1.0)
+
+    Returns:
+        tuple: (old_rows, new_rows) index arrays of the matched pairs
+    """
+    if len(old) == 0 or len(new) == 0:
+        return np.empty(0, dtype=int), np.empty(0, dtype=int)
+
+    _, old_to_new = cKDTree(new).query(old, distance_upper_bound=tolerance)
+    _, new_to_old = cKDTree(old).query(new, distance_upper_bound=tolerance)
+    # missing neighbours are reported with index len(data)
+    old_rows = np.flatnonzero(old_to_new < len(new))
+    mutual = new_to_old[old_to_new[old_rows]] == old_rows
+    old_rows = old_rows[mutual]
+    return old_rows, old_to_new[old_rows]
+
+
+def diff_cones(old, new, tolerance=1.0, epsilon=1e-3):
+    """
+    Compare two sets of cone positions of one type.
+
+    Args:
+        old: (N, 2) array of cone positions
+        new: (M, 2) array of cone positions
+        tolerance: Largest distance a cone can move and still be matched (default: 1.0)
+        epsilon: Largest distance still counted as unchanged (default: 1e-3)
+
+    Returns:
+        dict: Index arrays 'removed' (into old), 'added' (into new), 'moved' and 'unchanged'
+              ((K, 2) arrays of old and new index pairs)
+    """
+    old_rows, new_rows = match_cones(old, new, tolerance)
+    distances = np.hypot(*(new[new_rows] - old[old_rows]).T) if len(old_rows) else np.empty(0)
+    moved = distances > epsilon
+
+    removed = np.ones(len(old), dtype=bool)
+    removed[old_rows] = False
+    added = np.ones(len(new), dtype=bool)
+    added[new_rows] = False
+    return {
+        "removed": np.flatnonzero(removed),
+        "added": np.flatnonzero(added),
+        "moved": np.column_stack([old_rows[moved], new_rows[moved]]),
+        "unchanged": np.column_stack([old_rows[~moved], new_rows[~moved]])
+    }
+
+
+def _pose_changed(old_pose, new_pose, epsilon=1e-3):
+    """Whether two starting poses differ, poses are lists of x, y and yaw or empty."""
+    old_pose, new_pose = list(old_pose or []), list(new_pose or [])
+    if len(old_pose) != len(new_pose):
+        return True
+    return any(abs(a - b) > epsilon for a, b in zip(old_pose, new_pose))
+
+
+def diff_tracks(old_data, new_data, tolerance=1.0, epsilon=1e-3):
+    """
+    Compare two track dictionaries as stored in the YAML files.
+
+    Args:
+        old_data: Track dictionary of the old version (coordinates in meters)
+        new_data: Track dictionary of the new version (coordinates in meters)
+        tolerance: Largest distance a cone can move and still be matched (default: 1.0)
+        epsilon: Largest distance still counted as unchanged (default: 1e-3)
+
+    Returns:
+        dict: Per cone key the result of diff_cones together with the 'old' and 'new' positions,
+              and 'starting_pose' as (old, new) if the starting pose changed, else None
+    """
+    result = {}
+    for key, _ in CONE_KEYS:
+        old, new = _cone_array(old_data, key), _cone_array(new_data, key)
+        result[key] = diff_cones(old, new, tolerance, epsilon)
+        result[key]["old"] = old
+        result[key]["new"] = new
+
+    old_pose, new_pose = old_data.get("starting_pose"), new_data.get("starting_pose")
+    result["starting_pose"] = (old_pose, new_pose) if _pose_changed(old_pose, new_pose, epsilon) else None
+    return result
+
+
+def diff_summary(diff):
+    """
+    Human readable summary of a track diff.
+
+    Args:
+        diff: Result of diff_tracks
+
+    Returns:
+        str: One line per cone key and one for the starting pose
+    """
+    lines = []
+    for key, cone_type in CONE_KEYS:
+        changes = diff[key]
+        lines.append(f"{cone_type}: {len(changes['added'])} added, {len(changes['removed'])} removed, "
+                     f"{len(changes['moved'])} moved, {len(changes['unchanged'])} unchanged")
+    if diff["starting_pose"] is not None:
+        old_pose, new_pose = diff["starting_pose"]
+        lines.append(f"starting pose: {old_pose or '-'} -> {new_pose or '-'}")
+    return "\n".join(lines)
+
+
+def merge_tracks(base, ours, theirs, tolerance=1.0, epsilon=1e-3):
+    """
+    Three-way merge of two edited versions of a track.
+    Changes made on only one side are applied. A cone moved differently on both sides, or
+    moved on one side and removed on the other, is a conflict that keeps our version.
+    Cones added on both sides at the same place are added once.
+
+    Args:
+        base: Track dictionary of the common ancestor
+        ours: Track dictionary of our version
+        theirs: Track dictionary of their version
+        tolerance: Largest distance a cone can move and still be matched (default: 1.0)
+        epsilon: Largest distance still counted as unchanged (default: 1e-3)
+
+    Returns:
+        tuple: (merged, conflicts) with the merged track dictionary and a list of conflict descriptions
+    """
+    ours_diff = diff_tracks(base, ours, tolerance, epsilon)
+    theirs_diff = diff_tracks(base, theirs, tolerance, epsilon)
+    merged = dict(ours)
+    conflicts = []
+
+    for key, cone_type in CONE_KEYS:
+        base_cones = _cone_array(base, key)
+        our_cones, their_cones = _cone_array(ours, key), _cone_array(theirs, key)
+        our_changes, their_changes = ours_diff[key], theirs_diff[key]
+
+        # position of every base cone on each side, NaN where the side removed it
+        our_positions = np.full_like(base_cones, np.nan)
+        their_positions = np.full_like(base_cones, np.nan)
+        for positions, changes, cones in ((our_positions, our_changes, our_cones), (their_positions, their_changes, their_cones)):
+            for pairs in (changes["moved"], changes["unchanged"]):
+                positions[pairs[:, 0]] = cones[pairs[:, 1]]
+
+        our_removed = np.isnan(our_positions[:, 0])
+        their_removed = np.isnan(their_positions[:, 0])
+        our_moved = np.zeros(len(base_cones), dtype=bool)
+        our_moved[our_changes["moved"][:, 0]] = True
+        their_moved = np.zeros(len(base_cones), dtype=bool)
+        their_moved[their_changes["moved"][:, 0]] = True
+
+        # take their position where only they changed the cone
+        result = np.where(their_moved[:, None] & ~our_moved[:, None] & ~our_removed[:, None], their_positions, our_positions)
+        keep = ~(our_removed | (their_removed & ~our_moved))
+
+        both_moved = our_moved & their_moved & (np.hypot(*(our_positions - their_positions).T) > epsilon)
+        for row in np.flatnonzero(both_moved):
+            conflicts.append(f"{cone_type} cone at {base_cones[row].round(3).tolist()} moved on both sides")
+        for row in np.flatnonzero((our_moved & their_removed) | (our_removed & their_moved)):
+            conflicts.append(f"{cone_type} cone at {base_cones[row].round(3).tolist()} moved on one side and removed on the other")
+
+        our_added = our_cones[our_changes["added"]]
+        their_added = their_cones[their_changes["added"]]
+        if len(our_added) and len(their_added):
+            distances, _ = cKDTree(our_added).query(their_added)
+            their_added = their_added[distances > epsilon]
+
+        cones = np.vstack([result[keep], our_added, their_added])
+        merged[key] = np.round(cones, 4).tolist()
+
+    base_pose, our_pose, their_pose = base.get("starting_pose"), ours.get("starting_pose"), theirs.get("starting_pose")
+    if _pose_changed(base_pose, their_pose, epsilon):
+        if not _pose_changed(base_pose, our_pose, epsilon):
+            merged["starting_pose"] = their_pose
+        elif _pose_changed(our_pose, their_pose, epsilon):
+            conflicts.append("starting pose changed on both sides")
+
+    return merged, conflicts
+
+
+class DiffLayer:
+    """
+    Draws a track diff on the TrackCanvas: added cones in green, removed cones in red
+    and moved cones as orange arrows from the old to the new position.
+    The items follow a pan with a single move of their tag and are drawn again on a zoom
+    change, so that the markers keep their size on screen.
+    """
+
+    def __init__(self, canvas, diff, scale, name="diff"):
+        """
+        Initialize the layer and create its items.
+
+        Args:
+            canvas: TrackCanvas to draw on
+            diff: Result of diff_tracks (coordinates in meters)
+            scale: Logical units per meter of the canvas
+            name: Name of the layer, also used as its tag (default: 'diff')
+        """
+        self.canvas = canvas
+        self.scale = scale
+        self.name = name
+        self.diff = diff
+        self.view = None
+        self.draw(diff)
+
+    def draw(self, diff, radius=6):
+        """Create the items of a diff for the current view."""
+        canvas = self.canvas
+        self.remove()
+        zoom, offset_x, offset_y = canvas.zoom_factor, canvas.offset_x, canvas.offset_y
+
+        def screen(points):
+            return np.column_stack([points[:, 0] * self.scale * zoom + offset_x,
+                                    -points[:, 1] * self.scale * zoom + offset_y])
+
+        for key, _ in CONE_KEYS:
+            changes = diff[key]
+            for (x, y) in screen(changes["new"][changes["added"]]):
+                canvas.create_oval(x - radius, y - radius, x + radius, y + radius, outline="#2FA84F", width=2, tags=("overlay", self.name))
+            for (x, y) in screen(changes["old"][changes["removed"]]):
+                canvas.create_line(x - radius, y - radius, x + radius, y + radius, fill="#C61818", width=2, tags=("overlay", self.name))
+                canvas.create_line(x - radius, y + radius, x + radius, y - radius, fill="#C61818", width=2, tags=("overlay", self.name))
+            moved = changes["moved"]
+            starts = screen(changes["old"][moved[:, 0]])
+            ends = screen(changes["new"][moved[:, 1]])
+            for (x1, y1), (x2, y2) in zip(starts, ends):
+                canvas.create_line(x1, y1, x2, y2, fill="#E08A1E", width=2, arrow="last", tags=("overlay", self.name))
+
+        pose_change = diff["starting_pose"]
+        if pose_change is not None and len(pose_change[0] or []) >= 2 and len(pose_change[1] or []) >= 2:
+            (x1, y1), (x2, y2) = screen(np.array([pose_change[0][:2], pose_change[1][:2]], dtype=float))
+            canvas.create_line(x1, y1, x2, y2, fill="#FFFFFF", width=2, dash=(4, 3), arrow="last", tags=("overlay", self.name))
+
+        self.view = (zoom, offset_x, offset_y)
+
+    def redraw(self):
+        """Follow the current zoom and offset of the canvas."""
+        canvas = self.canvas
+        old_zoom, old_x, old_y = self.view
+        zoom, offset_x, offset_y = canvas.zoom_factor, canvas.offset_x, canvas.offset_y
+        if (zoom, offset_x, offset_y) == self.view:
+            return
+        if zoom != old_zoom:
+            self.draw(self.diff)
+            return
+        canvas.move(self.name, offset_x - old_x, offset_y - old_y)
+        self.view = (zoom, offset_x, offset_y)
+
+    def remove(self):
+        """Remove all items of the layer."""
+        self.canvas.delete(self.name)
+
+
+def _load(path):
+    with open(path, "r") as file:
+        return yaml.safe_load(file) or {}
+
+
+def main():
+    """Compare two track files or merge two edited versions of a track file."""
+    parser = argparse.ArgumentParser(description="Diff and three-way merge of track files.")
+    parser.add_argument("--tolerance", type=float, default=1.0, help="largest distance a cone can move and still be matched in meters")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    diff_parser = subparsers.add_parser("diff", help="report the changes between two track files")
+    diff_parser.add_argument("old", help="old YAML track file")
+    diff_parser.add_argument("new", help="new YAML track file")
+
+    merge_parser = subparsers.add_parser("merge", help="three-way merge of two edited versions")
+    merge_parser.add_argument("base", help="common ancestor YAML track file")
+    merge_parser.add_argument("ours", help="our YAML track file, wins conflicts")
+    merge_parser.add_argument("theirs", help="their YAML track file")
+    merge_parser.add_argument("-o", "--output", required=True, help="merged YAML track file")
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    if args.command == "diff":
+        diff = diff_tracks(_load(args.old), _load(args.new), args.tolerance)
+        print(diff_summary(diff))
+    else:
+        merged, conflicts = merge_tracks(_load(args.base), _load(args.ours), _load(args.theirs), args.tolerance)
+        with open(args.output, "w") as file:
+            yaml.dump(merged, file, default_flow_style=False, indent=2)
+        for conflict in conflicts:
+            print(f"conflict: {conflict}")
+        print(f"Merged into {args.output} with {len(conflicts)} conflicts")
+    print(f"({(time.perf_counter() - start) * 1000:.0f} ms)")
+
+
+if __name__ == "__main__":
+    main()
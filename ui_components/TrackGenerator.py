@@ -0,0 +1,228 @@
+import argparse
+import math
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import yaml
+from scipy.interpolate import splev, splprep
+from scipy.spatial import ConvexHull, QhullError, cKDTree
+
+from ui_components.TrackGeometry import resample_polyline
+from ui_components.TrackMetrics import curvature, polyline_length
+from ui_components.TrackValidation import TrackValidator
+
+
+class TrackRules:
+    """
+    Acceptance rules and shape parameters of generated tracks. All distances are in meters.
+    """
+
+    def __init__(self, track_width=4.0, cone_spacing=3.5, min_length=200.0, max_length=500.0,
+                 min_radius=5.0, area_size=120.0, control_points=(10, 20), perturbation=0.3,
+                 max_attempts=100):
+        """
+        Initialize the rules.
+
+        Args:
+            track_width: Distance between the blue and yellow cones (default: 4.0)
+            cone_spacing: Distance between neighbouring cones along the centerline (default: 3.5)
+            min_length: Shortest accepted centerline (default: 200.0)
+            max_length: Longest accepted centerline (default: 500.0)
+            min_radius: Smallest accepted turning radius of the centerline (default: 5.0)
+            area_size: Side length of the square the control points are drawn in (default: 120.0)
+            control_points: Range of the number of random control points (default: (10, 20))
+            perturbation: Displacement of the hull midpoints relative to the edge length (default: 0.3)
+            max_attempts: Number of candidates drawn before a seed is given up (default: 100)
+        """
+        self.track_width = track_width
+        self.cone_spacing = cone_spacing
+        self.min_length = min_length
+        self.max_length = max_length
+        self.min_radius = min_radius
+        self.area_size = area_size
+        self.control_points = control_points
+        self.perturbation = perturbation
+        self.max_attempts = max_attempts
+
+
+def random_centerline(rng, rules, spacing=0.5):
+    """
+    Draw a random closed centerline.
+    Random control points are reduced to their convex hull, every hull edge gets a midpoint
+    displaced along its normal, and a periodic cubic spline is fitted through the result.
+
+    Args:
+        rng: numpy.random.Generator
+        rules: TrackRules with the shape parameters
+        spacing: Distance between the returned points in meters (default: 0.5)
+
+    Returns:
+        ndarray: (N, 2) array of evenly spaced centerline points, None if the draw is degenerate
+    """
+    count = int(rng.integers(rules.control_points[0], rules.control_points[1] + 1))
+    points = rng.uniform(0.0, rules.area_size, size=(count, 2))
+    try:
+        hull = points[ConvexHull(points).vertices]
+    except QhullError:
+        return None
+    if len(hull) < 3:
+        return None
+
+    following = np.roll(hull, -1, axis=0)
+    edges = following - hull
+    normals = np.column_stack([edges[:, 1], -edges[:, 0]])
+    displacement = rng.uniform(-rules.perturbation, rules.perturbation, size=len(hull))
+    midpoints = (hull + following) / 2 + normals * displacement[:, None]
+
+    control = np.empty((2 * len(hull), 2))
+    control[0::2] = hull
+    control[1::2] = midpoints
+    try:
+        spline, _ = splprep([control[:, 0], control[:, 1]], s=0, per=True)
+    except (ValueError, TypeError):
+        return None
+    dense = np.column_stack(splev(np.linspace(0.0, 1.0, 40 * len(control), endpoint=False), spline))
+    return resample_polyline(dense, spacing, True)
+
+
+def check_centerline(points, rules, spacing=0.5):
+    """
+    Check a closed centerline against the rules.
+
+    Args:
+        points: (N, 2) array of evenly spaced centerline points
+        rules: TrackRules to check against
+        spacing: Distance between the points in meters (default: 0.5)
+
+    Returns:
+        str: Reason of the rejection, None if the centerline is valid
+    """
+    length = polyline_length(points, True)
+    if not rules.min_length <= length <= rules.max_length:
+        return "length"
+
+    step = max(int(round(2.0 / spacing)), 1)
+    if np.abs(curvature(points, True, step)).max() > 1.0 / rules.min_radius:
+        return "radius"
+
+    # points closer than the track width that are not neighbours along the line mean that
+    # the line crosses itself or the boundaries of two track sections overlap
+    clearance = rules.track_width + rules.cone_spacing / 2
+    pairs = cKDTree(points).query_pairs(clearance, output_type="ndarray")
+    if len(pairs):
+        separation = np.abs(pairs[:, 0] - pairs[:, 1])
+        separation = np.minimum(separation, len(points) - separation) * spacing
+        if (separation > math.pi * clearance).any():
+            return "intersection"
+    return None
+
+
+def cones_from_centerline(points, track_width, cone_spacing):
+    """
+    Place cones along a closed centerline with the conventions of Window.generate_cones_from_points:
+    one blue cone on the left and one yellow cone on the right of every segment midpoint.
+
+    Args:
+        points: (N, 2) array of centerline points in meters
+        track_width: Distance between the blue and yellow cones in meters
+        cone_spacing: Length of the segments in meters
+
+    Returns:
+        tuple: (blue, yellow, segments) with the (M, 2) cone positions and the (M + 1, 2)
+               points of the resampled centerline
+    """
+    segments = resample_polyline(points, cone_spacing, True)
+    segments = np.vstack([segments, segments[:1]])
+    directions = np.diff(segments, axis=0)
+    directions /= np.hypot(*directions.T)[:, None]
+    normals = np.column_stack([-directions[:, 1], directions[:, 0]])
+    midpoints = (segments[:-1] + segments[1:]) / 2
+    offset = normals * track_width / 2
+    return midpoints + offset, midpoints - offset, segments
+
+
+def generate_track(seed, rules=None):
+    """
+    Generate a random valid track.
+    Candidates have to pass check_centerline and, after placing the cones, the TrackValidator rules.
+    The result only depends on the seed and the rules.
+
+    Args:
+        seed: Seed of the random generator
+        rules: TrackRules to generate with (default: TrackRules())
+
+    Returns:
+        dict: Track dictionary as stored in the YAML files, None if no valid track was found
+    """
+    rules = rules or TrackRules()
+    rng = np.random.default_rng(seed)
+    validator = TrackValidator(min_track_width=min(rules.track_width, 3.0))
+    for _ in range(rules.max_attempts):
+        points = random_centerline(rng, rules)
+        if points is None or check_centerline(points, rules) is not None:
+            continue
+
+        blue, yellow, segments = cones_from_centerline(points, rules.track_width, rules.cone_spacing)
+        # the placed cones have to pass the same checks as tracks built by hand
+        validator.rebuild(np.vstack([blue, yellow]), np.array(["blue"] * len(blue) + ["yellow"] * len(yellow)))
+        if validator.violations.any():
+            continue
+
+        heading = segments[1] - segments[0]
+        yaw = math.degrees(math.atan2(heading[1], heading[0]))
+        return {
+            "cones_left": np.round(blue, 4).tolist(),
+            "cones_right": np.round(yellow, 4).tolist(),
+            "starting_pose": [round(float(segments[0, 0]), 4), round(float(segments[0, 1]), 4), round(yaw, 4)]
+        }
+    return None
+
+
+def _write_track(job):
+    """Generate the track of one seed and write it, run in the worker processes."""
+    seed, directory, rules = job
+    track_data = generate_track(seed, rules)
+    if track_data is None:
+        return seed, None
+    path = os.path.join(directory, f"track_{seed:06d}.yaml")
+    with open(path, "w") as file:
+        yaml.dump(track_data, file, default_flow_style=False, indent=2)
+    return seed, path
+
+
+def main():
+    """Generate random tracks in parallel, one YAML file per seed."""
+    parser = argparse.ArgumentParser(description="Generate random valid tracks.")
+    parser.add_argument("output", help="output directory")
+    parser.add_argument("--count", type=int, default=100, help="number of tracks")
+    parser.add_argument("--seed", type=int, default=0, help="seed of the first track, the following tracks use the next seeds")
+    parser.add_argument("--workers", type=int, default=None, help="number of processes (default: number of CPUs)")
+    parser.add_argument("--track-width", type=float, default=4.0, help="track width in meters")
+    parser.add_argument("--cone-spacing", type=float, default=3.5, help="cone spacing in meters")
+    parser.add_argument("--min-length", type=float, default=200.0, help="minimum track length in meters")
+    parser.add_argument("--max-length", type=float, default=500.0, help="maximum track length in meters")
+    parser.add_argument("--min-radius", type=float, default=5.0, help="minimum turning radius in meters")
+    args = parser.parse_args()
+
+    os.makedirs(args.output, exist_ok=True)
+    rules = TrackRules(track_width=args.track_width, cone_spacing=args.cone_spacing, min_length=args.min_length,
+                       max_length=args.max_length, min_radius=args.min_radius)
+    jobs = [(seed, args.output, rules) for seed in range(args.seed, args.seed + args.count)]
+
+    start = time.perf_counter()
+    failed = []
+    with ProcessPoolExecutor(max_workers=args.workers) as executor:
+        for seed, path in executor.map(_write_track, jobs, chunksize=max(len(jobs) // (8 * (os.cpu_count() or 1)), 1)):
+            if path is None:
+                failed.append(seed)
+    elapsed = time.perf_counter() - start
+
+    print(f"Generated {args.count - len(failed)} tracks in {elapsed:.1f} s")
+    if failed:
+        print(f"No valid track found for seeds: {failed}")
+
+
+if __name__ == "__main__":
+    main()
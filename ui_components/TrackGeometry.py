@@ -0,0 +1,626 @@
+import itertools
+import math
+
+import numpy as np
+from scipy import sparse
+from scipy.sparse.csgraph import connected_components
+from scipy.spatial import cKDTree, Delaunay, QhullError
+
+
+def cones_to_arrays(cones, scale=1.0):
+    """
+    Collect the positions and types of cone objects into NumPy arrays.
+
+    Args:
+        cones: Iterable of cone objects with position_x, position_y and cone_type
+        scale: Logical units per meter, positions are divided by it (default: 1.0)
+
+    Returns:
+        tuple: (positions, types) where positions is an (N, 2) float array
+               in meters and types is an (N,) array of cone type strings
+    """
+    cones = list(cones)
+    positions = np.fromiter(
+        (value for cone in cones for value in (cone.position_x, cone.position_y)),
+        dtype=float,
+        count=2 * len(cones)
+    ).reshape(-1, 2)
+    positions /= scale
+    types = np.array([cone.cone_type for cone in cones], dtype="<U8")
+    return positions, types
+
+
+def _nearest_neighbour_tour(points, start, neighbours):
+    """
+    Build a tour by repeatedly walking to the nearest unvisited point.
+
+    Args:
+        points: (N, 2) array of positions
+        start: Index of the first point of the tour
+        neighbours: (N, k) array with the indices of the k nearest points of each point
+
+    Returns:
+        ndarray: (N,) array of point indices in tour order
+    """
+    n = len(points)
+    neighbour_lists = neighbours.tolist()
+    visited = bytearray(n)
+    tour = np.empty(n, dtype=int)
+
+    current = start
+    visited[current] = 1
+    tour[0] = current
+    for step in range(1, n):
+        following = -1
+        for candidate in neighbour_lists[current]:
+            if not visited[candidate]:
+                following = candidate
+                break
+
+        # all precomputed neighbours are used up -> search the remaining points directly
+        if following < 0:
+            remaining = np.flatnonzero(np.frombuffer(bytes(visited), dtype=np.uint8) == 0)
+            distances = ((points[remaining] - points[current]) ** 2).sum(axis=1)
+            following = int(remaining[distances.argmin()])
+
+        visited[following] = 1
+        tour[step] = following
+        current = following
+
+    return tour
+
+
+def _two_opt(points, tour, neighbours, max_passes=100):
+    """
+    Improve a closed tour with 2-opt moves restricted to the nearest neighbours of each point.
+    Every pass evaluates all candidate moves at once and applies the best non-overlapping ones.
+    The first point of the tour is kept in place.
+
+    Args:
+        points: (N, 2) array of positions
+        tour: (N,) array of point indices in tour order
+        neighbours: (N, k) array with the indices of the k nearest points of each point
+        max_passes: Maximum number of improvement passes (default: 100)
+
+    Returns:
+        ndarray: Improved tour
+    """
+    n = len(tour)
+    if n < 4:
+        return tour
+
+    tour = tour.copy()
+    for _ in range(max_passes):
+        position = np.empty(n, dtype=int)
+        position[tour] = np.arange(n)
+
+        # moves connecting each point with one of its neighbours
+        first = np.repeat(np.arange(n), neighbours.shape[1] - 1)
+        second = position[neighbours[tour, 1:]].ravel()
+        i = np.minimum(first, second)
+        j = np.maximum(first, second)
+        valid = (j - i >= 2) & ~((i == 0) & (j == n - 1))
+        i, j = i[valid], j[valid]
+
+        a = points[tour[i]]
+        b = points[tour[i + 1]]
+        c = points[tour[j]]
+        d = points[tour[(j + 1) % n]]
+        gain = (np.hypot(*(a - b).T) + np.hypot(*(c - d).T)
+                - np.hypot(*(a - c).T) - np.hypot(*(b - d).T))
+
+        improving = np.flatnonzero(gain > 1e-9)
+        if improving.size == 0:
+            break
+
+        touched = np.zeros(n + 1, dtype=bool)
+        for move in improving[np.argsort(-gain[improving])]:
+            start, end = i[move], j[move]
+            if touched[start:end + 2].any():
+                continue
+            touched[start:end + 2] = True
+            tour[start + 1:end + 1] = tour[start + 1:end + 1][::-1]
+
+    return tour
+
+
+def order_boundary(points, start=None, heading=None, closed=None, neighbours=8):
+    """
+    Order the cones of one boundary into a chain.
+    Uses nearest-neighbour linking over a KD-tree followed by a 2-opt improvement pass.
+
+    Args:
+        points: (N, 2) array of cone positions
+        start: Position the chain should start closest to, e.g. the car (default: first cone)
+        heading: Direction a closed chain should run in at its start (default: keep direction)
+        closed: Whether the boundary is a closed loop, None detects it from the cone gaps (default: None)
+        neighbours: Number of nearest neighbours considered per cone (default: 8)
+
+    Returns:
+        tuple: (order, closed) with the cone indices in chain order and whether the chain is closed
+    """
+    points = np.asarray(points, dtype=float).reshape(-1, 2)
+    n = len(points)
+    if n < 3:
+        return np.arange(n), False
+
+    first = 0
+    if start is not None:
+        first = int(np.argmin(((points - np.asarray(start, dtype=float)[:2]) ** 2).sum(axis=1)))
+
+    k = min(neighbours + 1, n)
+    _, nearest = cKDTree(points).query(points, k=k)
+    tour = _nearest_neighbour_tour(points, first, nearest)
+    tour = _two_opt(points, tour, nearest)
+
+    # an open boundary shows up as one long closing edge of the tour
+    gaps = np.hypot(*(points[np.roll(tour, -1)] - points[tour]).T)
+    longest = int(np.argmax(gaps))
+    if closed is None:
+        closed = gaps[longest] <= 4 * np.median(gaps)
+
+    if not closed:
+        tour = np.roll(tour, -(longest + 1))
+        if start is not None:
+            start = np.asarray(start, dtype=float)[:2]
+            if np.hypot(*(points[tour[-1]] - start)) < np.hypot(*(points[tour[0]] - start)):
+                tour = tour[::-1]
+    elif heading is not None and np.dot(points[tour[1]] - points[tour[0]], heading) < 0:
+        tour = np.concatenate([tour[:1], tour[:0:-1]])
+
+    return tour, bool(closed)
+
+
+def order_track(track_data, closed=None):
+    """
+    Order the left and right cones of a track so that each boundary forms a chain
+    starting at the cone closest to the starting pose.
+
+    Args:
+        track_data: Track dictionary as stored in the YAML files (coordinates in meters)
+        closed: Whether the boundaries are closed loops, None detects it (default: None)
+
+    Returns:
+        dict: Copy of the track dictionary with ordered 'cones_left' and 'cones_right'
+    """
+    ordered = dict(track_data)
+    pose = track_data.get("starting_pose") or []
+
+    start = heading = None
+    if len(pose) >= 3:
+        start = pose[:2]
+        heading = (math.cos(math.radians(pose[2])), math.sin(math.radians(pose[2])))
+
+    for key in ("cones_left", "cones_right"):
+        cones = track_data.get(key) or []
+        if not cones:
+            continue
+        order, _ = order_boundary(np.asarray(cones, dtype=float), start, heading, closed)
+        ordered[key] = [cones[index] for index in order]
+
+    return ordered
+
+
+def _walk_chains(links):
+    """
+    Split a graph in which every node has at most two links into chains.
+
+    Args:
+        links: (M, 2) array with the linked nodes of each node, -1 where there is no link
+
+    Returns:
+        list: Tuples (nodes, closed) with the node indices of each chain in walking order
+    """
+    link_lists = links.tolist()
+    visited = bytearray(len(link_lists))
+    degree = (links >= 0).sum(axis=1)
+    chains = []
+
+    # walk open chains from their ends first, the remaining nodes form cycles
+    for first in itertools.chain(np.flatnonzero(degree <= 1).tolist(), range(len(link_lists))):
+        if visited[first]:
+            continue
+        nodes = [first]
+        visited[first] = 1
+        previous, current = -1, first
+        while True:
+            following = -1
+            for candidate in link_lists[current]:
+                if candidate >= 0 and candidate != previous and not visited[candidate]:
+                    following = candidate
+                    break
+            if following < 0:
+                break
+            visited[following] = 1
+            nodes.append(following)
+            previous, current = current, following
+        closed = len(nodes) > 2 and first in link_lists[current]
+        chains.append((np.asarray(nodes), closed))
+
+    return chains
+
+
+def compute_centerline(blue, yellow, start=None, heading=None, max_width=None):
+    """
+    Compute the centerline and the left/right cone pairing of a track.
+    All cones are triangulated, edges connecting a blue with a yellow cone are kept and
+    their midpoints are chained along the triangles they share.
+
+    Args:
+        blue: (N, 2) array of blue (left) cone positions
+        yellow: (M, 2) array of yellow (right) cone positions
+        start: Position the centerline should start closest to, e.g. the car (default: None)
+        heading: Direction the centerline should run in at its start (default: None)
+        max_width: Longest blue/yellow edge still considered part of the track,
+                   None uses three times the median edge length (default: None)
+
+    Returns:
+        dict: 'points' (K, 2) centerline points, 'widths' (K,) local track widths,
+              'pairs' (K, 2) indices of the paired blue and yellow cone and 'closed'
+              whether the centerline is a loop; None if no centerline can be formed
+    """
+    blue = np.asarray(blue, dtype=float).reshape(-1, 2)
+    yellow = np.asarray(yellow, dtype=float).reshape(-1, 2)
+    if len(blue) < 2 or len(yellow) < 2 or len(blue) + len(yellow) < 4:
+        return None
+
+    points = np.vstack([blue, yellow])
+    is_blue = np.arange(len(points)) < len(blue)
+    n = len(points)
+
+    try:
+        simplices = Delaunay(points).simplices
+    except QhullError:
+        return None
+
+    # every triangle edge as a sorted vertex pair, encoded as a single integer key
+    edges = np.sort(simplices[:, [[0, 1], [1, 2], [2, 0]]], axis=2)
+    keys = edges[:, :, 0].astype(np.int64) * n + edges[:, :, 1]
+    mixed = is_blue[edges[:, :, 0]] != is_blue[edges[:, :, 1]]
+
+    unique_keys, edge_ids = np.unique(keys[mixed], return_inverse=True)
+    first, second = np.divmod(unique_keys, n)
+    lengths = np.hypot(*(points[first] - points[second]).T)
+    if max_width is None:
+        max_width = 3 * np.median(lengths)
+    usable = lengths <= max_width
+
+    # a triangle with cones of both colours has exactly two mixed edges -> link their midpoints
+    triangle_edges = np.full(keys.shape, -1)
+    triangle_edges[mixed] = edge_ids.ravel()
+    triangle_edges = np.sort(triangle_edges, axis=1)[:, 1:]
+    triangle_edges = triangle_edges[(triangle_edges >= 0).all(axis=1)]
+    triangle_edges = triangle_edges[usable[triangle_edges].all(axis=1)]
+    if len(triangle_edges) == 0:
+        return None
+
+    sources = triangle_edges.ravel()
+    targets = triangle_edges[:, ::-1].ravel()
+    order = np.argsort(sources, kind="stable")
+    sources, targets = sources[order], targets[order]
+    slot = np.arange(len(sources)) - np.searchsorted(sources, sources)
+    links = np.full((len(unique_keys), 2), -1)
+    links[sources, slot] = targets
+    links[~usable] = -1
+
+    nodes, closed = max(_walk_chains(links), key=lambda chain: len(chain[0]))
+    centerline = (points[first[nodes]] + points[second[nodes]]) / 2
+
+    if start is not None:
+        start = np.asarray(start, dtype=float)[:2]
+        if closed:
+            shift = int(np.argmin(((centerline - start) ** 2).sum(axis=1)))
+            nodes = np.roll(nodes, -shift)
+            centerline = np.roll(centerline, -shift, axis=0)
+        elif np.hypot(*(centerline[-1] - start)) < np.hypot(*(centerline[0] - start)):
+            nodes, centerline = nodes[::-1], centerline[::-1]
+    if closed and heading is not None and np.dot(centerline[1] - centerline[0], heading) < 0:
+        nodes = np.concatenate([nodes[:1], nodes[:0:-1]])
+        centerline = np.concatenate([centerline[:1], centerline[:0:-1]])
+
+    # pair each centerline point with its blue and yellow cone
+    ends = np.column_stack([first[nodes], second[nodes]])
+    blue_end = np.where(is_blue[ends[:, 0]], ends[:, 0], ends[:, 1])
+    yellow_end = np.where(is_blue[ends[:, 0]], ends[:, 1], ends[:, 0])
+
+    return {
+        "points": centerline,
+        "widths": lengths[nodes],
+        "pairs": np.column_stack([blue_end, yellow_end - len(blue)]),
+        "closed": bool(closed)
+    }
+
+
+def centerline_to_list(centerline):
+    """
+    Convert a centerline into the 'centerline' section of the YAML track files.
+
+    Args:
+        centerline: Result of compute_centerline
+
+    Returns:
+        list: [x, y, width] entries in meters, rounded like the cone positions
+    """
+    values = np.column_stack([centerline["points"], centerline["widths"]])
+    return np.round(values, 4).tolist()
+
+
+def track_centerline(track_data):
+    """
+    Compute the centerline of a track dictionary, starting at the starting pose if present.
+
+    Args:
+        track_data: Track dictionary as stored in the YAML files (coordinates in meters)
+
+    Returns:
+        dict: Result of compute_centerline, None if no centerline can be formed
+    """
+    pose = track_data.get("starting_pose") or []
+    start = heading = None
+    if len(pose) >= 3:
+        start = pose[:2]
+        heading = (math.cos(math.radians(pose[2])), math.sin(math.radians(pose[2])))
+
+    return compute_centerline(
+        np.asarray(track_data.get("cones_left") or [], dtype=float),
+        np.asarray(track_data.get("cones_right") or [], dtype=float),
+        start,
+        heading
+    )
+
+
+def resample_polyline(points, spacing, closed=False):
+    """
+    Resample a polyline to points evenly spaced by arc length.
+
+    Args:
+        points: (N, 2) array of positions
+        spacing: Distance between the resampled points
+        closed: Whether the last point connects back to the first (default: False)
+
+    Returns:
+        ndarray: (K, 2) array of resampled positions, starting at the first point
+    """
+    points = np.asarray(points, dtype=float).reshape(-1, 2)
+    if len(points) < 2 or spacing <= 0:
+        return points.copy()
+
+    if closed:
+        points = np.vstack([points, points[:1]])
+    distance = np.concatenate([[0.0], np.cumsum(np.hypot(*np.diff(points, axis=0).T))])
+    total = distance[-1]
+    if total == 0:
+        return points[:1].copy()
+
+    count = max(int(round(total / spacing)), 1)
+    samples = np.linspace(0.0, total, count + 1)
+    if closed:
+        samples = samples[:-1]
+
+    resampled = np.empty((len(samples), 2))
+    resampled[:, 0] = np.interp(samples, distance, points[:, 0])
+    resampled[:, 1] = np.interp(samples, distance, points[:, 1])
+    return resampled
+
+
+def simplify_polyline(points, tolerance, closed=False):
+    """
+    Douglas-Peucker simplification of a polyline.
+    All segments are split in the same pass, so the number of passes grows with the
+    depth of the recursion instead of the number of kept points.
+
+    Args:
+        points: (N, 2) array of positions
+        tolerance: Largest allowed distance of a dropped point from the simplified polyline
+        closed: Whether the last point connects back to the first (default: False)
+
+    Returns:
+        ndarray: Sorted indices of the kept points
+    """
+    points = np.asarray(points, dtype=float).reshape(-1, 2)
+    n = len(points)
+    if n < 3:
+        return np.arange(n)
+    if closed:
+        # a closed chain is simplified as an open one from the first point back to itself
+        kept = simplify_polyline(np.vstack([points, points[:1]]), tolerance)
+        return kept[kept < n]
+
+    indices = np.arange(n)
+    keep = np.zeros(n, dtype=bool)
+    keep[[0, -1]] = True
+    while True:
+        anchors = np.flatnonzero(keep)
+        segment = np.minimum(np.searchsorted(anchors, indices, side="right") - 1, len(anchors) - 2)
+        start, end = points[anchors[segment]], points[anchors[segment + 1]]
+        direction = end - start
+        length_squared = (direction ** 2).sum(axis=1)
+        t = np.clip(((points - start) * direction).sum(axis=1) / np.maximum(length_squared, 1e-12), 0.0, 1.0)
+        distance = np.hypot(*(points - start - t[:, None] * direction).T)
+        distance[keep] = 0.0
+
+        largest = np.maximum.reduceat(distance, anchors[:-1])
+        split = largest > tolerance
+        if not split.any():
+            return anchors
+        # split every segment at its farthest point
+        candidates = np.flatnonzero(split[segment] & (distance == largest[segment]))
+        _, first = np.unique(segment[candidates], return_index=True)
+        keep[candidates[first]] = True
+
+
+class SpatialHash:
+    """
+    Uniform grid of cells for constant-time lookup of items near a position.
+    Items are stored with their position; the cell size should be close to the query radius.
+    """
+
+    def __init__(self, cell_size):
+        """
+        Initialize an empty spatial hash.
+
+        Args:
+            cell_size: Edge length of the grid cells
+        """
+        self.cell_size = cell_size
+        self.cells = {}
+        self.positions = {}
+
+    def _key(self, x, y):
+        return math.floor(x / self.cell_size), math.floor(y / self.cell_size)
+
+    def insert(self, item, x, y):
+        """Add an item at the given position, replacing an earlier entry of the same item."""
+        if item in self.positions:
+            self.remove(item)
+        self.positions[item] = (x, y)
+        self.cells.setdefault(self._key(x, y), set()).add(item)
+
+    def remove(self, item):
+        """Remove an item if it is stored."""
+        position = self.positions.pop(item, None)
+        if position is None:
+            return
+        key = self._key(*position)
+        cell = self.cells.get(key)
+        if cell is not None:
+            cell.discard(item)
+            if not cell:
+                del self.cells[key]
+
+    def clear(self):
+        """Remove all items."""
+        self.cells.clear()
+        self.positions.clear()
+
+    def query(self, x, y, radius):
+        """
+        Find the items within a radius of a position.
+
+        Args:
+            x, y: Query position
+            radius: Search radius
+
+        Returns:
+            list: (distance, item) tuples sorted by distance
+        """
+        reach = max(int(math.ceil(radius / self.cell_size)), 1)
+        cx, cy = self._key(x, y)
+        found = []
+        for i in range(cx - reach, cx + reach + 1):
+            for j in range(cy - reach, cy + reach + 1):
+                for item in self.cells.get((i, j), ()):
+                    px, py = self.positions[item]
+                    distance = math.hypot(px - x, py - y)
+                    if distance <= radius:
+                        found.append((distance, item))
+        found.sort(key=lambda entry: entry[0])
+        return found
+
+
+def find_duplicate_clusters(points, radius, groups=None):
+    """
+    Cluster points that lie within a radius of each other (transitively).
+    Uses a KD-tree pair search and connected components, O(N log N) for sparse duplicates.
+
+    Args:
+        points: (N, 2) array of positions
+        radius: Distance below which two points are duplicates
+        groups: Optional (N,) array, only points of the same group are clustered (e.g. cone types)
+
+    Returns:
+        ndarray: (N,) cluster label of every point; points without duplicates get their own label
+    """
+    points = np.asarray(points, dtype=float).reshape(-1, 2)
+    n = len(points)
+    if n == 0:
+        return np.empty(0, dtype=int)
+
+    pairs = cKDTree(points).query_pairs(radius, output_type="ndarray")
+    if groups is not None and len(pairs):
+        groups = np.asarray(groups)
+        pairs = pairs[groups[pairs[:, 0]] == groups[pairs[:, 1]]]
+
+    graph = sparse.coo_matrix((np.ones(len(pairs)), (pairs[:, 0], pairs[:, 1])), shape=(n, n))
+    _, labels = connected_components(graph, directed=False)
+    return labels
+
+
+def merge_duplicates(points, radius, groups=None):
+    """
+    Merge clusters of near-duplicate points into their mean position.
+
+    Args:
+        points: (N, 2) array of positions
+        radius: Distance below which two points are duplicates
+        groups: Optional (N,) array, only points of the same group are merged (e.g. cone types)
+
+    Returns:
+        tuple: (keep, merged) with the indices of the points kept (the first of each cluster)
+               and their merged (K, 2) positions
+    """
+    points = np.asarray(points, dtype=float).reshape(-1, 2)
+    labels = find_duplicate_clusters(points, radius, groups)
+    if len(labels) == 0:
+        return np.empty(0, dtype=int), np.empty((0, 2))
+
+    _, keep, counts = np.unique(labels, return_index=True, return_counts=True)
+    sums = np.zeros((labels.max() + 1, 2))
+    np.add.at(sums, labels, points)
+    merged = sums[labels[keep]] / counts[:, None]
+
+    order = np.argsort(keep)
+    return keep[order], merged[order]
+
+
+def skip_duplicates(points, radius, existing=None):
+    """
+    Mask of the points that can be placed one after the other without creating duplicates:
+    a point is skipped if an existing point or an earlier kept point lies within the radius.
+
+    Args:
+        points: (N, 2) array of positions, in placement order
+        radius: Distance up to which two points are duplicates
+        existing: Optional (M, 2) array of positions already placed
+
+    Returns:
+        ndarray: (N,) boolean mask of the points to place
+    """
+    points = np.asarray(points, dtype=float).reshape(-1, 2)
+    skipped = np.zeros(len(points), dtype=bool)
+    if len(points) == 0:
+        return ~skipped
+    if existing is not None and len(existing):
+        # distance_upper_bound is exclusive, the radius is not
+        distances, _ = cKDTree(np.asarray(existing, dtype=float).reshape(-1, 2)).query(points, distance_upper_bound=np.nextafter(radius, np.inf))
+        skipped = np.isfinite(distances)
+
+    # pairs in order of their first point, so that every point is decided before it skips others
+    pairs = cKDTree(points).query_pairs(radius, output_type="ndarray")
+    for first, second in pairs[np.lexsort((pairs[:, 1], pairs[:, 0]))].tolist():
+        if not skipped[first]:
+            skipped[second] = True
+    return ~skipped
+
+
+def deduplicate_track(track_data, radius=0.1):
+    """
+    Merge near-duplicate cones of a track dictionary, separately for each boundary.
+
+    Args:
+        track_data: Track dictionary as stored in the YAML files (coordinates in meters)
+        radius: Distance in meters below which two cones are duplicates (default: 0.1)
+
+    Returns:
+        tuple: (track_data, removed) with a deduplicated copy and the number of removed cones
+    """
+    deduplicated = dict(track_data)
+    removed = 0
+    for key in ("cones_left", "cones_right"):
+        cones = track_data.get(key) or []
+        if not cones:
+            continue
+        _, merged = merge_duplicates(np.asarray(cones, dtype=float), radius)
+        removed += len(cones) - len(merged)
+        deduplicated[key] = np.round(merged, 4).tolist()
+    return deduplicated, removed
@@ -0,0 +1,176 @@
+import numpy as np
+
+from ui_components.TrackGeometry import order_boundary, resample_polyline
+
+# upper edges of the straight-length histogram bins in meters
+STRAIGHT_BINS = (0.0, 10.0, 25.0, 50.0, 100.0, np.inf)
+
+
+def polyline_length(points, closed=False):
+    """
+    Length of a polyline.
+
+    Args:
+        points: (N, 2) array of positions
+        closed: Whether the last point connects back to the first (default: False)
+
+    Returns:
+        float: Length in the units of the points
+    """
+    points = np.asarray(points, dtype=float).reshape(-1, 2)
+    if len(points) < 2:
+        return 0.0
+    following = np.roll(points, -1, axis=0) if closed else points[1:]
+    return float(np.hypot(*(following - points[:len(following)]).T).sum())
+
+
+def curvature(points, closed=False, step=1):
+    """
+    Signed curvature at every point of a polyline using the circle through each point
+    and the points `step` positions before and after it (positive for left turns).
+
+    Args:
+        points: (N, 2) array of positions
+        closed: Whether the polyline is a loop (default: False)
+        step: Offset of the neighbours used for the circle (default: 1)
+
+    Returns:
+        ndarray: (N,) curvature in 1/unit, zero at the ends of an open polyline
+    """
+    points = np.asarray(points, dtype=float).reshape(-1, 2)
+    result = np.zeros(len(points))
+    if len(points) < 2 * step + 1:
+        return result
+
+    previous = np.roll(points, step, axis=0)
+    following = np.roll(points, -step, axis=0)
+    a = np.hypot(*(points - previous).T)
+    b = np.hypot(*(following - points).T)
+    c = np.hypot(*(following - previous).T)
+    cross = ((points[:, 0] - previous[:, 0]) * (following[:, 1] - previous[:, 1])
+             - (points[:, 1] - previous[:, 1]) * (following[:, 0] - previous[:, 0]))
+
+    denominator = a * b * c
+    np.divide(2 * cross, denominator, out=result, where=denominator > 0)
+    if not closed:
+        result[:step] = 0.0
+        result[-step:] = 0.0
+    return result
+
+
+def smooth_polyline(points, window, closed=False):
+    """
+    Smooth a polyline with a moving average over `window` points.
+
+    Args:
+        points: (N, 2) array of positions
+        window: Number of points averaged, odd values keep the points centered
+        closed: Whether the polyline is a loop (default: False)
+
+    Returns:
+        ndarray: (N, 2) array of smoothed positions, the ends of an open polyline are kept
+    """
+    points = np.asarray(points, dtype=float).reshape(-1, 2)
+    half = window // 2
+    if half < 1 or len(points) < window:
+        return points.copy()
+
+    kernel = np.full(2 * half + 1, 1.0 / (2 * half + 1))
+    if closed:
+        padded = np.concatenate([points[-half:], points, points[:half]])
+    else:
+        padded = np.concatenate([np.repeat(points[:1], half, axis=0), points, np.repeat(points[-1:], half, axis=0)])
+    smoothed = np.column_stack([np.convolve(padded[:, axis], kernel, mode="valid") for axis in range(2)])
+    if not closed:
+        smoothed[[0, -1]] = points[[0, -1]]
+    return smoothed
+
+
+def straight_lengths(points, kappa, closed=False, straight_curvature=0.01):
+    """
+    Lengths of the straights of a polyline, i.e. runs of segments whose
+    endpoints both have a curvature below the threshold.
+
+    Args:
+        points: (N, 2) array of positions
+        kappa: (N,) curvature at the points
+        closed: Whether the polyline is a loop (default: False)
+        straight_curvature: Largest curvature still counted as straight (default: 0.01)
+
+    Returns:
+        ndarray: Length of every straight
+    """
+    points = np.asarray(points, dtype=float).reshape(-1, 2)
+    straight = np.abs(kappa) < straight_curvature
+    if closed:
+        segment_straight = straight & np.roll(straight, -1)
+        segment_lengths = np.hypot(*(np.roll(points, -1, axis=0) - points).T)
+        if segment_straight.all():
+            return np.array([segment_lengths.sum()])
+        # start at a curved segment so that no straight wraps around the end
+        shift = int(np.argmin(segment_straight))
+        segment_straight = np.roll(segment_straight, -shift)
+        segment_lengths = np.roll(segment_lengths, -shift)
+    else:
+        segment_straight = straight[:-1] & straight[1:]
+        segment_lengths = np.hypot(*np.diff(points, axis=0).T)
+
+    edges = np.diff(np.concatenate([[0], segment_straight.astype(np.int8), [0]]))
+    starts = np.flatnonzero(edges == 1)
+    ends = np.flatnonzero(edges == -1)
+    cumulative = np.concatenate([[0.0], np.cumsum(segment_lengths)])
+    return cumulative[ends] - cumulative[starts]
+
+
+def compute_track_metrics(centerline, blue=None, yellow=None, straight_curvature=0.01, spacing=1.0, curvature_span=3.0):
+    """
+    Compute the metrics of a track layout.
+    The centerline is resampled evenly and smoothed before the curvature is evaluated,
+    so that the zigzag of the cone midpoints does not show up as tight corners.
+
+    Args:
+        centerline: Result of TrackGeometry.compute_centerline
+        blue: (N, 2) array of blue cone positions for the boundary lengths (default: None)
+        yellow: (M, 2) array of yellow cone positions for the boundary lengths (default: None)
+        straight_curvature: Largest curvature in 1/m still counted as straight (default: 0.01)
+        spacing: Distance between the resampled centerline points in meters (default: 1.0)
+        curvature_span: Distance to the neighbours used for the curvature and
+                        half the smoothing window in meters (default: 3.0)
+
+    Returns:
+        dict: Track length, curvature along the resampled centerline, minimum turning radius,
+              straight lengths with their histogram, width range and boundary lengths (meters)
+    """
+    closed = centerline["closed"]
+    widths = centerline["widths"]
+    points = resample_polyline(centerline["points"], spacing, closed)
+    step = max(int(round(curvature_span / spacing)), 1)
+    points = smooth_polyline(points, 2 * step + 1, closed)
+
+    kappa = curvature(points, closed, step)
+    max_curvature = float(np.abs(kappa).max()) if len(kappa) else 0.0
+    straights = straight_lengths(points, kappa, closed, straight_curvature)
+    histogram, _ = np.histogram(straights, bins=STRAIGHT_BINS)
+
+    metrics = {
+        "length": polyline_length(points, closed),
+        "closed": closed,
+        "points": points,
+        "curvature": kappa,
+        "max_curvature": max_curvature,
+        "min_radius": 1.0 / max_curvature if max_curvature > 0 else np.inf,
+        "straights": straights,
+        "straight_histogram": histogram,
+        "min_width": float(widths.min()),
+        "max_width": float(widths.max()),
+        "mean_width": float(widths.mean())
+    }
+
+    for key, cones in (("left_length", blue), ("right_length", yellow)):
+        if cones is None or len(cones) < 2:
+            metrics[key] = 0.0
+            continue
+        order, boundary_closed = order_boundary(cones, points[0])
+        metrics[key] = polyline_length(np.asarray(cones)[order], boundary_closed)
+
+    return metrics
@@ -0,0 +1,399 @@
+import itertools
+import time
+
+import numpy as np
+from scipy.spatial import cKDTree
+
+from ui_components.TrackGeometry import cones_to_arrays
+
+# order of the columns in TrackValidator.violations
+RULES = ("track_width", "cone_gap", "crossing", "cone_spacing")
+
+
+def _segments_intersect(p1, p2, q1, q2):
+    """
+    Vectorised test whether segments p1-p2 and q1-q2 properly intersect.
+
+    Args:
+        p1, p2: (N, 2) arrays with the endpoints of the first segments
+        q1, q2: (N, 2) arrays with the endpoints of the second segments
+
+    Returns:
+        ndarray: (N,) boolean array, True where the segments cross
+    """
+    def cross(u, v):
+        return u[:, 0] * v[:, 1] - u[:, 1] * v[:, 0]
+
+    d1 = cross(q2 - q1, p1 - q1)
+    d2 = cross(q2 - q1, p2 - q1)
+    d3 = cross(p2 - p1, q1 - p1)
+    d4 = cross(p2 - p1, q2 - p1)
+    return (d1 * d2 < 0) & (d3 * d4 < 0)
+
+
+def _flatten(neighbour_lists, count):
+    """Flatten the result of cKDTree.query_ball_point into (owner, neighbour) index arrays."""
+    counts = np.fromiter(map(len, neighbour_lists), dtype=int, count=count)
+    owner = np.repeat(np.arange(count), counts)
+    neighbours = np.fromiter(itertools.chain.from_iterable(neighbour_lists), dtype=int, count=int(counts.sum()))
+    return owner, neighbours
+
+
+class TrackValidator:
+    """
+    Checks cone positions against the track rules (minimum track width, maximum cone gap,
+    blue/yellow crossing and minimum cone spacing).
+    All distances are in meters. KD-trees over the cones allow moved cones to be
+    re-checked together with their neighbourhood only. The trees are not rebuilt while
+    cones move: moved ('stale') cones are left out of tree results and compared directly
+    instead, until refresh_trees is called, e.g. once a drag has ended.
+    """
+
+    def __init__(self, min_track_width=3.0, max_cone_gap=5.0, min_cone_spacing=0.5, max_stale=256):
+        """
+        Initialize the validator with the track rules.
+
+        Args:
+            min_track_width: Minimum distance between a cone and the opposite boundary (default: 3.0)
+            max_cone_gap: Maximum distance between neighbouring cones of a boundary (default: 5.0)
+            min_cone_spacing: Minimum distance between any two cones (default: 0.5)
+            max_stale: Number of moved cones beyond which the trees are rebuilt right away (default: 256)
+        """
+        self.min_track_width = min_track_width
+        self.max_cone_gap = max_cone_gap
+        self.min_cone_spacing = min_cone_spacing
+        self.max_stale = max_stale
+
+        self.positions = np.empty((0, 2))
+        self.types = np.empty(0, dtype="<U8")
+        self.violations = np.zeros((0, len(RULES)), dtype=bool)
+
+        self._links = np.empty((0, 2), dtype=int)
+        self._colour_rows = {}
+        self._colour_trees = {}
+        self._all_tree = None
+        self._all_rows = np.empty(0, dtype=int)
+        # cones moved since the trees were built, their tree positions are outdated
+        self._stale = np.zeros(0, dtype=bool)
+        self._stale_rows = np.empty(0, dtype=int)
+
+    @property
+    def neighbourhood_radius(self):
+        """Radius around a moved cone in which rule results can change."""
+        return 2 * max(self.max_cone_gap, self.min_track_width, self.min_cone_spacing)
+
+    def rebuild(self, positions, types):
+        """
+        Replace all cones and check the whole track.
+
+        Args:
+            positions: (N, 2) array of cone positions in meters
+            types: (N,) array of cone types ('blue' or 'yellow')
+        """
+        self.positions = np.array(positions, dtype=float).reshape(-1, 2)
+        self.types = np.asarray(types)
+        rows = np.arange(len(self.positions))
+
+        self._links = np.full((len(rows), 2), -1, dtype=int)
+        self._build_trees()
+        self._update_links(rows)
+        self.violations = self._check(rows)
+
+    def update_positions(self, rows, new_positions):
+        """
+        Move cones and re-check only the cones in the neighbourhood of their old and new positions.
+
+        Args:
+            rows: Indices of the moved cones
+            new_positions: (len(rows), 2) array of the new positions in meters
+
+        Returns:
+            ndarray: Indices of the cones that were re-checked
+        """
+        rows = np.atleast_1d(np.asarray(rows, dtype=int))
+        if rows.size == 0:
+            return rows
+
+        old_positions = self.positions[rows].copy()
+        self.positions[rows] = np.asarray(new_positions, dtype=float).reshape(-1, 2)
+        self._stale[rows] = True
+        self._stale_rows = np.flatnonzero(self._stale)
+        if self._stale_rows.size > self.max_stale:
+            self._build_trees()
+
+        probes = np.vstack([old_positions, self.positions[rows]])
+        _, affected = self._query_ball(probes, self.neighbourhood_radius)
+        affected = np.union1d(affected, rows)
+
+        self._update_links(affected)
+        self.violations[affected] = self._check(affected)
+        return affected
+
+    def refresh_trees(self):
+        """Rebuild the KD-trees if cones were moved since they were built."""
+        if self._stale_rows.size:
+            self._build_trees()
+
+    def invalid_rows(self):
+        """Return the indices of all cones that violate at least one rule."""
+        return np.flatnonzero(self.violations.any(axis=1))
+
+    def summary(self):
+        """Return the number of offending cones per rule."""
+        return dict(zip(RULES, (int(count) for count in self.violations.sum(axis=0))))
+
+    def _build_trees(self):
+        """Build the KD-trees over all cones and over each cone colour."""
+        self._all_rows = np.arange(len(self.positions))
+        self._all_tree = cKDTree(self.positions) if len(self.positions) else None
+        self._colour_rows = {}
+        self._colour_trees = {}
+        for colour in ("blue", "yellow"):
+            rows = np.flatnonzero(self.types == colour)
+            self._colour_rows[colour] = rows
+            self._colour_trees[colour] = cKDTree(self.positions[rows]) if rows.size else None
+        self._stale = np.zeros(len(self.positions), dtype=bool)
+        self._stale_rows = np.empty(0, dtype=int)
+
+    def _tree(self, colour):
+        """KD-tree, its rows and the stale rows of one colour, or of all cones for None."""
+        stale = self._stale_rows
+        if colour is None:
+            return self._all_tree, self._all_rows, stale
+        return self._colour_trees[colour], self._colour_rows[colour], stale[self.types[stale] == colour]
+
+    def _query_ball(self, points, radius, colour=None):
+        """
+        Cones within a radius of points, with current positions for the stale cones.
+
+        Returns:
+            tuple: (index into points, cone row) arrays of all pairs
+        """
+        tree, rows, stale = self._tree(colour)
+        owner = found = np.empty(0, dtype=int)
+        if tree is not None:
+            owner, index = _flatten(tree.query_ball_point(points, radius), len(points))
+            found = rows[index]
+            fresh = ~self._stale[found]
+            owner, found = owner[fresh], found[fresh]
+        if stale.size:
+            offsets = points[:, None, :] - self.positions[stale][None, :, :]
+            near_owner, near_stale = np.nonzero(np.hypot(offsets[..., 0], offsets[..., 1]) <= radius)
+            owner = np.concatenate([owner, near_owner])
+            found = np.concatenate([found, stale[near_stale]])
+        return owner, found
+
+    def _query_nearest(self, points, k, colour=None):
+        """
+        The k nearest cones of points, with current positions for the stale cones.
+
+        Returns:
+            tuple: ((len(points), k) distances, (len(points), k) cone rows), padded with inf and -1
+        """
+        tree, rows, stale = self._tree(colour)
+        distances = np.empty((len(points), 0))
+        found = np.empty((len(points), 0), dtype=int)
+        if tree is not None:
+            # stale cones are dropped from the tree result, so ask for that many more
+            count = min(k + stale.size, rows.size)
+            distances, index = tree.query(points, k=count)
+            distances, found = distances.reshape(len(points), count), rows[index.reshape(len(points), count)]
+            distances = np.where(self._stale[found], np.inf, distances)
+        if stale.size:
+            offsets = points[:, None, :] - self.positions[stale][None, :, :]
+            distances = np.hstack([distances, np.hypot(offsets[..., 0], offsets[..., 1])])
+            found = np.hstack([found, np.broadcast_to(stale, (len(points), stale.size))])
+        if distances.shape[1] < k:
+            padding = k - distances.shape[1]
+            distances = np.hstack([distances, np.full((len(points), padding), np.inf)])
+            found = np.hstack([found, np.full((len(points), padding), -1)])
+        order = np.argsort(distances, axis=1, kind="stable")[:, :k]
+        return np.take_along_axis(distances, order, axis=1), np.take_along_axis(found, order, axis=1)
+
+    def _update_links(self, rows):
+        """
+        Link the given cones to their two nearest cones of the same colour within the maximum gap.
+        These links approximate the local boundary polyline.
+        """
+        self._links[rows] = -1
+        for colour in ("blue", "yellow"):
+            colour_rows = self._colour_rows[colour]
+            selected = rows[self.types[rows] == colour]
+            if colour_rows.size < 2 or selected.size == 0:
+                continue
+
+            k = min(3, colour_rows.size)
+            distances, neighbours = self._query_nearest(self.positions[selected], k, colour)
+            for column in range(1, k):
+                valid = distances[:, column] <= self.max_cone_gap
+                self._links[selected[valid], column - 1] = neighbours[valid, column]
+
+    def _check(self, rows):
+        """
+        Evaluate all rules for the given cones.
+
+        Args:
+            rows: Indices of the cones to check
+
+        Returns:
+            ndarray: (len(rows), len(RULES)) boolean array of violations
+        """
+        result = np.zeros((len(rows), len(RULES)), dtype=bool)
+        if len(rows) == 0:
+            return result
+
+        points = self.positions[rows]
+        types = self.types[rows]
+
+        # cones too close together
+        if len(self.positions) >= 2:
+            distances, _ = self._query_nearest(points, 2)
+            result[:, 3] = distances[:, 1] < self.min_cone_spacing
+
+        for colour, other in (("blue", "yellow"), ("yellow", "blue")):
+            mask = types == colour
+            if not mask.any():
+                continue
+
+            # track narrower than allowed
+            if self._colour_trees.get(other) is not None:
+                distances, _ = self._query_nearest(points[mask], 1, other)
+                result[mask, 0] = distances[:, 0] < self.min_track_width
+
+            # boundary interrupted: a cone of a closed boundary needs two neighbours within the gap
+            if self._colour_rows[colour].size >= 3:
+                result[mask, 1] = (self._links[rows[mask]] < 0).any(axis=1)
+
+            # boundary segments of this cone crossing the opposite boundary
+            if self._colour_rows[other].size >= 2:
+                result[mask, 2] = self._check_crossing(rows[mask], other)
+
+        return result
+
+    def _check_crossing(self, rows, other):
+        """
+        Test the boundary segments starting at the given cones against the segments of the
+        opposite boundary. Segments are at most max_cone_gap long, so every opposite segment
+        that can cross starts within twice that distance of the cone.
+        """
+        owner, candidates = self._query_ball(self.positions[rows], 2 * self.max_cone_gap, other)
+        if owner.size == 0:
+            return np.zeros(len(rows), dtype=bool)
+
+        origin = self.positions[rows[owner]]
+        candidate_origin = self.positions[candidates]
+        hit = np.zeros(owner.size, dtype=bool)
+        for column in range(2):
+            links = self._links[rows[owner], column]
+            for other_column in range(2):
+                other_links = self._links[candidates, other_column]
+                valid = (links >= 0) & (other_links >= 0)
+                hit |= valid & _segments_intersect(origin, self.positions[links], candidate_origin, self.positions[other_links])
+
+        return np.bincount(owner[hit], minlength=len(rows)) > 0
+
+
+class LiveValidation:
+    """
+    Keeps a TrackValidator in sync with the cones of the main window.
+    Track changes are collected and evaluated once per idle cycle, so a drag only
+    triggers a neighbourhood re-check and a single batched highlight update per frame.
+    """
+
+    def __init__(self, window, validator=None):
+        """
+        Initialize the live validation.
+
+        Args:
+            window: Main application window holding the cones and the canvas
+            validator: TrackValidator to use (default: validator with default rules)
+        """
+        self.window = window
+        self.canvas = window.placing_canvas
+        self.validator = validator or TrackValidator()
+
+        self.cones = []
+        self.rows = {}
+        self.moved_cones = set()
+        self.needs_rebuild = True
+        self.scheduled = None
+        self.active = False
+        self.last_update_ms = 0.0
+        # the KD-trees are rebuilt once cones have stopped moving for this long (milliseconds)
+        self.refresh_delay = 300
+        self.refresh_scheduled = None
+
+    def start(self):
+        """Start listening to track changes and validate the current track."""
+        if self.active:
+            return
+        self.active = True
+        self.window.track_listeners.append(self.on_track_changed)
+        self.needs_rebuild = True
+        self.schedule()
+
+    def stop(self):
+        """Stop listening to track changes and remove all highlights."""
+        if not self.active:
+            return
+        self.active = False
+        self.window.track_listeners.remove(self.on_track_changed)
+        if self.scheduled is not None:
+            self.canvas.after_cancel(self.scheduled)
+            self.scheduled = None
+        if self.refresh_scheduled is not None:
+            self.canvas.after_cancel(self.refresh_scheduled)
+            self.refresh_scheduled = None
+        self.canvas.highlight_invalid_cones([])
+
+    def on_track_changed(self, change, canvas_object):
+        """
+        Record a track change for the next update.
+
+        Args:
+            change: Kind of change ('add', 'move', 'rotate', 'delete', 'clear', 'add_many' or 'delete_many')
+            canvas_object: Changed Cone or Car, the list of cones of a batch, None for 'clear'
+        """
+        if change == "move" and canvas_object in self.rows:
+            self.moved_cones.add(canvas_object)
+        elif change in ("add", "delete", "clear", "add_many", "delete_many") and not hasattr(canvas_object, "yaw_angle"):
+            self.needs_rebuild = True
+        else:
+            return
+        self.schedule()
+
+    def schedule(self):
+        """Schedule a single update for the next idle cycle."""
+        if self.scheduled is None:
+            self.scheduled = self.canvas.after_idle(self.update)
+
+    def update(self):
+        """Validate the recorded changes and refresh the highlighted cones."""
+        self.scheduled = None
+        start = time.perf_counter()
+        scale = self.window.scale
+
+        if self.needs_rebuild:
+            self.cones = list(self.window.cones)
+            self.rows = {cone: row for row, cone in enumerate(self.cones)}
+            positions, types = cones_to_arrays(self.cones, scale)
+            self.validator.rebuild(positions, types)
+            self.needs_rebuild = False
+        elif self.moved_cones:
+            moved = list(self.moved_cones)
+            positions, _ = cones_to_arrays(moved, scale)
+            self.validator.update_positions([self.rows[cone] for cone in moved], positions)
+            # rebuild the trees after the drag instead of on every frame
+            if self.refresh_scheduled is not None:
+                self.canvas.after_cancel(self.refresh_scheduled)
+            self.refresh_scheduled = self.canvas.after(self.refresh_delay, self.refresh_trees)
+        self.moved_cones.clear()
+
+        invalid = self.validator.invalid_rows()
+        self.canvas.highlight_invalid_cones([self.cones[row].id for row in invalid])
+        self.last_update_ms = (time.perf_counter() - start) * 1000
+
+    def refresh_trees(self):
+        """Rebuild the KD-trees of the validator once the cones have stopped moving."""
+        self.refresh_scheduled = None
+        self.validator.refresh_trees()
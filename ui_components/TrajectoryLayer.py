@@ -0,0 +1,342 @@
+import logging
+import math
+import os
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+# header names accepted for the columns of CSV logs
+X_COLUMNS = ("x", "pos_x", "position_x")
+Y_COLUMNS = ("y", "pos_y", "position_y")
+YAW_COLUMNS = ("yaw", "heading", "yaw_angle")
+
+
+def _csv_columns(path, delimiter):
+    """
+    Read the header of a CSV log and find the x, y and yaw columns.
+
+    Returns:
+        tuple: (columns, skip_rows) with the column indices (yaw omitted if not found)
+               and the number of header rows
+    """
+    with open(path, "r") as file:
+        first_line = file.readline()
+    names = [name.strip().lower() for name in first_line.split(delimiter)]
+    try:
+        [float(name) for name in names if name]
+        return (0, 1), 0
+    except ValueError:
+        pass
+
+    def find(candidates):
+        return next((index for index, name in enumerate(names) if name in candidates), None)
+
+    x_column, y_column, yaw_column = find(X_COLUMNS), find(Y_COLUMNS), find(YAW_COLUMNS)
+    if x_column is None or y_column is None:
+        raise ValueError(f"{path}: no x/y columns in header {names}")
+    columns = (x_column, y_column) if yaw_column is None else (x_column, y_column, yaw_column)
+    return columns, 1
+
+
+def load_trajectory(path, delimiter=","):
+    """
+    Load a vehicle trajectory log memory-mapped.
+    NumPy logs (.npy) are mapped directly. CSV logs are parsed once and cached as
+    '<path>.npy' next to the log, so that later loads are memory-mapped as well.
+
+    Args:
+        path: Path of a .npy file with columns x, y[, yaw] or a CSV file with an
+              optional header naming the x, y and yaw columns
+        delimiter: Column delimiter of CSV logs (default: ',')
+
+    Returns:
+        ndarray: (N, 2) or (N, 3) array of x, y in meters and yaw in degrees
+    """
+    if path.lower().endswith(".npy"):
+        data = np.load(path, mmap_mode="r")
+    else:
+        cache = path + ".npy"
+        if os.path.exists(cache) and os.path.getmtime(cache) >= os.path.getmtime(path):
+            return np.load(cache, mmap_mode="r")
+
+        columns, skip_rows = _csv_columns(path, delimiter)
+        data = np.loadtxt(path, delimiter=delimiter, skiprows=skip_rows, usecols=columns, ndmin=2)
+        try:
+            np.save(cache, data)
+            data = np.load(cache, mmap_mode="r")
+        except OSError:
+            logger.warning(f"Could not cache trajectory as {cache}, keeping it in memory")
+
+    if data.ndim != 2 or data.shape[1] < 2:
+        raise ValueError(f"{path}: expected an (N, 2) or (N, 3) array, got {data.shape}")
+    return data
+
+
+class DecimationPyramid:
+    """
+    Level-of-detail pyramid of a trajectory.
+    Every level keeps, per block of samples of the previous level, the first and last
+    sample and the samples with the minimum and maximum x and y, so the outline of
+    the path survives decimation. Levels store indices into the original samples.
+    Bounding boxes of fixed blocks of the original samples allow viewport culling
+    without touching the samples themselves.
+    """
+
+    def __init__(self, points, block=32, min_points=1000, cull_block=256, chunk=1 << 20):
+        """
+        Build the pyramid in one pass over the samples and a pass per level.
+
+        Args:
+            points: (N, 2+) array of samples, may be memory-mapped
+            block: Number of samples reduced to at most six per level (default: 32)
+            min_points: Levels are added until one has fewer samples (default: 1000)
+            cull_block: Number of original samples per culling bounding box (default: 256)
+            chunk: Number of samples read at once from the original data (default: 2^20)
+        """
+        self.points = points
+        self.count = len(points)
+        self.cull_block = cull_block
+
+        # bounding boxes for viewport culling and the first decimated level, computed chunk-wise
+        chunk = max(chunk // max(block, cull_block) * max(block, cull_block), max(block, cull_block))
+        boxes = []
+        first_level = []
+        length = 0.0
+        previous = None
+        for start in range(0, self.count, chunk):
+            xy = np.asarray(points[start:start + chunk, :2], dtype=float)
+            boxes.append(self._block_boxes(xy, cull_block))
+            first_level.append(start + self._block_extremes(xy, block))
+            if previous is not None:
+                length += math.hypot(*(xy[0] - previous))
+            length += float(np.hypot(*np.diff(xy, axis=0).T).sum())
+            previous = xy[-1]
+        self.boxes = np.concatenate(boxes) if boxes else np.empty((0, 4))
+        self.length = length
+
+        self.levels = [np.arange(self.count)]
+        if self.count > min_points:
+            self.levels.append(np.concatenate(first_level))
+        while len(self.levels[-1]) > min_points and len(self.levels[-1]) < len(self.levels[-2]):
+            indices = self.levels[-1]
+            xy = np.asarray(points[indices, :2], dtype=float)
+            self.levels.append(indices[self._block_extremes(xy, block)])
+
+        # mean distance between the samples of each level
+        self.spacing = np.array([length / max(len(indices) - 1, 1) for indices in self.levels])
+
+    @staticmethod
+    def _block_boxes(xy, block):
+        """(B, 4) array of the (min x, min y, max x, max y) of every block of samples."""
+        count = len(xy)
+        padded = np.concatenate([xy, np.repeat(xy[-1:], -count % block, axis=0)]).reshape(-1, block, 2)
+        return np.hstack([padded.min(axis=1), padded.max(axis=1)])
+
+    @staticmethod
+    def _block_extremes(xy, block):
+        """Sorted indices of the first, last and extreme samples of every block."""
+        count = len(xy)
+        padded = np.concatenate([xy, np.repeat(xy[-1:], -count % block, axis=0)]).reshape(-1, block, 2)
+        offsets = np.arange(len(padded))[:, None] * block
+        selected = np.concatenate([
+            offsets, offsets + block - 1,
+            offsets + padded.argmin(axis=1), offsets + padded.argmax(axis=1)
+        ], axis=1).ravel()
+        return np.unique(np.minimum(selected, count - 1))
+
+    def level_for(self, resolution):
+        """
+        Coarsest level whose sample spacing is at most the given resolution.
+
+        Args:
+            resolution: Largest acceptable distance between drawn samples in meters
+
+        Returns:
+            int: Level index, 0 is the full resolution
+        """
+        fine_enough = np.flatnonzero(self.spacing <= resolution)
+        return int(fine_enough[-1]) if fine_enough.size else 0
+
+    def visible_ranges(self, bounds):
+        """
+        Ranges of original sample indices whose culling boxes intersect the bounds.
+
+        Args:
+            bounds: (min x, min y, max x, max y) in meters
+
+        Returns:
+            ndarray: (R, 2) array of [start, end) index ranges
+        """
+        min_x, min_y, max_x, max_y = bounds
+        boxes = self.boxes
+        inside = (boxes[:, 0] <= max_x) & (boxes[:, 2] >= min_x) & (boxes[:, 1] <= max_y) & (boxes[:, 3] >= min_y)
+        edges = np.diff(np.concatenate([[0], inside.astype(np.int8), [0]]))
+        starts = np.flatnonzero(edges == 1) * self.cull_block
+        ends = np.minimum(np.flatnonzero(edges == -1) * self.cull_block, self.count)
+        return np.column_stack([starts, ends])
+
+    def select(self, bounds, resolution, max_points=50000):
+        """
+        Indices of the samples to draw for a viewport.
+        Inside the viewport the samples come from the level matching the resolution,
+        outside from a coarse level, so the line leaves and re-enters the viewport
+        along a rough outline instead of jumping across it.
+
+        Args:
+            bounds: (min x, min y, max x, max y) of the viewport in meters
+            resolution: Largest acceptable distance between drawn samples in meters
+            max_points: Upper limit of samples inside the viewport (default: 50000)
+
+        Returns:
+            ndarray: Sorted indices into the original samples
+        """
+        ranges = self.visible_ranges(bounds)
+        view_size = max(bounds[2] - bounds[0], bounds[3] - bounds[1])
+        outline_level = self.level_for(view_size / 4)
+        while len(self.levels[outline_level]) > max_points // 4 and outline_level < len(self.levels) - 1:
+            outline_level += 1
+        outline = self.levels[outline_level]
+
+        level = self.level_for(resolution)
+        while True:
+            indices = self.levels[level]
+            first = np.searchsorted(indices, ranges[:, 0])
+            last = np.searchsorted(indices, ranges[:, 1])
+            if (last - first).sum() <= max_points or level == len(self.levels) - 1:
+                break
+            level += 1
+
+        inside = np.zeros(len(indices), dtype=np.int8)
+        np.add.at(inside, first[first < len(indices)], 1)
+        np.add.at(inside, last[last < len(indices)], -1)
+        fine = indices[np.cumsum(inside) > 0]
+
+        in_range = np.zeros(len(outline), dtype=bool)
+        for start, end in zip(np.searchsorted(outline, ranges[:, 0]), np.searchsorted(outline, ranges[:, 1])):
+            in_range[start:end] = True
+        return np.union1d(fine, outline[~in_range])
+
+
+class TrajectoryLayer:
+    """
+    Draws a recorded trajectory on the TrackCanvas as a single polyline item.
+    The line is re-decimated for the current zoom and viewport on every redraw,
+    and a marker can be scrubbed along the log.
+    """
+
+    def __init__(self, canvas, points, scale, name="trajectory", color="#3B8ED0"):
+        """
+        Initialize the layer and build the decimation pyramid.
+
+        Args:
+            canvas: TrackCanvas to draw on
+            points: (N, 2) or (N, 3) array of x, y in meters and optional yaw in degrees
+            scale: Logical units per meter of the canvas
+            name: Name of the layer, also used as its tag (default: 'trajectory')
+            color: Line colour (default: '#3B8ED0')
+        """
+        self.canvas = canvas
+        self.points = points
+        self.scale = scale
+        self.name = name
+        self.color = color
+        self.pyramid = DecimationPyramid(points)
+        self.item = None
+        self.marker = None
+        self.marker_index = None
+        self.drawn_points = 0
+
+    def __len__(self):
+        return len(self.points)
+
+    def viewport(self, margin=0.25):
+        """Bounds of the visible canvas area in meters, enlarged by the given fraction."""
+        canvas = self.canvas
+        width, height = canvas.winfo_width(), canvas.winfo_height()
+        left, top = canvas.to_logic_coords(0, 0)
+        right, bottom = canvas.to_logic_coords(width, height)
+        pad_x = (right - left) * margin
+        pad_y = (top - bottom) * margin
+        return ((left - pad_x) / self.scale, (bottom - pad_y) / self.scale,
+                (right + pad_x) / self.scale, (top + pad_y) / self.scale)
+
+    def screen_coords(self, xy):
+        """Flat list of screen coordinates of an (N, 2) array in meters."""
+        screen = np.empty((len(xy), 2))
+        screen[:, 0] = xy[:, 0] * self.scale * self.canvas.zoom_factor + self.canvas.offset_x
+        screen[:, 1] = -xy[:, 1] * self.scale * self.canvas.zoom_factor + self.canvas.offset_y
+        return screen.ravel().tolist()
+
+    def redraw(self, pixel_tolerance=1.5):
+        """
+        Redraw the line for the current zoom and viewport.
+
+        Args:
+            pixel_tolerance: Largest distance in pixels between drawn samples (default: 1.5)
+        """
+        meters_per_pixel = 1.0 / (self.canvas.zoom_factor * self.scale)
+        indices = self.pyramid.select(self.viewport(), pixel_tolerance * meters_per_pixel)
+        self.drawn_points = len(indices)
+        if len(indices) < 2:
+            self.remove_line()
+        else:
+            coords = self.screen_coords(np.asarray(self.points[indices, :2], dtype=float))
+            if self.item is None:
+                self.item = self.canvas.create_line(*coords, fill=self.color, width=1, tags=("overlay", self.name))
+                if self.canvas.find_withtag("cone"):
+                    self.canvas.tag_lower(self.item, "cone")
+            else:
+                self.canvas.coords(self.item, coords)
+
+        if self.marker_index is not None:
+            self.set_marker(self.marker_index)
+
+    def heading(self, index):
+        """Yaw in degrees at a sample, from the log or from the neighbouring samples."""
+        if self.points.shape[1] >= 3:
+            return float(self.points[index, 2])
+        before = self.points[max(index - 1, 0), :2]
+        after = self.points[min(index + 1, len(self.points) - 1), :2]
+        return math.degrees(math.atan2(after[1] - before[1], after[0] - before[0]))
+
+    def set_marker(self, index, size=12):
+        """
+        Move the car marker to a sample of the log.
+
+        Args:
+            index: Sample index
+            size: Marker length in pixels (default: 12)
+        """
+        index = int(min(max(index, 0), len(self.points) - 1))
+        self.marker_index = index
+        x, y = self.screen_coords(np.asarray(self.points[index:index + 1, :2], dtype=float))
+        yaw = math.radians(self.heading(index))
+        # triangle pointing along the heading, screen y is inverted
+        forward = (math.cos(yaw), -math.sin(yaw))
+        side = (-forward[1], forward[0])
+        coords = [
+            x + forward[0] * size, y + forward[1] * size,
+            x - forward[0] * size / 2 + side[0] * size / 2, y - forward[1] * size / 2 + side[1] * size / 2,
+            x - forward[0] * size / 2 - side[0] * size / 2, y - forward[1] * size / 2 - side[1] * size / 2
+        ]
+        if self.marker is None:
+            self.marker = self.canvas.create_polygon(*coords, fill="#FFFFFF", outline=self.color,
+                                                     tags=("overlay", self.name + "_marker"))
+        else:
+            self.canvas.coords(self.marker, coords)
+            self.canvas.tag_raise(self.marker)
+
+    def remove_line(self):
+        """Remove the line item."""
+        if self.item is not None:
+            self.canvas.delete(self.item)
+            self.item = None
+
+    def remove(self):
+        """Remove the line and the marker from the canvas."""
+        self.remove_line()
+        if self.marker is not None:
+            self.canvas.delete(self.marker)
+            self.marker = None
+        self.marker_index = None
@@ -0,0 +1,234 @@
+from collections import deque
+
+
+class _Entry:
+    """One undoable step: a list of operations, undone in reverse order."""
+
+    def __init__(self, operations, open_drag=False):
+        self.operations = operations
+        # drag entries stay open until the mouse button is released, later moves are merged into them
+        self.open = open_drag
+
+
+class CommandHistory:
+    """
+    Undo/redo history of the track, recorded from the track change notifications.
+    Operations store only what changed: the object and, for moves and rotations, the delta.
+    Deleted objects are kept and restored on undo, so later operations keep referring to them.
+    All changes of one Tk event are grouped into one entry (e.g. a generated track),
+    continuous drags are merged into a single entry until the mouse button is released.
+    """
+
+    def __init__(self, window, max_operations=200_000):
+        """
+        Initialize the history.
+
+        Args:
+            window: Main application window
+            max_operations: Largest total number of recorded operations, the oldest
+                            entries are dropped beyond it (default: 200000)
+        """
+        self.window = window
+        self.canvas = window.placing_canvas
+        self.max_operations = max_operations
+
+        self.undo_stack = deque()
+        self.redo_stack = []
+        self.operation_count = 0
+        # last known pose of every object on the track, needed to turn moves into deltas
+        self.poses = {}
+        self.pending = []
+        self.scheduled = None
+        self.replaying = False
+        self.pressed = False
+        self.closing = False
+
+    def on_track_changed(self, change, canvas_object):
+        """Record a track change as an operation of the current entry."""
+        previous = self.poses.get(canvas_object) if change not in ("add_many", "delete_many") else None
+        if change == "clear":
+            operation = ("clear", list(self.poses))
+            self.poses.clear()
+        elif change == "add_many":
+            operation = ("add_many", canvas_object)
+            for cone in canvas_object:
+                self.poses[cone] = (cone.position_x, cone.position_y, 0.0)
+        elif change == "delete_many":
+            operation = ("delete_many", canvas_object)
+            for cone in canvas_object:
+                self.poses.pop(cone, None)
+        elif change == "delete":
+            operation = ("delete", canvas_object)
+            self.poses.pop(canvas_object, None)
+        else:
+            pose = (canvas_object.position_x, canvas_object.position_y, getattr(canvas_object, "yaw_angle", 0.0))
+            self.poses[canvas_object] = pose
+            if change == "add" or previous is None:
+                operation = ("add", canvas_object)
+            elif change == "move":
+                operation = ("move", canvas_object, pose[0] - previous[0], pose[1] - previous[1])
+            else:
+                operation = ("rotate", canvas_object, pose[2] - previous[2])
+
+        if self.replaying:
+            return
+        self.pending.append(operation)
+        self._schedule()
+
+    def on_georeference_changed(self, previous, georeference):
+        """Record a change of the geographic origin of the track (see Window.set_georeference)."""
+        if self.replaying:
+            return
+        self.pending.append(("georeference", previous, georeference))
+        self._schedule()
+
+    def _schedule(self):
+        if self.scheduled is None:
+            self.scheduled = self.canvas.after_idle(self.commit)
+
+    def press(self):
+        """Mark the start of a mouse drag."""
+        self.pressed = True
+
+    def release(self):
+        """Close the open drag entry once the changes of the release event are committed."""
+        self.pressed = False
+        self.closing = True
+        self._schedule()
+
+    def commit(self):
+        """Turn the pending operations into an entry, merging drags into the open entry."""
+        self.scheduled = None
+        operations, self.pending = self.pending, []
+        if operations:
+            top = self.undo_stack[-1] if self.undo_stack else None
+            movement_only = all(operation[0] in ("move", "rotate") for operation in operations)
+            if top is not None and top.open and movement_only:
+                self._merge(top, operations)
+            else:
+                self.undo_stack.append(_Entry(self._compact(operations), self.pressed and movement_only))
+                self.operation_count += self._size(self.undo_stack[-1].operations)
+                self.redo_stack.clear()
+                self._evict()
+        if self.closing and self.undo_stack:
+            self.undo_stack[-1].open = False
+        self.closing = False
+
+    @staticmethod
+    def _size(operations):
+        """Number of operations, batches and clears count once per object."""
+        return sum(len(operation[1]) if operation[0] in ("add_many", "delete_many", "clear") else 1 for operation in operations)
+
+    @staticmethod
+    def _compact(operations):
+        """Sum consecutive move and rotate deltas per object."""
+        compact = []
+        index = {}
+        for operation in operations:
+            kind, canvas_object = operation[0], operation[1]
+            key = (kind, canvas_object) if kind in ("move", "rotate") else None
+            if key in index:
+                position = index[key]
+                merged = compact[position]
+                compact[position] = (kind, canvas_object) + tuple(a + b for a, b in zip(merged[2:], operation[2:]))
+                continue
+            if kind in ("add_many", "delete_many"):
+                batch = set(canvas_object)
+                index = {key: value for key, value in index.items() if key[1] not in batch}
+            elif kind not in ("move", "rotate"):
+                # deltas must not be merged across other operations on the same object
+                index = {key: value for key, value in index.items() if key[1] is not canvas_object}
+            else:
+                index[key] = len(compact)
+            compact.append(operation)
+        return compact
+
+    def _merge(self, entry, operations):
+        before = self._size(entry.operations)
+        entry.operations = self._compact(entry.operations + operations)
+        self.operation_count += self._size(entry.operations) - before
+
+    def _evict(self):
+        while self.operation_count > self.max_operations and len(self.undo_stack) > 1:
+            entry = self.undo_stack.popleft()
+            self.operation_count -= self._size(entry.operations)
+            self._release(entry.operations)
+
+    def _release(self, operations):
+        """Destroy the widgets of objects deleted by evicted operations, they can no longer be restored."""
+        window = self.window
+        on_track = set(window.cones)
+        on_track.add(window.car)
+        for operation in operations:
+            kind, target = operation[0], operation[1]
+            if kind == "delete":
+                deleted = (target,)
+            elif kind in ("delete_many", "clear"):
+                deleted = target
+            else:
+                continue
+            for canvas_object in deleted:
+                if canvas_object not in on_track:
+                    canvas_object.release()
+
+    def undo(self):
+        """Revert the last entry."""
+        self.commit()
+        if not self.undo_stack:
+            return
+        entry = self.undo_stack.pop()
+        self.operation_count -= self._size(entry.operations)
+        entry.open = False
+        self._replay(reversed(entry.operations), undo=True)
+        self.redo_stack.append(entry)
+
+    def redo(self):
+        """Apply the last undone entry again."""
+        self.commit()
+        if not self.redo_stack:
+            return
+        entry = self.redo_stack.pop()
+        self._replay(entry.operations, undo=False)
+        self.undo_stack.append(entry)
+        self.operation_count += self._size(entry.operations)
+
+    def _replay(self, operations, undo):
+        window = self.window
+        self.replaying = True
+        try:
+            for operation in operations:
+                kind, target = operation[0], operation[1]
+                sign = -1 if undo else 1
+                if kind == "move":
+                    target.move(target.position_x + sign * operation[2], target.position_y + sign * operation[3])
+                elif kind == "rotate":
+                    target.set_yaw(target.yaw_angle + sign * operation[2])
+                elif kind in ("add_many", "delete_many"):
+                    if (kind == "add_many") == undo:
+                        window.remove_cones(target)
+                    else:
+                        window.restore_cones(target)
+                elif kind == "georeference":
+                    window.georeference = target if undo else operation[2]
+                elif kind == "clear":
+                    if undo:
+                        # the cones go back in one batch, the car on its own
+                        window.restore_cones([canvas_object for canvas_object in target if not hasattr(canvas_object, "delete_car")])
+                        for canvas_object in target:
+                            if hasattr(canvas_object, "delete_car"):
+                                canvas_object.restore()
+                    else:
+                        window.clear_canvas()
+                elif (kind == "add") == undo:
+                    # undoing an add or redoing a delete
+                    self._remove(target)
+                else:
+                    target.restore()
+        finally:
+            self.replaying = False
+
+    def _remove(self, canvas_object):
+        if hasattr(canvas_object, "delete_car"):
+            canvas_object.delete_car()
+        else:
+            canvas_object.delete_cone()